@@ -0,0 +1,264 @@
+"""
+LogTail benchmarks.
+Measures the journal hot path on synthetic data: per-line cost, throughput
+in lines/s and MB/s, write-to-dispatch latency through a real file watcher
+and peak memory, so regressions show up and the tailer can be sized for
+multi-account machines.
+
+Usage:
+- python bench_logtail.py
+- python bench_logtail.py --lines 200000 --backend polling --rate 5000
+"""
+
+import os
+import io
+import sys
+import json
+import argparse
+import statistics
+import tempfile
+import time
+import threading
+from collections import Counter
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# logtail reads APPDATA at import time, which does not exist outside Windows
+os.environ.setdefault("APPDATA", tempfile.gettempdir())
+
+import logtail
+from synthetic_journal import JournalGenerator, encode_line
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def make_lines(count: int, seed: int = 0) -> List[bytes]:
+    """Build synthetic journal lines with a realistic event mix and line sizes."""
+    return list(JournalGenerator(seed).lines(count, header=False))
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, if it can be measured."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1e6
+    return None
+
+
+def per_line_ns(func: Callable[[bytes], object], lines: List[bytes], repeat: int = 5) -> float:
+    """Best-of-N average nanoseconds spent per line."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for line in lines:
+            func(line)
+        best = min(best, time.perf_counter_ns() - started)
+    return best / len(lines)
+
+
+def bench_watchlist(lines: List[bytes]):
+    """Compare the old re-serialize search with the raw-bytes watchlist."""
+    watchlist = logtail.Watchlist(["RAXXLA", "Shinrarta Dezhra", "Colonia", "Wine"])
+
+    def dumps_search(line):
+        entry = json.loads(line)
+        return "RAXXLA" in json.dumps(entry).upper()
+
+    def raw_scan(line):
+        watchlist.scan(line)
+        return json.loads(line)
+
+    print("Watchlist search (ns/line):")
+    print(f"  json.loads + json.dumps + upper : {per_line_ns(dumps_search, lines):8.0f}")
+    print(f"  watchlist scan + json.loads     : {per_line_ns(raw_scan, lines):8.0f}")
+    print(f"  watchlist scan only             : {per_line_ns(watchlist.scan, lines):8.0f}")
+
+
+def make_log_tail() -> logtail.LogTail:
+    """Create a LogTail with a throwaway save file and no console banner."""
+    folder = Path(tempfile.mkdtemp())
+    logtail.CONFIG["save_file"] = folder / "event_counts.json"
+    logtail.CONFIG["stats_file"] = folder / "event_stats.sqlite3"
+    with redirect_stdout(io.StringIO()):
+        return logtail.LogTail()
+
+
+def bench_prefilter(lines: List[bytes]):
+    """Read a multi-megabyte journal with and without the event-type prefilter."""
+    with tempfile.TemporaryDirectory() as folder:
+        journal = Path(folder) / "Journal.2024-01-01T000000.01.log"
+        journal.write_bytes(b"\n".join(lines) + b"\n")
+        size_mb = journal.stat().st_size / 1e6
+
+        def run(log_tail, process) -> float:
+            reader = logtail.JournalReader(journal)
+            started = time.perf_counter()
+            for line in reader.read_lines():
+                process(log_tail, line)
+            return time.perf_counter() - started
+
+        def full_decode(log_tail, line):
+            log_tail.process_journal_entry(json.loads(line))
+
+        def prefilter(log_tail, line):
+            log_tail.process_journal_line(line)
+
+        subscribed = make_log_tail()
+        subscribed.subscribe(["FSDJump"], lambda entry, commander: None)
+
+        print(f"Journal throughput on {size_mb:.1f} MB:")
+        for label, log_tail, process in (
+            ("full json.loads of every line   ", make_log_tail(), full_decode),
+            ("prefilter, no subscribers       ", make_log_tail(), prefilter),
+            ("prefilter, FSDJump subscribed   ", subscribed, prefilter),
+        ):
+            elapsed = min(run(log_tail, process) for _ in range(3))
+            print(f"  {label}: {size_mb / elapsed:8.1f} MB/s {len(lines) / elapsed:>10,.0f} lines/s")
+
+
+def bench_multi_journal(lines: List[bytes], commanders: int = 3, backend: str = "watchdog"):
+    """
+    Write several journals concurrently, as several game clients would, and
+    check that every line is counted and attributed to the right commander.
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        logtail.CONFIG["journal_folder"] = Path(folder)
+        log_tail = make_log_tail()
+        monitor = logtail.JournalMonitor(log_tail)
+        observer = logtail.make_observer(backend)
+        observer.schedule(monitor, folder, recursive=False)
+        observer.start()
+
+        def write_journal(index: int):
+            path = Path(folder) / f"Journal.2024-01-01T00000{index}.01.log"
+            header = b'{ "timestamp":"2024-01-01T00:00:00Z", "event":"Commander", "Name":"CMDR%d" }\n' % index
+            data = header + b"\n".join(lines) + b"\n"
+            with open(path, "wb") as f:
+                # Uneven chunks so lines are regularly split across writes
+                for start in range(0, len(data), 4093):
+                    f.write(data[start:start + 4093])
+                    f.flush()
+
+        expected = commanders * (len(lines) + 1)
+        started = time.perf_counter()
+        writers = [threading.Thread(target=write_journal, args=(i,)) for i in range(commanders)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        deadline = time.monotonic() + 30
+        while sum(log_tail.event_counts.values()) < expected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        observer.stop()
+        observer.join()
+
+        per_commander = Counter()
+        for (commander, _, _), count in log_tail.stats.take_pending().items():
+            per_commander[commander] += count
+        counted = sum(log_tail.event_counts.values())
+        print(f"{commanders} concurrent journals ({backend}):")
+        print(f"  counted {counted}/{expected} lines in {elapsed:.2f}s ({counted / elapsed:,.0f} lines/s)")
+        print(f"  per commander: {dict(sorted(per_commander.items()))}")
+
+
+def bench_latency(lines: List[bytes], backend: str = "watchdog", rate: int = 2000,
+                  duration: float = 3.0, probe_every: int = 20):
+    """
+    Write lines at a steady rate and time each one from write() to dispatch.
+
+    Every probe_every-th line is a BenchProbe event carrying a sequence
+    number; a subscribed handler records how long it took to arrive.
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        logtail.CONFIG["journal_folder"] = Path(folder)
+        log_tail = make_log_tail()
+        sent = {}
+        latencies = []
+
+        def on_probe(entry, commander):
+            latencies.append(time.perf_counter_ns() - sent[entry["seq"]])
+
+        log_tail.subscribe(["BenchProbe"], on_probe)
+        monitor = logtail.JournalMonitor(log_tail)
+        observer = logtail.make_observer(backend)
+        observer.schedule(monitor, folder, recursive=False)
+        observer.start()
+
+        total = int(rate * duration)
+        batch = max(1, rate // 100)
+        path = Path(folder) / "Journal.2024-01-01T000000.01.log"
+        probes = 0
+        started = time.perf_counter()
+        with open(path, "wb") as f:
+            for start in range(0, total, batch):
+                chunk = []
+                for i in range(start, min(start + batch, total)):
+                    if i % probe_every == 0:
+                        chunk.append(encode_line({"timestamp": "2024-01-01T00:00:00Z",
+                                                  "event": "BenchProbe", "seq": probes}))
+                        probes += 1
+                    else:
+                        chunk.append(lines[i % len(lines)])
+                sent_at = time.perf_counter_ns()
+                for seq in range(len(sent), probes):
+                    sent[seq] = sent_at
+                f.write(b"\r\n".join(chunk) + b"\r\n")
+                f.flush()
+                # Pace the writer to the target rate
+                delay = started + (start + batch) / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+        deadline = time.monotonic() + 10
+        while len(latencies) < probes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        observer.stop()
+        observer.join()
+
+        print(f"Write-to-dispatch latency ({backend}, {rate} lines/s for {duration:.0f}s):")
+        if len(latencies) < 2:
+            print(f"  only {len(latencies)}/{probes} probes arrived")
+            return
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(f"  probes: {len(latencies)}/{probes}")
+        print(f"  p50: {percentiles[49] / 1e6:8.2f} ms   p99: {percentiles[98] / 1e6:8.2f} ms"
+              f"   max: {max(latencies) / 1e6:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LogTail hot path")
+    parser.add_argument("--lines", type=int, default=50000, help="synthetic lines per run")
+    parser.add_argument("--backend", choices=["watchdog", "polling"], default="watchdog",
+                        help="file watcher used by the latency benchmark")
+    parser.add_argument("--rate", type=int, default=2000, help="lines/s written in the latency benchmark")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    sizes = sorted(map(len, lines))
+    print(f"{len(lines)} synthetic lines, {sum(sizes) / 1e6:.1f} MB,"
+          f" median {sizes[len(sizes) // 2]} bytes, largest {sizes[-1]:,} bytes")
+    bench_watchlist(lines)
+    bench_prefilter(lines)
+    bench_multi_journal(lines[:20000])
+    bench_multi_journal(lines[:20000], backend="polling")
+    bench_latency(lines, args.backend, args.rate)
+    rss = peak_rss_mb()
+    print(f"Peak RSS: {rss:.1f} MB" if rss is not None else "Peak RSS: unavailable")
+
+
+if __name__ == "__main__":
+    main()
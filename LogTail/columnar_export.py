@@ -0,0 +1,196 @@
+"""
+Elite Dangerous LogTail - Columnar Export
+Streams journal events into compressed, per-event-type column files.
+
+Events are buffered per event type and written out in batches, one part file
+per batch, under <export folder>/<event type>/. With pyarrow installed each
+part is a zstd-compressed Parquet file. Without it, each part is a zip
+archive holding one compressed JSON array per column. Either way a query
+only decompresses the columns it asks for. Nested values (lists and
+objects) are stored as JSON text.
+
+Requirements:
+- pip install pyarrow (optional, for Parquet output)
+
+Usage:
+- python columnar_export.py EXPORT_FOLDER Scan BodyName TerraformState --where TerraformState=Terraformable
+"""
+
+import json
+import time
+import zipfile
+import argparse
+import threading
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Column holding the commander each event was attributed to
+COMMANDER_COLUMN = "_commander"
+
+
+def flatten_value(value):
+    """Store nested values as JSON text so every column holds scalars."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+class ColumnarExporter:
+    """
+    Buffers decoded events and writes them as columnar batches.
+
+    handle() matches the LogTail handler signature, so an exporter can be
+    subscribed directly; run it threaded so compression never happens on
+    the watchdog thread.
+    """
+    def __init__(self, folder: Path, batch_size: int = 5000, flush_interval: float = 60.0,
+                 use_parquet: Optional[bool] = None):
+        self.folder = folder
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.use_parquet = pa is not None if use_parquet is None else use_parquet
+        if self.use_parquet and pa is None:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self.batches: Dict[str, List[dict]] = defaultdict(list)
+        self.first_buffered: Dict[str, float] = {}
+        self.parts = 0
+        self.lock = threading.Lock()
+
+    def handle(self, entry: dict, commander: Optional[str] = None):
+        """Buffer one event, writing its batch once it is full or old enough."""
+        event_type = entry.get("event")
+        if not event_type:
+            return
+        row = {key: flatten_value(value) for key, value in entry.items()}
+        row[COMMANDER_COLUMN] = commander
+        with self.lock:
+            batch = self.batches[event_type]
+            batch.append(row)
+            self.first_buffered.setdefault(event_type, time.monotonic())
+            due = (len(batch) >= self.batch_size
+                   or time.monotonic() - self.first_buffered[event_type] >= self.flush_interval)
+            if due:
+                self._write(event_type)
+
+    def flush(self):
+        """Write every buffered batch."""
+        with self.lock:
+            for event_type in list(self.batches):
+                self._write(event_type)
+
+    def close(self):
+        self.flush()
+
+    def _write(self, event_type: str):
+        rows = self.batches.pop(event_type, [])
+        self.first_buffered.pop(event_type, None)
+        if not rows:
+            return
+        folder = self.folder / safe_name(event_type)
+        folder.mkdir(parents=True, exist_ok=True)
+        self.parts += 1
+        stem = f"part-{time.time_ns()}-{self.parts:06d}"
+        try:
+            if self.use_parquet:
+                write_parquet(folder / f"{stem}.parquet", rows)
+            else:
+                write_column_zip(folder / f"{stem}.colz", rows)
+        except Exception as e:
+            logger.error("Error exporting %d %s events: %s", len(rows), event_type, e)
+
+
+def safe_name(event_type: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in event_type)
+
+
+def columns_of(rows: List[dict]) -> Dict[str, list]:
+    """Pivot rows into columns, filling missing fields with None."""
+    names = list(dict.fromkeys(key for row in rows for key in row))
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+def write_parquet(path: Path, rows: List[dict]):
+    columns = columns_of(rows)
+    arrays = {}
+    for name, values in columns.items():
+        try:
+            arrays[name] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed types in one column, e.g. an int and a string
+            arrays[name] = pa.array([None if v is None else json.dumps(v) for v in values])
+    temp_path = path.with_suffix(".tmp")
+    pq.write_table(pa.table(arrays), temp_path, compression="zstd")
+    temp_path.replace(path)
+
+
+def write_column_zip(path: Path, rows: List[dict]):
+    temp_path = path.with_suffix(".tmp")
+    with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, values in columns_of(rows).items():
+            archive.writestr(f"{name}.json", json.dumps(values, separators=(",", ":")))
+    temp_path.replace(path)
+
+
+def read_columns(folder: Path, event_type: str, columns: Iterable[str]) -> Iterator[dict]:
+    """Yield rows with only the requested columns for one event type."""
+    columns = list(columns)
+    for path in sorted((folder / safe_name(event_type)).glob("part-*")):
+        if path.suffix == ".parquet":
+            if pq is None:
+                raise RuntimeError(f"Reading {path} needs pyarrow: pip install pyarrow")
+            present = [name for name in columns if name in pq.read_schema(path).names]
+            table = pq.read_table(path, columns=present).to_pydict()
+            count = pq.ParquetFile(path).metadata.num_rows
+            data = {name: table.get(name, [None] * count) for name in columns}
+        elif path.suffix == ".colz":
+            with zipfile.ZipFile(path) as archive:
+                members = set(archive.namelist())
+                data = {}
+                for name in columns:
+                    if f"{name}.json" in members:
+                        data[name] = json.loads(archive.read(f"{name}.json"))
+                count = max((len(values) for values in data.values()), default=0)
+                if not data:
+                    # None of the requested columns exist, but the rows do
+                    first = next(iter(members), None)
+                    count = len(json.loads(archive.read(first))) if first else 0
+                data = {name: data.get(name, [None] * count) for name in columns}
+        else:
+            continue
+        for i in range(count):
+            yield {name: data[name][i] for name in columns}
+
+
+def main():
+    """Print selected columns of exported events."""
+    parser = argparse.ArgumentParser(description="Query LogTail columnar exports")
+    parser.add_argument("folder", type=Path, help="export folder")
+    parser.add_argument("event", help="journal event type, e.g. Scan")
+    parser.add_argument("columns", nargs="+", help="columns to print")
+    parser.add_argument("--where", action="append", default=[],
+                        help="only rows where COLUMN=VALUE (can be repeated)")
+    args = parser.parse_args()
+
+    filters = dict(condition.split("=", 1) for condition in args.where)
+    wanted = list(dict.fromkeys(args.columns + list(filters)))
+    matches = 0
+    for row in read_columns(args.folder, args.event, wanted):
+        if all(str(row[name]) == value for name, value in filters.items()):
+            print("\t".join(str(row[name]) for name in args.columns))
+            matches += 1
+    print(f"{matches} {args.event} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Elite Dangerous LogTail - Event Statistics
+Time-bucketed event counts per commander, stored in SQLite.
+
+Every counted journal line is added to a per-minute, per-hour and per-day
+bucket keyed by its "timestamp" field and the commander that wrote it.
+Old minute and hour buckets are pruned after a retention period, while the
+coarser buckets keep the long-term picture.
+
+Usage:
+- python event_stats.py FSDJump --resolution hour --days 7
+"""
+
+import os
+import re
+import json
+import sqlite3
+import argparse
+import threading
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bucket sizes in seconds, also used as table name suffixes
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+
+# Days each resolution is kept for, None keeps it forever
+DEFAULT_RETENTION = {"minute": 7, "hour": 365, "day": None}
+
+TIMESTAMP_FIELD = re.compile(rb'"timestamp"\s*:\s*"([^"]*)"')
+
+# Commander attributed to events seen before any Commander/LoadGame event
+UNKNOWN_COMMANDER = ""
+
+# Key of one pending bucket: (commander, event type, minute start)
+BucketKey = Tuple[str, str, int]
+
+
+@lru_cache(maxsize=4096)
+def parse_minute(prefix: bytes) -> int:
+    """Convert a "YYYY-MM-DDTHH:MM" timestamp prefix to epoch seconds."""
+    minute = datetime.strptime(prefix.decode("ascii"), "%Y-%m-%dT%H:%M")
+    return int(minute.replace(tzinfo=timezone.utc).timestamp())
+
+
+def line_minute(line: bytes) -> Optional[int]:
+    """Return the start of the minute a raw journal line was written in."""
+    match = TIMESTAMP_FIELD.search(line)
+    if not match:
+        return None
+    try:
+        return parse_minute(match.group(1)[:16])
+    except ValueError:
+        return None
+
+
+def commander_name(event_type: str, line: bytes) -> Optional[str]:
+    """Return the commander named by a Commander or LoadGame line."""
+    if event_type == "Commander":
+        return json.loads(line).get("Name")
+    if event_type == "LoadGame":
+        return json.loads(line).get("Commander")
+    return None
+
+
+class EventStatsStore:
+    """
+    SQLite store of event counts bucketed by minute, hour and day.
+
+    record() is cheap and only aggregates in memory; flush() upserts the
+    aggregated buckets into all three resolutions in one transaction.
+    Pending buckets can be taken separately from writing them, so a caller
+    can capture them at the same moment as the journal checkpoint.
+    """
+    def __init__(self, path: Path, retention: Optional[Dict[str, Optional[int]]] = None):
+        self.path = path
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self.commander = UNKNOWN_COMMANDER
+        self.pending: Counter = Counter()
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        for resolution in RESOLUTIONS:
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS events_{resolution} ("
+                " commander TEXT NOT NULL, event TEXT NOT NULL,"
+                " bucket INTEGER NOT NULL, count INTEGER NOT NULL,"
+                " PRIMARY KEY (event, bucket, commander)) WITHOUT ROWID"
+            )
+        self.db.commit()
+
+    def record(self, event_type: str, line: bytes, commander: Optional[str] = None):
+        """
+        Add one journal line to the pending buckets.
+
+        The line is attributed to the given commander, or when omitted to
+        the last commander seen in the recorded lines.
+        """
+        if commander is None:
+            self.commander = commander_name(event_type, line) or self.commander
+            commander = self.commander
+        minute = line_minute(line)
+        if minute is None:
+            return
+        key = (commander, event_type, minute)
+        with self.lock:
+            self.pending[key] += 1
+
+    def add_counts(self, buckets: Dict[BucketKey, int]):
+        """Merge already aggregated per-minute buckets, e.g. from a backfill."""
+        with self.lock:
+            self.pending.update(buckets)
+
+    def take_pending(self) -> Counter:
+        """Return and reset the buckets recorded since the last call."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        return pending
+
+    def flush(self, pending: Optional[Counter] = None):
+        """Write the pending (or given) buckets to every resolution."""
+        if pending is None:
+            pending = self.take_pending()
+        if not pending:
+            return
+        with self.db_lock, self.db:
+            for resolution, size in RESOLUTIONS.items():
+                rolled = Counter()
+                for (commander, event_type, minute), count in pending.items():
+                    rolled[commander, event_type, minute - minute % size] += count
+                self.db.executemany(
+                    f"INSERT INTO events_{resolution} (commander, event, bucket, count)"
+                    " VALUES (?, ?, ?, ?) ON CONFLICT (event, bucket, commander)"
+                    " DO UPDATE SET count = count + excluded.count",
+                    [(*key, count) for key, count in rolled.items()],
+                )
+
+    def clear(self):
+        """Delete every stored bucket, e.g. before a full backfill."""
+        self.take_pending()
+        with self.db_lock, self.db:
+            for resolution in RESOLUTIONS:
+                self.db.execute(f"DELETE FROM events_{resolution}")
+
+    def prune(self, now: Optional[datetime] = None):
+        """Drop buckets older than their resolution's retention period."""
+        now = now or datetime.now(timezone.utc)
+        with self.db_lock, self.db:
+            for resolution, days in self.retention.items():
+                if days is None:
+                    continue
+                cutoff = int((now - timedelta(days=days)).timestamp())
+                self.db.execute(f"DELETE FROM events_{resolution} WHERE bucket < ?", (cutoff,))
+
+    def query(self, event_type: str, resolution: str = "hour",
+              start: Optional[datetime] = None, end: Optional[datetime] = None,
+              commander: Optional[str] = None) -> List[Tuple[datetime, int]]:
+        """Return (bucket start, count) pairs for an event type, oldest first."""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}, expected one of {list(RESOLUTIONS)}")
+        sql = f"SELECT bucket, SUM(count) FROM events_{resolution} WHERE event = ? AND bucket >= ? AND bucket < ?"
+        params = [
+            event_type,
+            int(start.timestamp()) if start else 0,
+            int(end.timestamp()) if end else 2**62,
+        ]
+        if commander is not None:
+            sql += " AND commander = ?"
+            params.append(commander)
+        sql += " GROUP BY bucket ORDER BY bucket"
+        with self.db_lock:
+            rows = self.db.execute(sql, params).fetchall()
+        return [(datetime.fromtimestamp(bucket, timezone.utc), count) for bucket, count in rows]
+
+    def close(self):
+        self.flush()
+        with self.db_lock:
+            self.db.close()
+
+
+def main():
+    """Print bucketed counts for one event type."""
+    parser = argparse.ArgumentParser(description="Query LogTail event statistics")
+    parser.add_argument("event", help="journal event type, e.g. FSDJump")
+    parser.add_argument("--resolution", choices=list(RESOLUTIONS), default="hour")
+    parser.add_argument("--days", type=float, default=7, help="how far back to look")
+    parser.add_argument("--commander", default=None)
+    parser.add_argument(
+        "--db", type=Path,
+        default=Path(os.getenv("APPDATA", Path.home())) / "EDLogTail" / "event_stats.sqlite3",
+    )
+    args = parser.parse_args()
+
+    store = EventStatsStore(args.db)
+    start = datetime.now(timezone.utc) - timedelta(days=args.days)
+    rows = store.query(args.event, args.resolution, start=start, commander=args.commander)
+    for bucket, count in rows:
+        print(f"{bucket:%Y-%m-%d %H:%M}  {count}")
+    print(f"Total {args.event}: {sum(count for _, count in rows)}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
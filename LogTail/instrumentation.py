@@ -0,0 +1,200 @@
+"""
+Elite Dangerous LogTail - Instrumentation
+Stage timers, a sampling profiler and periodic metrics files.
+
+Each stage of the read -> decode -> dispatch path adds its call count and
+elapsed time to a Metrics object. Stages are timed by swapping the method
+for a timing wrapper with instrument(), and only when metrics are enabled,
+so the hot path is left untouched otherwise. Snapshots can be written as
+JSON or as a Prometheus text file for node_exporter's textfile collector.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+import traceback
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class StageStats:
+    """Call count and elapsed time of one instrumented stage."""
+    __slots__ = ("calls", "items", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "items": self.items,
+            "total_ms": self.total_ns / 1e6,
+            "avg_us": self.total_ns / self.calls / 1e3 if self.calls else 0.0,
+            "max_us": self.max_ns / 1e3,
+        }
+
+
+class Metrics:
+    """Counters and timers for the LogTail hot path."""
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Counter = Counter()
+        self.started = time.time()
+
+    def record(self, stage: str, elapsed_ns: int, items: int = 1):
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats()
+        stats.calls += 1
+        stats.items += items
+        stats.total_ns += elapsed_ns
+        if elapsed_ns > stats.max_ns:
+            stats.max_ns = elapsed_ns
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime_s": time.time() - self.started,
+            "stages": {name: stats.as_dict() for name, stats in list(self.stages.items())},
+            "counters": dict(self.counters),
+        }
+
+
+def instrument(obj: Any, name: str, metrics: Metrics, stage: Optional[str] = None,
+               count_items: bool = False):
+    """
+    Time every call of obj.name under the given stage, if metrics are enabled.
+
+    With count_items the length of each result is counted as items, so
+    stages such as file reads report lines as well as calls.
+    """
+    if not metrics.enabled:
+        return
+    func = getattr(obj, name)
+    stage = stage or name
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        started = time.perf_counter_ns()
+        result = func(*args, **kwargs)
+        metrics.record(stage, time.perf_counter_ns() - started,
+                       len(result) if count_items else 1)
+        return result
+
+    setattr(obj, name, timed)
+
+
+class SamplingProfiler:
+    """
+    Periodically samples the stacks of every thread.
+
+    Unlike cProfile this does not hook every function call, so it can be
+    left running during a heavy session. The most frequent innermost frames
+    and call sites show where the time goes.
+    """
+    def __init__(self, interval: float = 0.005, depth: int = 8):
+        self.interval = interval
+        self.depth = depth
+        self.samples = 0
+        self.frames: Counter = Counter()
+        self.stacks: Counter = Counter()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = traceback.extract_stack(frame, limit=self.depth)
+                if not stack:
+                    continue
+                top = stack[-1]
+                self.frames[f"{Path(top.filename).name}:{top.name}:{top.lineno}"] += 1
+                self.stacks[" <- ".join(
+                    f"{Path(f.filename).name}:{f.name}" for f in reversed(stack)
+                )] += 1
+            self.samples += 1
+
+    def top(self, count: int = 15) -> dict:
+        return {
+            "samples": self.samples,
+            "frames": self.frames.most_common(count),
+            "stacks": self.stacks.most_common(count),
+        }
+
+
+def write_metrics(path: Path, snapshot: dict, event_counts: Dict[str, int],
+                  handlers: Dict[str, dict], profile: Optional[dict] = None):
+    """
+    Atomically write a metrics snapshot. A .prom suffix selects the
+    Prometheus text format, anything else is written as JSON.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".prom":
+        text = prometheus_text(snapshot, event_counts, handlers)
+    else:
+        data = dict(snapshot, events=dict(event_counts), handlers=handlers)
+        if profile is not None:
+            data["profile"] = profile
+        text = json.dumps(data, indent=2)
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def prometheus_text(snapshot: dict, event_counts: Dict[str, int], handlers: Dict[str, dict]) -> str:
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, samples: List[Tuple[str, float]]):
+        lines.append(f"# TYPE logtail_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"logtail_{name}{labels} {value}")
+
+    stages = snapshot["stages"]
+    metric("stage_calls_total", "counter",
+           [(label("stage", name), stats["calls"]) for name, stats in stages.items()])
+    metric("stage_items_total", "counter",
+           [(label("stage", name), stats["items"]) for name, stats in stages.items()])
+    metric("stage_seconds_total", "counter",
+           [(label("stage", name), stats["total_ms"] / 1e3) for name, stats in stages.items()])
+    metric("stage_max_seconds", "gauge",
+           [(label("stage", name), stats["max_us"] / 1e6) for name, stats in stages.items()])
+    metric("counter_total", "counter",
+           [(label("name", name), value) for name, value in snapshot["counters"].items()])
+    metric("events_total", "counter",
+           [(label("event", name), value) for name, value in event_counts.items()])
+    metric("handler_queue_depth", "gauge",
+           [(label("handler", name), stats["queue_depth"]) for name, stats in handlers.items()])
+    metric("handler_dropped_total", "counter",
+           [(label("handler", name), stats["dropped"]) for name, stats in handlers.items()])
+    metric("handler_avg_seconds", "gauge",
+           [(label("handler", name), stats["avg_ms"] / 1e3) for name, stats in handlers.items()])
+    metric("uptime_seconds", "gauge", [("", snapshot["uptime_s"])])
+    return "\n".join(lines) + "\n"
+
+
+def label(key: str, value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'{{{key}="{escaped}"}}'
@@ -0,0 +1,310 @@
+"""
+Elite Dangerous LogTail - Journal Search Index
+An on-disk inverted index over every journal in the folder, stored in SQLite.
+
+Each journal line is indexed under its event type, StarSystem, BodyName (or
+Body), timestamp and the words of its text values. Hits are returned as the
+journal file and byte offset of the line, so it can be read back directly.
+The index remembers how far into each journal it got and only reads the new
+part of a journal on the next update; a journal that was replaced (new inode)
+or shrank is indexed again from the start.
+
+Usage:
+- python journal_index.py raxxla
+- python journal_index.py --event Scan --system "Sol" --since 2024-01-01 --show
+- python journal_index.py --body "Colonia 2*" --limit 20
+- python logtail.py search ...   same options, with LogTail's folders
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Words of text values; single characters and very long tokens are skipped
+WORD = re.compile(r"[^\W_][\w'*-]{1,39}")
+
+# Fields whose values are not worth indexing as free text
+SKIPPED_FIELDS = {"timestamp", "event"}
+
+# (byte offset, epoch seconds, event type, terms) of one indexed line
+IndexedLine = Tuple[int, Optional[int], str, List[str]]
+
+
+def parse_timestamp(value: str) -> Optional[int]:
+    """Convert a journal or command line timestamp to epoch seconds."""
+    try:
+        parsed = datetime.fromisoformat(value.rstrip("Z"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def text_values(value) -> Iterator[str]:
+    """Yield every string nested in a decoded journal value."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key not in SKIPPED_FIELDS:
+                yield from text_values(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from text_values(item)
+
+
+def line_terms(entry: dict) -> List[str]:
+    """All index terms of one decoded journal line."""
+    terms = {"event:" + str(entry.get("event", "")).lower()}
+    system = entry.get("StarSystem")
+    if isinstance(system, str):
+        terms.add("system:" + system.lower())
+    body = entry.get("BodyName", entry.get("Body"))
+    if isinstance(body, str):
+        terms.add("body:" + body.lower())
+    for text in text_values(entry):
+        for word in WORD.findall(text.lower()):
+            terms.add("word:" + word)
+    return list(terms)
+
+
+def index_journal_file(path: Path, offset: int = 0) -> Tuple[int, int, List[IndexedLine]]:
+    """
+    Tokenize the complete lines of a journal from the given byte offset.
+
+    Returns the inode, the offset just past the last complete line and the
+    indexed lines. Runs in a worker process.
+    """
+    with open(path, "rb") as f:
+        inode = os.fstat(f.fileno()).st_ino
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    lines = []
+    position = offset
+    for line in data[:end].split(b"\n"):
+        start = position
+        position += len(line) + 1
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(entry, dict):
+            continue
+        timestamp = entry.get("timestamp")
+        lines.append((
+            start,
+            parse_timestamp(timestamp) if isinstance(timestamp, str) else None,
+            str(entry.get("event", "")),
+            line_terms(entry),
+        ))
+    return inode, offset + end, lines
+
+
+class JournalIndex:
+    """SQLite inverted index of journal lines."""
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " file_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE,"
+            " inode INTEGER NOT NULL, indexed_to INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS lines ("
+            " file_id INTEGER NOT NULL, pos INTEGER NOT NULL, ts INTEGER, event TEXT NOT NULL,"
+            " PRIMARY KEY (file_id, pos)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS lines_ts ON lines (ts);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, file_id INTEGER NOT NULL, pos INTEGER NOT NULL,"
+            " PRIMARY KEY (term, file_id, pos)) WITHOUT ROWID;"
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def update(self, folder: Path, workers: Optional[int] = None) -> int:
+        """
+        Index whatever is new in the folder's journals; returns the number of
+        lines added. Journals are tokenized in parallel, like a backfill.
+        """
+        known = {name: (file_id, inode, indexed_to) for file_id, name, inode, indexed_to
+                 in self.db.execute("SELECT file_id, name, inode, indexed_to FROM files")}
+        work = []
+        for path in sorted(folder.glob("Journal.*.log")):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            file_id, inode, indexed_to = known.get(path.name, (None, None, 0))
+            if file_id is not None and (stat.st_ino != inode or stat.st_size < indexed_to):
+                # Replaced or truncated, start this journal over
+                self.forget(file_id)
+                indexed_to = 0
+            if stat.st_size > indexed_to:
+                work.append((path, indexed_to))
+        if not work:
+            return 0
+
+        added = 0
+        workers = min(len(work), workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(index_journal_file, *zip(*work))
+            for (path, _), (inode, end, lines) in zip(work, results):
+                self.add(path.name, inode, end, lines)
+                added += len(lines)
+        return added
+
+    def forget(self, file_id: int):
+        with self.db:
+            self.db.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+            self.db.execute("DELETE FROM lines WHERE file_id = ?", (file_id,))
+            self.db.execute("UPDATE files SET indexed_to = 0 WHERE file_id = ?", (file_id,))
+
+    def add(self, name: str, inode: int, end: int, lines: List[IndexedLine]):
+        """Store the indexed lines of one journal and how far it was read."""
+        with self.db:
+            self.db.execute(
+                "INSERT INTO files (name, inode, indexed_to) VALUES (?, ?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET inode = excluded.inode,"
+                " indexed_to = excluded.indexed_to",
+                (name, inode, end),
+            )
+            file_id = self.db.execute("SELECT file_id FROM files WHERE name = ?", (name,)).fetchone()[0]
+            self.db.executemany(
+                "INSERT OR REPLACE INTO lines (file_id, pos, ts, event) VALUES (?, ?, ?, ?)",
+                ((file_id, pos, ts, event) for pos, ts, event, _ in lines),
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO postings (term, file_id, pos) VALUES (?, ?, ?)",
+                ((term, file_id, pos) for pos, _, _, terms in lines for term in terms),
+            )
+
+    def search(self, terms: Iterable[str] = (), since: Optional[int] = None,
+               until: Optional[int] = None, limit: Optional[int] = 100) -> List[Tuple[str, int, Optional[int], str]]:
+        """
+        Return (file name, byte offset, epoch seconds, event type) of the
+        lines matching every term and the time range, oldest first. A term
+        ending in "*" matches any term with that prefix.
+        """
+        selects = []
+        params: list = []
+        for term in terms:
+            if term.endswith("*"):
+                prefix = term[:-1]
+                selects.append("SELECT file_id, pos FROM postings WHERE term >= ? AND term < ?")
+                params += [prefix, prefix + "\U0010ffff"]
+            else:
+                selects.append("SELECT file_id, pos FROM postings WHERE term = ?")
+                params.append(term)
+        if since is not None or until is not None:
+            selects.append("SELECT file_id, pos FROM lines WHERE ts BETWEEN ? AND ?")
+            params += [since if since is not None else -2**62, until if until is not None else 2**62]
+        if not selects:
+            selects.append("SELECT file_id, pos FROM lines")
+        sql = (
+            "SELECT files.name, lines.pos, lines.ts, lines.event FROM ("
+            + " INTERSECT ".join(selects)
+            + ") AS hits JOIN lines USING (file_id, pos) JOIN files USING (file_id)"
+            " ORDER BY lines.ts, files.name, lines.pos"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.db.execute(sql, params).fetchall()
+
+
+def read_line(folder: Path, name: str, offset: int) -> str:
+    """Read back the journal line a search hit points to."""
+    with open(folder / name, "rb") as f:
+        f.seek(offset)
+        return f.readline().decode("utf-8", "replace").rstrip("\r\n")
+
+
+def query_terms(args) -> List[str]:
+    terms = [f"event:{event.lower()}" for event in args.event]
+    terms += [f"system:{system.lower()}" for system in args.system]
+    terms += [f"body:{body.lower()}" for body in args.body]
+    for text in args.text:
+        words = WORD.findall(text.lower())
+        if not words:
+            raise SystemExit(f"Nothing searchable in {text!r}")
+        terms += [f"word:{word}" for word in words]
+    return terms
+
+
+def main(argv: Optional[List[str]] = None, journal_folder: Optional[Path] = None,
+         index_file: Optional[Path] = None):
+    """Update the index and print the matching journal lines."""
+    parser = argparse.ArgumentParser(
+        prog="logtail search", description="Search every Elite Dangerous journal",
+    )
+    parser.add_argument("text", nargs="*", help="words that must all appear in the line")
+    parser.add_argument("--event", action="append", default=[], help="event type, e.g. Scan")
+    parser.add_argument("--system", action="append", default=[], help="StarSystem, a trailing * matches a prefix")
+    parser.add_argument("--body", action="append", default=[], help="BodyName or Body, a trailing * matches a prefix")
+    parser.add_argument("--since", help="start time, e.g. 2024-01-01 or 2024-01-01T12:00:00")
+    parser.add_argument("--until", help="end time")
+    parser.add_argument("--limit", type=int, default=100, help="most hits printed (0 for all)")
+    parser.add_argument("--show", action="store_true", help="print each matching line")
+    parser.add_argument("--no-update", action="store_true", help="search without indexing new lines first")
+    parser.add_argument(
+        "--folder", type=Path,
+        default=journal_folder or Path.home() / "Saved Games" / "Frontier Developments" / "Elite Dangerous",
+    )
+    parser.add_argument(
+        "--index", type=Path,
+        default=index_file or Path(os.getenv("APPDATA", Path.home())) / "EDLogTail" / "journal_index.sqlite3",
+    )
+    args = parser.parse_args(argv)
+
+    times = {}
+    for name in ("since", "until"):
+        value = getattr(args, name)
+        if value is not None:
+            times[name] = parse_timestamp(value)
+            if times[name] is None:
+                parser.error(f"--{name}: not a date or time: {value}")
+
+    index = JournalIndex(args.index)
+    try:
+        if not args.no_update:
+            started = time.perf_counter()
+            added = index.update(args.folder)
+            if added:
+                print(f"⏳ Indexed {added} new lines in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        hits = index.search(query_terms(args), times.get("since"), times.get("until"), args.limit or None)
+        elapsed = time.perf_counter() - started
+    finally:
+        index.close()
+
+    for name, offset, ts, event in hits:
+        when = datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S") if ts is not None else "?"
+        print(f"{name}:{offset}  {when}  {event}")
+        if args.show:
+            try:
+                print(f"    {read_line(args.folder, name, offset)}")
+            except OSError as e:
+                print(f"    ❌ {e}")
+    print(f"🔍 {len(hits)} hits in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Elite Dangerous LogTail - Journal Replay
+Plays recorded journals back, in time order, without the game running.
+
+Journal lines from one or more Journal.*.log files, plus recorded companion
+snapshots, are merged by their "timestamp" field and replayed in real time,
+N times faster, or as fast as possible. A replay can write into a folder, so
+LogTail (or anything else) sees the same file writes the game makes, or feed
+the lines straight into a callback such as LogTail's dispatch pipeline.
+
+Companion snapshots are read from <Name>.jsonl files holding one snapshot
+per line, e.g. Status.jsonl, or from a single <Name>.json file, and are
+written to <Name>.json in the target folder at their own timestamp.
+
+Usage:
+- python journal_replay.py RECORDED_FOLDER TARGET_FOLDER            real time
+- python journal_replay.py RECORDED_FOLDER TARGET_FOLDER --speed 60 one hour per minute
+- python journal_replay.py RECORDED_FOLDER TARGET_FOLDER --speed 0  as fast as possible
+- python logtail.py replay RECORDED_FOLDER --speed 0                straight into LogTail
+"""
+
+import re
+import time
+import heapq
+import argparse
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+TIMESTAMP_FIELD = re.compile(rb'"timestamp"\s*:\s*"([^"]*)"')
+
+# (epoch seconds, source order, line number, kind, file name, payload) of one replayed item
+ReplayItem = Tuple[float, int, int, str, str, bytes]
+
+JOURNAL = "journal"
+COMPANION = "companion"
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(value: bytes) -> Optional[float]:
+    try:
+        return datetime.strptime(value.decode("ascii"), "%Y-%m-%dT%H:%M:%SZ").replace(
+            tzinfo=timezone.utc).timestamp()
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def line_timestamp(line: bytes) -> Optional[float]:
+    match = TIMESTAMP_FIELD.search(line)
+    return parse_timestamp(match.group(1)) if match else None
+
+
+def find_sources(folder: Path) -> List[Path]:
+    """The journals and companion recordings in a folder."""
+    sources = sorted(folder.glob("Journal.*.log"))
+    sources += sorted(folder.glob("*.jsonl"))
+    recorded = {path.stem for path in folder.glob("*.jsonl")}
+    sources += sorted(path for path in folder.glob("*.json") if path.stem not in recorded)
+    return sources
+
+
+def read_source(path: Path, order: int) -> Iterator[ReplayItem]:
+    """
+    Yield the items of one recorded file in file order. Lines without a
+    timestamp keep the previous line's time, so they stay in place.
+    """
+    if path.suffix == ".log":
+        kind, name = JOURNAL, path.name
+    else:
+        kind, name = COMPANION, path.stem + ".json"
+    if path.suffix == ".json":
+        # A single snapshot, possibly pretty-printed over many lines
+        data = path.read_bytes()
+        yield (line_timestamp(data) or 0.0, order, 0, kind, name, data)
+        return
+    last = 0.0
+    with open(path, "rb") as f:
+        for number, line in enumerate(f):
+            line = line.rstrip(b"\r\n")
+            if not line.strip():
+                continue
+            last = line_timestamp(line) or last
+            yield (last, order, number, kind, name, line)
+
+
+class FolderTarget:
+    """Writes replayed items into a folder the way the game does."""
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.journals: Dict[str, object] = {}
+        folder.mkdir(parents=True, exist_ok=True)
+
+    def journal_lines(self, name: str, lines: List[bytes]):
+        f = self.journals.get(name)
+        if f is None:
+            f = self.journals[name] = open(self.folder / name, "ab")
+        f.write(b"".join(line + b"\r\n" for line in lines))
+        f.flush()
+
+    def companion(self, name: str, data: bytes):
+        # The game rewrites companion files in place rather than replacing them
+        with open(self.folder / name, "wb") as f:
+            f.write(data)
+
+    def close(self):
+        for f in self.journals.values():
+            f.close()
+        self.journals.clear()
+
+
+class CallbackTarget:
+    """Passes replayed items to callbacks, e.g. straight into LogTail."""
+    def __init__(self, journal_line: Callable[[str, bytes], None],
+                 companion: Optional[Callable[[str, bytes], None]] = None):
+        self.journal_line = journal_line
+        self.companion_callback = companion
+
+    def journal_lines(self, name: str, lines: List[bytes]):
+        for line in lines:
+            self.journal_line(name, line)
+
+    def companion(self, name: str, data: bytes):
+        if self.companion_callback is not None:
+            self.companion_callback(name, data)
+
+    def close(self):
+        pass
+
+
+class JournalReplayer:
+    """
+    Merges recorded files by timestamp and plays them into a target.
+
+    speed is the playback rate relative to real time, with 0 or None meaning
+    as fast as possible. max_gap caps the recorded pause between two items,
+    so quiet stretches of a session do not stall a real-time replay.
+    """
+    def __init__(self, sources: List[Path], speed: Optional[float] = 1.0,
+                 max_gap: Optional[float] = None):
+        self.sources = sources
+        self.speed = speed
+        self.max_gap = max_gap
+
+    def items(self) -> Iterator[ReplayItem]:
+        return heapq.merge(*(read_source(path, order) for order, path in enumerate(self.sources)))
+
+    def run(self, target, stop: Optional[threading.Event] = None) -> dict:
+        """Replay everything into the target; returns counts and timings."""
+        stop = stop or threading.Event()
+        lines = companions = 0
+        late = 0.0
+        started = time.perf_counter()
+        previous = None
+        virtual = 0.0
+        batch_time = None
+        batch: Dict[str, List[bytes]] = {}
+
+        def flush_batch():
+            for name, batch_lines in batch.items():
+                target.journal_lines(name, batch_lines)
+            batch.clear()
+
+        try:
+            for timestamp, _, _, kind, name, payload in self.items():
+                if stop.is_set():
+                    break
+                if previous and timestamp > previous:
+                    gap = timestamp - previous
+                    virtual += min(gap, self.max_gap) if self.max_gap is not None else gap
+                previous = timestamp if previous is None else max(previous, timestamp)
+
+                if virtual != batch_time:
+                    # Everything stamped with the same second is written together
+                    flush_batch()
+                    batch_time = virtual
+                    if self.speed:
+                        delay = started + virtual / self.speed - time.perf_counter()
+                        if delay > 0:
+                            if stop.wait(delay):
+                                break
+                        else:
+                            late = max(late, -delay)
+
+                if kind == JOURNAL:
+                    batch.setdefault(name, []).append(payload)
+                    lines += 1
+                else:
+                    flush_batch()
+                    target.companion(name, payload)
+                    companions += 1
+            flush_batch()
+        finally:
+            target.close()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "lines": lines,
+            "companion_snapshots": companions,
+            "recorded_seconds": virtual,
+            "elapsed_seconds": elapsed,
+            "lines_per_second": lines / elapsed if elapsed else 0.0,
+            "max_lag_seconds": late,
+        }
+
+
+def print_stats(stats: dict):
+    print(f"▶️ Replayed {stats['lines']} journal lines and {stats['companion_snapshots']} companion"
+          f" snapshots covering {stats['recorded_seconds']:.0f}s in {stats['elapsed_seconds']:.2f}s"
+          f" ({stats['lines_per_second']:,.0f} lines/s, fell behind by at most {stats['max_lag_seconds']:.2f}s)")
+
+
+def replay_args(parser: argparse.ArgumentParser):
+    """Options shared by this script and "logtail.py replay"."""
+    parser.add_argument("source", type=Path, help="folder of recorded journals, or a single journal")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="playback speed, 1 is real time, 0 is as fast as possible")
+    parser.add_argument("--max-gap", type=float, default=None,
+                        help="longest recorded pause replayed, in seconds")
+
+
+def sources_of(path: Path) -> List[Path]:
+    return find_sources(path) if path.is_dir() else [path]
+
+
+def main():
+    """Replay recorded journals into a folder."""
+    parser = argparse.ArgumentParser(description="Replay recorded Elite Dangerous journals")
+    replay_args(parser)
+    parser.add_argument("target", type=Path, help="folder the journals are written to")
+    args = parser.parse_args()
+
+    sources = sources_of(args.source)
+    if not sources:
+        print(f"❌ No journals found in {args.source}")
+        return
+    if any(args.target.resolve() == path.parent.resolve() for path in sources):
+        print("❌ The target folder must not be the recorded folder")
+        return
+    replayer = JournalReplayer(sources, args.speed, args.max_gap)
+    try:
+        stats = replayer.run(FolderTarget(args.target))
+    except KeyboardInterrupt:
+        print("\n🛑 Replay stopped.")
+        return
+    print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,376 @@
 """
 Elite Dangerous LogTail - Standalone Script
 Monitors Odyssey journal files and logs events and their counts.
-Also includes a special search for the term "RAXXLA".
+Also searches every line for a configurable watchlist of terms ("RAXXLA" by default).
 
 Requirements:
 - pip install watchdog
+
+Usage:
+- python logtail.py             tail the latest journal from where it last stopped
+- python logtail.py --backfill  recount every journal in the folder, then tail
+- python logtail.py --watcher polling  detect changes by polling, for network
+  shares and Wine/Proton prefixes where file notifications are unreliable
+- python logtail.py --export FOLDER  also stream events into columnar files,
+  see columnar_export.py
+- python logtail.py --companion Status.json  log the fields that change in a
+  companion file such as Status.json or Cargo.json
+- python logtail.py search --event Scan --system Sol  search every journal,
+  see journal_index.py
+- python logtail.py replay RECORDED_FOLDER --speed 0  replay recorded journals
+  through the counting and dispatch pipeline, see journal_replay.py
+- set LOGTAIL_WEBHOOK to a Discord webhook to be notified of watchlist hits
+  (uses Rackham_Wine/discord_notifier.py, pip install requests)
 """
 
 import os
 import json
 import time
+import re
+import queue
+import hashlib
+import argparse
+import tempfile
 import threading
-from collections import defaultdict
+from collections import defaultdict, Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import sys
+import ctypes
+import heapq
 import logging
-import subprocess
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 # File monitoring
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from polling_observer import AdaptivePollingObserver
+from instrumentation import Metrics, SamplingProfiler, instrument, write_metrics
+from event_stats import EventStatsStore, UNKNOWN_COMMANDER, commander_name, line_minute
+from columnar_export import ColumnarExporter
+import journal_index
+import journal_replay
+
+# The Discord notifier lives with the Rackham monitor and is optional here
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Rackham_Wine"))
+try:
+    from discord_notifier import DiscordNotifier
+except ImportError:
+    DiscordNotifier = None
+
 # Configuration
 CONFIG = {
     "journal_folder": Path.home()
     / "Saved Games"
     / "Frontier Developments"
     / "Elite Dangerous",
-    # Path to the file for persistent event counts
-    "save_file": Path(os.getenv('APPDATA')) / "EDLogTail" / "event_counts.json"
+    # Path to the file for persistent event counts and the journal position
+    "save_file": Path(os.getenv('APPDATA')) / "EDLogTail" / "event_counts.json",
+    # Seconds between appending changed counts to the delta log
+    "save_interval": 30,
+    # Seconds between folding the delta log into a full snapshot
+    "compact_interval": 600,
+    # Most journals read at the same time, one per running game client
+    "max_active_journals": 8,
+    # Most journal positions remembered in the checkpoint
+    "max_tracked_journals": 64,
+    # Snapshot files the game rewrites next to the journals
+    "companion_files": [
+        "Status.json", "Market.json", "Cargo.json", "NavRoute.json",
+        "ModulesInfo.json", "Outfitting.json", "Shipyard.json",
+        "ShipLocker.json", "Backpack.json", "FCMaterials.json",
+    ],
+    # Seconds to wait for a burst of writes to a companion file to settle
+    "companion_debounce": 0.1,
+    # Companion files whose changed fields are logged, "*" logs all of them;
+    # companion files nobody subscribes to are never read
+    "companion_log": [],
+    # How file changes are detected: "watchdog" uses native notifications,
+    # "polling" stats the files, for network shares and Wine/Proton prefixes
+    "watcher_backend": "watchdog",
+    # Fastest and slowest poll interval in seconds for the polling backend
+    "poll_interval": (0.1, 5.0),
+    # Time each stage of the read -> decode -> dispatch path
+    "metrics_enabled": False,
+    # Where metrics are written; a .prom suffix writes Prometheus text format
+    "metrics_file": Path(os.getenv('APPDATA')) / "EDLogTail" / "metrics.json",
+    # Seconds between metrics file updates
+    "metrics_interval": 10,
+    # SQLite database of per-minute/hour/day event counts per commander
+    "stats_file": Path(os.getenv('APPDATA')) / "EDLogTail" / "event_stats.sqlite3",
+    # Days to keep each stats resolution for, None keeps it forever
+    "stats_retention": {"minute": 7, "hour": 365, "day": None},
+    # Inverted index used by "logtail.py search"
+    "index_file": Path(os.getenv('APPDATA')) / "EDLogTail" / "journal_index.sqlite3",
+    # Discord webhook for watchlist hits, None disables notifications
+    "discord_webhook": os.getenv("LOGTAIL_WEBHOOK"),
+    # Discord alerts not delivered yet, retried on the next run
+    "discord_outbox": Path(os.getenv('APPDATA')) / "EDLogTail" / "discord_outbox.json",
+    # Folder for columnar per-event-type exports, None disables exporting
+    "export_folder": None,
+    # Event types exported, "*" exports every event
+    "export_events": ["*"],
+    # Events per export part file
+    "export_batch_size": 5000,
+    # Terms searched for in every raw journal line (system names, body names,
+    # commodity names, ...), ignoring the case of ASCII letters
+    "watchlist": ["RAXXLA"],
+    # Watchlist terms that stop LogTail once they are found
+    "stop_on_match": ["RAXXLA"],
+    # Seconds between live dashboard refreshes
+    "refresh_interval": 2.0,
+    # Number of event types shown on the live dashboard
+    "dashboard_top_n": 20,
 }
 
-# Logging setup
+# Logging setup; the log file is only created once something is logged
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(), logging.FileHandler("elite_log_tail.log")],
+    handlers=[logging.StreamHandler(), logging.FileHandler("elite_log_tail.log", delay=True)],
 )
 logger = logging.getLogger(__name__)
 
+# Matches the event type in a raw journal line without decoding the rest
+EVENT_FIELD = re.compile(rb'"event"\s*:\s*"([^"\\]*)"')
+
+# Subscribing to this event type receives every decoded entry
+ALL_EVENTS = "*"
+
+# Events that name the commander writing the journal
+COMMANDER_EVENTS = ("Commander", "LoadGame")
+
+
+def journal_positions(checkpoint: Optional[dict]) -> Optional[list]:
+    """The per-journal part of a checkpoint, ignoring when it was taken."""
+    return checkpoint.get("journals") if checkpoint else None
+
+
+def extract_event_type(line: bytes) -> Optional[str]:
+    """Return the "event" field of a raw journal line, or None if not found."""
+    match = EVENT_FIELD.search(line)
+    return match.group(1).decode("utf-8") if match else None
+
+class Watchlist:
+    """
+    Matches a set of case-insensitive terms against raw journal lines.
+
+    All terms are compiled into a single bytes regex, so each line is scanned
+    once without being decoded or re-serialized. Terms and lines are folded
+    the same way, with bytes.lower(), so only ASCII letters match regardless
+    of case; other letters have to be written as they appear in the journal.
+    Callbacks receive the configured term and the raw line for every match.
+    """
+    def __init__(self, terms: Iterable[str]):
+        self.terms = {term.encode("utf-8").lower(): term for term in terms}
+        self.callbacks: List[Callable[[str, bytes], None]] = []
+        self.pattern = None
+        if self.terms:
+            # Lowercasing the line first is much cheaper than re.IGNORECASE
+            self.pattern = re.compile(b"|".join(re.escape(term) for term in self.terms))
+
+    def add_callback(self, callback: Callable[[str, bytes], None]):
+        self.callbacks.append(callback)
+
+    def scan(self, line: bytes) -> List[str]:
+        """Return the terms found in the line and notify the callbacks."""
+        if self.pattern is None:
+            return []
+        lowered = line.lower()
+        if not self.pattern.search(lowered):
+            return []
+        found = list(dict.fromkeys(self.terms[match] for match in self.pattern.findall(lowered)))
+        for term in found:
+            for callback in self.callbacks:
+                callback(term, line)
+        return found
+
+
+class EventHandler:
+    """
+    Wraps a handler function with timing and an optional worker thread.
+
+    Inline handlers run on the thread that read the journal. Threaded
+    handlers get their own bounded queue, so a slow handler (a webhook post,
+    for example) never stalls the watchdog observer; entries that arrive
+    while the queue is full are dropped and counted. Handlers that must see
+    every entry pass block=True instead, and a full queue then makes the
+    reading thread wait for the handler to catch up.
+    """
+    def __init__(self, func: Callable[..., None], name: Optional[str] = None,
+                 threaded: bool = False, max_queue: int = 1000, block: bool = False):
+        self.func = func
+        self.name = name or getattr(func, "__qualname__", repr(func))
+        self.calls = 0
+        self.errors = 0
+        self.dropped = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.block = block
+        self.queue: Optional[queue.Queue] = None
+        self.thread: Optional[threading.Thread] = None
+        if threaded:
+            self.queue = queue.Queue(maxsize=max_queue)
+            self.thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+            self.thread.start()
+
+    def submit(self, *args):
+        """Run the handler now, or queue its arguments for the worker thread."""
+        if self.queue is None:
+            self._run(*args)
+            return
+        if self.block:
+            self.queue.put(args)
+            return
+        try:
+            self.queue.put_nowait(args)
+        except queue.Full:
+            if not self.dropped:
+                logger.warning("Handler %s is falling behind, dropping events", self.name)
+            self.dropped += 1
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Let a threaded handler drain its queue and exit."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "calls": self.calls,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "avg_ms": 1000 * self.total_time / self.calls if self.calls else 0.0,
+            "max_ms": 1000 * self.max_time,
+        }
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            self._run(*item)
+
+    def _run(self, *args):
+        started = time.perf_counter()
+        try:
+            self.func(*args)
+        except Exception as e:
+            self.errors += 1
+            logger.error("Handler %s failed: %s", self.name, e)
+        elapsed = time.perf_counter() - started
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+
+class CountStore:
+    """
+    Crash-safe storage for event counts and the journal checkpoint.
+
+    Full snapshots are written to a temporary file and renamed over the save
+    file, so a crash never leaves it half-written. Between snapshots only
+    the counts that changed are appended to a delta log, one JSON line per
+    save. Every record carries a sequence number; on load the snapshot is
+    read first and newer delta records are replayed on top of it.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.delta_path = path.with_suffix(".delta")
+        self.seq = 0
+
+    def load(self) -> Tuple[Dict[str, int], Optional[dict]]:
+        """Return the saved counts and checkpoint, or empty ones if none exist."""
+        counts: Dict[str, int] = {}
+        checkpoint = None
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError as e:
+                corrupt = self.path.with_suffix(".corrupt")
+                logger.error("Event count snapshot is corrupt, moved to %s: %s", corrupt, e)
+                os.replace(self.path, corrupt)
+                data = {}
+            # Older saves were a flat {event: count} mapping
+            if "counts" not in data:
+                data = {"seq": 0, "counts": data}
+            counts.update(data["counts"])
+            checkpoint = data.get("checkpoint")
+            self.seq = data.get("seq", 0)
+
+        if self.delta_path.exists():
+            with open(self.delta_path, "r+b") as f:
+                good_offset = 0
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final write from a crash, everything before it is intact
+                        logger.warning("Dropping incomplete record in %s", self.delta_path)
+                        f.truncate(good_offset)
+                        break
+                    good_offset += len(line)
+                    if record["seq"] <= self.seq:
+                        continue
+                    counts.update(record["counts"])
+                    checkpoint = record.get("checkpoint", checkpoint)
+                    self.seq = record["seq"]
+        return counts, checkpoint
+
+    def append(self, changed: Dict[str, int], checkpoint: Optional[dict]):
+        """Append the changed counts and current checkpoint to the delta log."""
+        self.seq += 1
+        record = {"seq": self.seq, "counts": changed, "checkpoint": checkpoint}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.delta_path, "ab") as f:
+            f.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, counts: Dict[str, int], checkpoint: Optional[dict]):
+        """Atomically write a full snapshot and empty the delta log."""
+        self.seq += 1
+        data = {"seq": self.seq, "counts": counts, "checkpoint": checkpoint}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        # Records left behind by a crash here are older than the snapshot and skipped
+        with open(self.delta_path, "wb") as f:
+            os.fsync(f.fileno())
+
+
 class LogTail:
     """
     Class to monitor Elite Dangerous journal files for events and log counts.
     """
     def __init__(self):
         self.event_counts = defaultdict(int)
+        self.store = CountStore(CONFIG["save_file"])
+        self.saved_checkpoint: Optional[dict] = None
         self.load_counts()
+        self.stats = EventStatsStore(CONFIG["stats_file"], CONFIG["stats_retention"])
         self.raxxla_found = threading.Event()
+        self.watchlist = Watchlist(CONFIG["watchlist"])
+        self.watchlist.add_callback(self.on_watchlist_match)
+        self.subscribers: Dict[str, List[EventHandler]] = defaultdict(list)
+        self.handlers: List[EventHandler] = []
+        self.change_sets: List[set] = []
+        # Guards change_sets, which the dashboard swaps out while lines are counted
+        self.changes_lock = threading.Lock()
+        self.save_tracker = self.track_changes()
+        self.metrics = Metrics(CONFIG["metrics_enabled"])
+        self.decode = json.loads
+        instrument(self, "decode", self.metrics, "json_decode")
+        instrument(self.watchlist, "scan", self.metrics, "watchlist_scan")
+        instrument(self.stats, "record", self.metrics, "stats_record")
+        instrument(self, "dispatch", self.metrics)
 
         print("=" * 60)
         print("Elite Dangerous LogTail - Standalone")
@@ -56,74 +381,339 @@ class LogTail:
         print("-" * 60)
 
     def load_counts(self):
-        """Loads event counts from the save file if it exists."""
+        """Loads event counts and the journal checkpoint from the save file."""
         try:
-            if CONFIG["save_file"].exists():
-                with open(CONFIG["save_file"], "r", encoding="utf-8") as f:
-                    saved_counts = json.load(f)
-                    for event, count in saved_counts.items():
-                        self.event_counts[event] = count
+            counts, self.saved_checkpoint = self.store.load()
+            if counts:
+                self.event_counts.update(counts)
                 logger.info("Loaded previous event counts from %s", CONFIG["save_file"])
             else:
                 logger.info("No previous event counts found, starting from zero.")
         except Exception as e:
             logger.error("Error loading event counts: %s", e)
 
-    def save_counts(self):
-        """Saves the current event counts to the save file."""
+    def collect_changes(self) -> Dict[str, int]:
+        """Return the current count of every event type changed since the last save."""
+        return {event: self.event_counts[event] for event in self.take_changes(self.save_tracker)}
+
+    def save_counts(self, changed: Dict[str, int], checkpoint: Optional[dict],
+                    counts: Optional[Dict[str, int]] = None,
+                    stats: Optional[Counter] = None):
+        """
+        Saves the changed counts to the delta log, or a full snapshot of
+        counts when given. The checkpoint is saved alongside so the counts
+        and the journal position can never disagree after a restart.
+        Pending time-bucketed stats are written at the same time.
+        """
         try:
-            # Ensure the directory exists
-            CONFIG["save_file"].parent.mkdir(parents=True, exist_ok=True)
-            with open(CONFIG["save_file"], "w", encoding="utf-8") as f:
-                # Convert defaultdict to dict for JSON serialization
-                json.dump(dict(self.event_counts), f, indent=4)
-            logger.info("Saved current event counts to %s", CONFIG["save_file"])
+            if counts is not None:
+                self.store.compact(counts, checkpoint)
+                logger.info("Saved current event counts to %s", CONFIG["save_file"])
+            elif changed or journal_positions(checkpoint) != journal_positions(self.saved_checkpoint):
+                self.store.append(changed, checkpoint)
+            self.saved_checkpoint = checkpoint
         except Exception as e:
             logger.error("Error saving event counts: %s", e)
+        try:
+            self.stats.flush(stats)
+            if counts is not None:
+                self.stats.prune()
+        except Exception as e:
+            logger.error("Error saving event statistics: %s", e)
+
+    def subscribe(self, event_types: Iterable[str], func: Callable[[dict, Optional[str]], None],
+                  name: Optional[str] = None, threaded: bool = False,
+                  max_queue: int = 1000, block: bool = False) -> EventHandler:
+        """
+        Register a handler for the given event types, or ALL_EVENTS.
+
+        Handlers are called with the decoded entry and the name of the
+        commander whose journal it came from (empty if not yet known, None
+        if the entry did not come from a journal file).
+        Only subscribed event types are fully decoded; everything else is
+        counted straight from the raw line. Pass threaded=True for handlers
+        that may block, so they run on their own worker thread, and
+        block=True as well if they must not miss entries when they fall behind.
+        """
+        handler = EventHandler(func, name, threaded, max_queue, block)
+        self.handlers.append(handler)
+        for event_type in event_types:
+            self.subscribers[event_type].append(handler)
+        return handler
+
+    def track_changes(self) -> int:
+        """Start recording which event types change; returns a tracker id."""
+        with self.changes_lock:
+            self.change_sets.append(set())
+            return len(self.change_sets) - 1
+
+    def take_changes(self, tracker: int) -> set:
+        """Return the event types changed since the last call for this tracker."""
+        with self.changes_lock:
+            changed = self.change_sets[tracker]
+            self.change_sets[tracker] = set()
+        return changed
+
+    def count_event(self, event_type: str):
+        with self.changes_lock:
+            self.event_counts[event_type] += 1
+            for changed in self.change_sets:
+                changed.add(event_type)
+
+    def handler_metrics(self) -> Dict[str, dict]:
+        """Queue depth and latency of every registered handler."""
+        return {handler.name: handler.metrics() for handler in self.handlers}
+
+    def stop_handlers(self):
+        """Stop all handler worker threads once their queues are drained."""
+        for handler in self.handlers:
+            handler.stop()
 
-    def process_journal_entry(self, entry: dict):
-        """Process a journal entry and count its event type."""
+    def wants_payload(self, event_type: str) -> bool:
+        """Check whether any handler needs the decoded entry for this event type."""
+        return event_type in self.subscribers or ALL_EVENTS in self.subscribers
+
+    def process_journal_line(self, line: bytes, reader: Optional["JournalReader"] = None):
+        """
+        Scan a raw journal line for watched terms, then count and dispatch it.
+
+        The reader the line came from tracks which commander wrote it.
+        """
+        self.watchlist.scan(line)
+        event_type = extract_event_type(line)
+        entry = None
+        if event_type is None:
+            # Unusual layout, fall back to a full decode to find the event
+            entry = self.decode(line)
+            if not isinstance(entry, dict):
+                raise ValueError(f"journal line is a JSON {type(entry).__name__}, not an object")
+            event_type = entry.get("event")
+            if not event_type:
+                return
+
+        commander = None
+        if reader is not None:
+            if event_type in COMMANDER_EVENTS:
+                reader.commander = commander_name(event_type, line) or reader.commander
+            commander = reader.commander
+
+        self.count_event(event_type)
+        self.stats.record(event_type, line, commander)
+        if self.wants_payload(event_type):
+            self.dispatch(event_type, entry if entry is not None else self.decode(line), commander)
+
+    def process_journal_entry(self, entry: dict, commander: Optional[str] = None):
+        """Process a decoded journal entry and count its event type."""
         event_type = entry.get("event")
         if event_type:
-            self.event_counts[event_type] += 1
-            
-        # Check for the term "RAXXLA" in the entire line
-        line_str = json.dumps(entry)
-        if "RAXXLA" in line_str.upper():
-            logger.critical("RAXXLA DETECTED! Full event line: %s", line_str)
-            print("\n\n" + "!"*60)
-            print("!!! RAXXLA FOUND !!!")
-            print("!!!" + line_str + "!!!")
-            print("!"*60 + "\n")
+            self.count_event(event_type)
+            self.dispatch(event_type, entry, commander)
+
+    def dispatch(self, event_type: str, entry: dict, commander: Optional[str] = None):
+        """Pass a decoded entry to every handler subscribed to it."""
+        for handler in self.subscribers.get(event_type, ()):
+            handler.submit(entry, commander)
+        for handler in self.subscribers.get(ALL_EVENTS, ()):
+            handler.submit(entry, commander)
+
+    def on_watchlist_match(self, term: str, line: bytes):
+        """Report a watchlist hit and stop if the term is a stopping one."""
+        line_str = line.decode("utf-8", errors="replace").strip()
+        logger.critical("%s DETECTED! Full event line: %s", term.upper(), line_str)
+        print("\n\n" + "!"*60)
+        print(f"!!! {term.upper()} FOUND !!!")
+        print("!!!" + line_str + "!!!")
+        print("!"*60 + "\n")
+        if term.upper() in (t.upper() for t in CONFIG["stop_on_match"]):
             self.raxxla_found.set() # Set the event to stop the main loop
-            
+
+
+class JournalReader:
+    """
+    Incrementally reads complete lines from a single journal file.
+
+    The file is read in binary mode from the last byte offset. Any trailing
+    bytes after the final newline are kept in a carry buffer until the game
+    finishes writing that line, so half-written entries are never dropped.
+    The file is only open while reading, so idle readers hold no handles.
+    """
+    def __init__(self, path: Path, offset: int = 0, inode: Optional[int] = None):
+        self.path = path
+        self.offset = offset
+        self.inode = inode
+        self.carry = b""
+        self.commander = UNKNOWN_COMMANDER
+        if offset:
+            self.commander = self.find_commander() or UNKNOWN_COMMANDER
+
+    def find_commander(self) -> Optional[str]:
+        """Look for the commander name near the start of the file."""
+        try:
+            with open(self.path, "rb") as f:
+                head = f.read(65536)
+        except OSError:
+            return None
+        for line in head.split(b"\n")[:-1]:
+            event_type = extract_event_type(line)
+            if event_type in COMMANDER_EVENTS:
+                try:
+                    return commander_name(event_type, line)
+                except json.JSONDecodeError:
+                    return None
+        return None
+
+    def read_lines(self) -> List[bytes]:
+        """Return every complete line appended since the previous call."""
+        stat = self.path.stat()
+        if self.inode is not None and stat.st_ino != self.inode or stat.st_size < self.offset:
+            # The file was replaced or truncated, start again from the top
+            logger.warning("Journal file %s was replaced, rereading from start", self.path)
+            self.offset = 0
+            self.carry = b""
+        self.inode = stat.st_ino
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+
+        lines = (self.carry + data).split(b"\n")
+        # The last element is either empty or an incomplete line
+        self.carry = lines.pop()
+        return [line for line in lines if line.strip()]
+
+    def checkpoint(self) -> dict:
+        """Return the position of the first byte not yet fully processed."""
+        return {
+            "file": self.path.name,
+            "inode": self.inode,
+            "offset": self.offset - len(self.carry),
+        }
+
 
 class JournalMonitor(FileSystemEventHandler):
     """
     A custom event handler for watchdog that processes new journal file entries.
+
+    Every journal that is being written gets its own reader, so several game
+    clients can run at once and each event is attributed to the commander
+    of the file it came from. At most max_active readers are kept; the
+    least recently used one is dropped and resumes from its saved position
+    if that journal is written to again.
     """
-    def __init__(self, log_tail: LogTail):
+    def __init__(self, log_tail: LogTail, checkpoint: Optional[dict] = None,
+                 max_active: Optional[int] = None):
         self.log_tail = log_tail
-        self.current_file = None
-        self.file_position = 0
-        self.find_latest_journal()
+        self.max_active = max_active or CONFIG["max_active_journals"]
+        self.readers: "OrderedDict[Path, JournalReader]" = OrderedDict()
+        # Last known checkpoint of every tracked journal, active or not
+        self.positions: "OrderedDict[str, dict]" = OrderedDict()
+        self.lock = threading.Lock()
+        metrics = log_tail.metrics
+        instrument(self, "read_new_lines", metrics, "watchdog_callback")
+        instrument(self, "save_state", metrics)
+        self.find_latest_journal(checkpoint)
+
+    @property
+    def current_file(self) -> Optional[Path]:
+        """The journal that was read most recently."""
+        return next(reversed(self.readers), None)
+
+    def checkpoint(self) -> dict:
+        """Return the positions of all tracked journals. Call with the lock held."""
+        for reader in self.readers.values():
+            self.track_position(reader.checkpoint())
+        return {"saved_at": time.time(), "journals": list(self.positions.values())}
+
+    def track_position(self, position: dict):
+        self.positions[position["file"]] = position
+        self.positions.move_to_end(position["file"])
+        while len(self.positions) > CONFIG["max_tracked_journals"]:
+            self.positions.popitem(last=False)
+
+    def save_state(self, compact: bool = False):
+        """
+        Persist the event counts together with the current journal positions.
 
-    def find_latest_journal(self):
-        """Find the most recent journal file and start monitoring it."""
+        Both are captured under the read lock so the saved counts match the
+        checkpoint exactly; the file I/O happens after the lock is released.
+        """
+        with self.lock:
+            checkpoint = self.checkpoint()
+            changed = self.log_tail.collect_changes()
+            counts = dict(self.log_tail.event_counts) if compact else None
+            stats = self.log_tail.stats.take_pending()
+        self.log_tail.save_counts(changed, checkpoint, counts, stats)
+
+    def find_latest_journal(self, checkpoint: Optional[dict] = None):
+        """
+        Find the active journal files and start monitoring them.
+
+        If a checkpoint is given or one from a previous run is available, any
+        journal lines written since then are processed first, so no events
+        are lost. Journals created after the checkpoint are read in full.
+        Without a checkpoint, the most recent journals are tailed from their
+        current end.
+        """
         try:
-            journal_files = list(CONFIG["journal_folder"].glob("Journal.*.log"))
-            if journal_files:
-                latest_journal = max(journal_files, key=lambda x: x.stat().st_mtime)
-                self.current_file = latest_journal
-                self.file_position = latest_journal.stat().st_size
-                logger.info("Monitoring journal file: %s", latest_journal)
-                print(f"📖 Monitoring: {latest_journal.name}")
-            else:
+            journal_files = sorted(
+                CONFIG["journal_folder"].glob("Journal.*.log"),
+                key=lambda x: x.stat().st_mtime,
+            )
+            if not journal_files:
                 logger.warning("No journal files found")
                 print("⚠️  No journal files found")
+                return
+
+            checkpoint = checkpoint or self.log_tail.saved_checkpoint or {}
+            if "file" in checkpoint:
+                # Single-journal checkpoint from an older version
+                checkpoint = {"journals": [checkpoint]}
+            for position in checkpoint.get("journals", []):
+                self.track_position(position)
+            saved_at = checkpoint.get("saved_at")
+            if saved_at is None and self.positions:
+                known = [path for path in journal_files if path.name in self.positions]
+                saved_at = known[-1].stat().st_mtime if known else None
+
+            recent = set(journal_files[-self.max_active:])
+            for path in journal_files:
+                if path.name in self.positions:
+                    pass
+                elif saved_at is not None and path.stat().st_mtime > saved_at:
+                    self.track_position({"file": path.name, "inode": None, "offset": 0})
+                elif path in recent:
+                    stat = path.stat()
+                    self.track_position({"file": path.name, "inode": stat.st_ino, "offset": stat.st_size})
+                else:
+                    continue
+                self.read_new_lines(path)
+
+            for path in self.readers:
+                logger.info("Monitoring journal file: %s (%s)", path, self.readers[path].commander)
+                print(f"📖 Monitoring: {path.name}")
         except Exception as e:
             logger.error("Error finding journal files: %s", e)
 
+    def get_reader(self, file_path: Path) -> JournalReader:
+        """Return the reader for a journal, creating it from its saved position."""
+        reader = self.readers.get(file_path)
+        if reader is None:
+            position = self.positions.get(file_path.name)
+            if position and position["inode"] in (None, file_path.stat().st_ino):
+                reader = JournalReader(file_path, position["offset"], position["inode"])
+            else:
+                reader = JournalReader(file_path)
+            instrument(reader, "read_lines", self.log_tail.metrics, "file_read", count_items=True)
+            self.readers[file_path] = reader
+            while len(self.readers) > self.max_active:
+                _, evicted = self.readers.popitem(last=False)
+                self.track_position(evicted.checkpoint())
+        self.readers.move_to_end(file_path)
+        return reader
+
     def on_modified(self, event):
         """Called when a file is modified."""
         if not event.is_directory and Path(event.src_path).name.startswith("Journal."):
@@ -134,67 +724,583 @@ class JournalMonitor(FileSystemEventHandler):
         if not event.is_directory and Path(event.src_path).name.startswith("Journal."):
             file_path = Path(event.src_path)
             print(f"\n📖 New journal file detected: {file_path.name}")
-            self.current_file = file_path
-            self.file_position = 0
+            with self.lock:
+                if file_path.name not in self.positions:
+                    self.track_position({"file": file_path.name, "inode": None, "offset": 0})
             self.read_new_lines(file_path)
 
     def read_new_lines(self, file_path: Path):
-        """Read and process new lines from the journal file."""
+        """Read and process new lines from a journal file."""
+        try:
+            with self.lock:
+                reader = self.get_reader(file_path)
+                self._process_lines(reader, reader.read_lines())
+        except Exception as e:
+            logger.error("Error reading journal file: %s", e)
+
+    def _process_lines(self, reader: JournalReader, lines: List[bytes]):
+        for line in lines:
+            try:
+                self.log_tail.process_journal_line(line, reader)
+            except Exception as e:
+                # The reader is already past the whole batch, so one bad line
+                # must not take the lines after it down with it
+                logger.warning("Skipping malformed journal line (%s): %r", e, line[:200])
+                self.log_tail.metrics.count("malformed_lines")
+
+class CompanionWatcher(FileSystemEventHandler):
+    """
+    Watches the JSON snapshot files the game keeps next to the journals.
+
+    Bursts of watchdog events for a file are debounced into a single read
+    on a worker thread. A file whose size and mtime, or failing that whose
+    content hash, has not changed is not parsed again. Handlers only get
+    the fields that changed, as {"Fuel.FuelMain": (old, new), ...}, with
+    nested objects flattened into dotted names. Files nobody subscribed to
+    are never read, and the worker thread only runs after start().
+    """
+    IGNORED_FIELDS = ("timestamp", "event")
+
+    def __init__(self, folder: Path, names: Iterable[str], debounce: float = 0.1):
+        self.folder = folder
+        self.names = set(names)
+        self.debounce = debounce
+        self.signatures: Dict[str, Tuple[int, int]] = {}
+        self.hashes: Dict[str, bytes] = {}
+        self.snapshots: Dict[str, dict] = {}
+        self.subscribers: Dict[str, List[EventHandler]] = defaultdict(list)
+        self.handlers: List[EventHandler] = []
+        self.pending: Dict[str, float] = {}
+        self.retries: Counter = Counter()
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread: Optional[threading.Thread] = None
+
+    def subscribe(self, names: Iterable[str], func: Callable[[str, dict], None],
+                  name: Optional[str] = None, threaded: bool = False,
+                  max_queue: int = 1000, block: bool = False) -> EventHandler:
+        """Register a handler called with (file name, changed fields)."""
+        handler = EventHandler(func, name, threaded, max_queue, block)
+        self.handlers.append(handler)
+        for file_name in names:
+            self.subscribers[file_name].append(handler)
+        return handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self._worker, name="CompanionWatcher", daemon=True)
+        self.thread.start()
+
+    def on_modified(self, event):
+        """Called when a file is modified."""
+        if not event.is_directory:
+            self.schedule(Path(event.src_path).name)
+
+    def on_created(self, event):
+        """Called when a new file is created."""
+        self.on_modified(event)
+
+    def on_moved(self, event):
+        """Called when a file is renamed, e.g. an atomic replace by the game."""
+        if not event.is_directory:
+            self.schedule(Path(event.dest_path).name)
+
+    def schedule(self, name: str):
+        """Queue a file to be read once its burst of writes has settled."""
+        if name not in self.names or not (name in self.subscribers or ALL_EVENTS in self.subscribers):
+            return
+        with self.condition:
+            if name not in self.pending:
+                self.pending[name] = time.monotonic() + self.debounce
+                self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        for handler in self.handlers:
+            handler.stop()
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                now = time.monotonic()
+                due = [name for name, deadline in self.pending.items() if deadline <= now]
+                if not due:
+                    self.condition.wait(min(self.pending.values()) - now)
+                    continue
+                for name in due:
+                    del self.pending[name]
+            for name in due:
+                self.check_file(name)
+
+    def check_file(self, name: str):
+        """Read a companion file if it changed and notify its subscribers."""
+        path = self.folder / name
         try:
-            if file_path != self.current_file:
+            stat = path.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self.signatures.get(name) == signature or not stat.st_size:
                 return
+            data = path.read_bytes()
+        except OSError:
+            return
+        try:
+            self.update(name, data)
+        except json.JSONDecodeError:
+            # Caught the game mid-write, look again shortly
+            self.retries[name] += 1
+            if self.retries[name] <= 3:
+                self.schedule(name)
+            return
+        self.retries.pop(name, None)
+        self.signatures[name] = signature
 
-            with open(file_path, "r", encoding="utf-8") as f:
-                f.seek(self.file_position)
-                new_lines = f.readlines()
-                self.file_position = f.tell()
+    def update(self, name: str, data: bytes):
+        """
+        Diff a new snapshot of a companion file against the previous one and
+        notify the subscribers. Raises JSONDecodeError for an incomplete one.
+        """
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if self.hashes.get(name) == digest:
+            return
+        snapshot = json.loads(data)
+        self.hashes[name] = digest
 
-            for line in new_lines:
-                line = line.strip()
-                if line:
-                    try:
-                        self.log_tail.process_journal_entry(json.loads(line))
-                    except json.JSONDecodeError:
-                        # This can happen with incomplete lines being written
-                        pass
-        except Exception as e:
-            logger.error("Error reading journal file: %s", e)
+        changes = diff_fields(self.snapshots.get(name, {}), snapshot, self.IGNORED_FIELDS)
+        self.snapshots[name] = snapshot
+        if changes:
+            for handler in self.subscribers.get(name, ()):
+                handler.submit(name, changes)
+            for handler in self.subscribers.get(ALL_EVENTS, ()):
+                handler.submit(name, changes)
+
+
+def diff_fields(old: dict, new: dict, ignored: Iterable[str] = (), prefix: str = "") -> dict:
+    """Return {dotted field name: (old value, new value)} for every changed field."""
+    changes = {}
+    for key in old.keys() | new.keys():
+        if key in ignored:
+            continue
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            changes.update(diff_fields(before, after, (), f"{prefix}{key}."))
+        else:
+            changes[prefix + key] = (before, after)
+    return changes
+
+
+def log_companion_changes(name: str, changes: dict):
+    """Log the fields that changed in a companion file."""
+    fields = ", ".join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in sorted(changes.items()))
+    logger.info("%s changed: %s", name, fields)
+
+
+def count_journal_file(path: Path) -> Tuple[Dict[str, int], Counter, int, int]:
+    """
+    Count the events in one journal file.
+
+    Returns the counts and per-minute stats buckets along with the inode and
+    the byte offset just past the last complete line, so live tailing can
+    carry on from exactly that point.
+    """
+    counts = Counter()
+    buckets = Counter()
+    commander = ""
+    with open(path, "rb") as f:
+        data = f.read()
+        inode = os.fstat(f.fileno()).st_ino
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        event_type = extract_event_type(line)
+        if event_type is None:
+            try:
+                event_type = json.loads(line).get("event")
+            except json.JSONDecodeError:
+                continue
+        if not event_type:
+            continue
+        counts[event_type] += 1
+        commander = commander_name(event_type, line) or commander
+        minute = line_minute(line)
+        if minute is not None:
+            buckets[commander, event_type, minute] += 1
+    return dict(counts), buckets, inode, end
+
+
+def backfill_counts(log_tail: LogTail, workers: Optional[int] = None) -> Optional[dict]:
+    """
+    Recount every event in the journal folder using a process pool.
+
+    The historical totals replace the saved event counts. Returns a
+    checkpoint at the end of the latest journal for the live monitor.
+    """
+    journal_files = sorted(
+        CONFIG["journal_folder"].glob("Journal.*.log"),
+        key=lambda x: x.stat().st_mtime,
+    )
+    if not journal_files:
+        return None
+
+    print(f"⏳ Backfilling {len(journal_files)} journal files...")
+    started = time.perf_counter()
+    totals = Counter()
+    workers = workers or os.cpu_count() or 1
+    # Bigger chunks keep the pickling overhead down on large archives
+    chunksize = max(1, len(journal_files) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(count_journal_file, journal_files, chunksize=chunksize))
+    log_tail.stats.clear()
+    for counts, buckets, _, _ in results:
+        totals.update(counts)
+        log_tail.stats.add_counts(buckets)
+
+    log_tail.event_counts.clear()
+    log_tail.event_counts.update(totals)
+    logger.info(
+        "Backfilled %d events from %d journal files in %.1fs",
+        sum(totals.values()), len(journal_files), time.perf_counter() - started,
+    )
+
+    positions = [
+        {"file": path.name, "inode": inode, "offset": offset}
+        for path, (_, _, inode, offset) in zip(journal_files, results)
+    ]
+    return {"saved_at": time.time(), "journals": positions[-CONFIG["max_tracked_journals"]:]}
+
+
+class Dashboard:
+    """
+    In-place terminal view of the most frequent event types and their rates.
+
+    Only rows whose text changed since the last refresh are rewritten, using
+    ANSI cursor movement instead of clearing the screen. The top-N ranking is
+    updated from the event types that changed, so a refresh costs the same
+    however many distinct event types have been seen.
+    """
+    def __init__(self, log_tail: LogTail, top_n: int = 20):
+        self.log_tail = log_tail
+        self.top_n = top_n
+        self.tracker = log_tail.track_changes()
+        self.snapshot = dict(log_tail.event_counts)
+        self.total = sum(self.snapshot.values())
+        self.top = heapq.nlargest(top_n, self.snapshot, key=self.snapshot.get)
+        self.lines: List[str] = []
+        self.last_refresh = time.monotonic()
+        self.started = self.last_refresh
+        enable_ansi()
+        sys.stdout.write("\x1b[2J\x1b[?25l")
+
+    def refresh(self):
+        """Redraw the rows that changed since the previous refresh."""
+        now = time.monotonic()
+        elapsed = max(now - self.last_refresh, 1e-6)
+        self.last_refresh = now
+
+        counts = self.log_tail.event_counts
+        changed = self.log_tail.take_changes(self.tracker)
+        rates = {}
+        for event_type in changed:
+            count = counts[event_type]
+            delta = count - self.snapshot.get(event_type, 0)
+            rates[event_type] = delta / elapsed
+            self.total += delta
+            self.snapshot[event_type] = count
+        # Counts only grow, so a type can only enter the top N if it changed
+        candidates = set(self.top) | changed
+        self.top = heapq.nlargest(self.top_n, candidates, key=self.snapshot.get)
+
+        lines = [
+            "Live Event Counts",
+            f" total: {self.total:,}  rate: {sum(rates.values()):.1f}/s"
+            f"  uptime: {int(now - self.started)}s",
+            "",
+        ]
+        for event_type in self.top:
+            lines.append(
+                f" {event_type:<32} {self.snapshot[event_type]:>10,}"
+                f" {rates.get(event_type, 0.0):>8.1f}/s"
+            )
+        for name, stats in self.log_tail.handler_metrics().items():
+            lines.append(
+                f" [{name}] queue={stats['queue_depth']} dropped={stats['dropped']}"
+                f" avg={stats['avg_ms']:.1f}ms max={stats['max_ms']:.1f}ms"
+            )
+        self.draw(lines)
+
+    def draw(self, lines: List[str]):
+        out = []
+        for row, line in enumerate(lines):
+            if row >= len(self.lines) or self.lines[row] != line:
+                out.append(f"\x1b[{row + 1};1H{line}\x1b[K")
+        # Blank out rows left over from a longer previous frame
+        for row in range(len(lines), len(self.lines)):
+            out.append(f"\x1b[{row + 1};1H\x1b[K")
+        out.append(f"\x1b[{len(lines) + 1};1H")
+        self.lines = lines
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
+
+    def close(self):
+        """Restore the cursor below the dashboard."""
+        sys.stdout.write(f"\x1b[{len(self.lines) + 1};1H\x1b[?25h\n")
+        sys.stdout.flush()
+
+
+def enable_ansi():
+    """Turn on ANSI escape handling in the Windows console."""
+    if os.name != "nt":
+        return
+    try:
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11) # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)
+    except Exception as e:
+        logger.warning("Could not enable ANSI console mode: %s", e)
+
+def replay_journals(argv: List[str]):
+    """
+    Replay recorded journals straight into a LogTail, then report the
+    throughput and final counts. Recorded companion snapshots go through a
+    CompanionWatcher, which logs the files in companion_log like the live
+    run does. The replay counts into throwaway files, so the real counts
+    and stats are untouched. To exercise the file watcher as well, replay
+    into a folder with journal_replay.py and point journal_folder at it.
+    """
+    parser = argparse.ArgumentParser(prog="logtail replay", description="Replay journals into LogTail")
+    journal_replay.replay_args(parser)
+    args = parser.parse_args(argv)
+    sources = journal_replay.sources_of(args.source)
+    if not sources:
+        print(f"❌ No journals found in {args.source}")
+        return
+
+    with tempfile.TemporaryDirectory() as scratch:
+        saved = {key: CONFIG[key] for key in ("save_file", "stats_file")}
+        CONFIG["save_file"] = Path(scratch) / "event_counts.json"
+        CONFIG["stats_file"] = Path(scratch) / "event_stats.sqlite3"
+        try:
+            log_tail = LogTail()
+        finally:
+            CONFIG.update(saved)
+        readers: Dict[str, JournalReader] = {}
+        companion_watcher = CompanionWatcher(args.source, CONFIG["companion_files"], 0)
+        companion_changes = Counter()
+        companion_watcher.subscribe([ALL_EVENTS], lambda name, changes: companion_changes.update([name]),
+                                    "companion_replay")
+        if CONFIG["companion_log"]:
+            companion_watcher.subscribe(CONFIG["companion_log"], log_companion_changes, "companion_log")
+
+        def process(name: str, line: bytes):
+            reader = readers.get(name)
+            if reader is None:
+                reader = readers[name] = JournalReader(Path(name))
+            try:
+                log_tail.process_journal_line(line, reader)
+            except Exception as e:
+                logger.warning("Skipping malformed journal line (%s): %r", e, line[:200])
+                log_tail.metrics.count("malformed_lines")
+
+        def companion(name: str, data: bytes):
+            if name not in companion_watcher.names:
+                return
+            try:
+                companion_watcher.update(name, data)
+            except json.JSONDecodeError:
+                logger.warning("Skipping malformed %s snapshot: %r", name, data[:200])
+                log_tail.metrics.count("malformed_snapshots")
+
+        replayer = journal_replay.JournalReplayer(sources, args.speed, args.max_gap)
+        try:
+            stats = replayer.run(journal_replay.CallbackTarget(process, companion), log_tail.raxxla_found)
+        except KeyboardInterrupt:
+            print("\n🛑 Replay stopped.")
+            return
+        finally:
+            companion_watcher.stop()
+            log_tail.stop_handlers()
+            log_tail.stats.close()
+    journal_replay.print_stats(stats)
+    for event, count in Counter(log_tail.event_counts).most_common(CONFIG["dashboard_top_n"]):
+        print(f"  {event}: {count}")
+    if companion_changes:
+        print("Companion snapshots that changed something:")
+        for name, count in sorted(companion_changes.items()):
+            print(f"  {name}: {count}")
 
-def clear_screen_subprocess():
-    if os.name == 'nt':
-        subprocess.run('cls', shell=True)
-    else:
-        subprocess.run('clear', shell=True)
+
+def watchlist_alert(term: str, line: bytes) -> str:
+    """Discord message for a watchlist hit."""
+    line_str = line.decode("utf-8", errors="replace").strip()
+    return f"# **{term.upper()} detected!**\n```json\n{line_str[:1800]}\n```"
+
+
+def dump_metrics(log_tail: LogTail, profiler: Optional[SamplingProfiler] = None):
+    """Write the current metrics, and profiler samples if any, to the metrics file."""
+    try:
+        write_metrics(
+            CONFIG["metrics_file"], log_tail.metrics.snapshot(), dict(log_tail.event_counts),
+            log_tail.handler_metrics(), profiler.top() if profiler else None,
+        )
+    except Exception as e:
+        logger.error("Error writing metrics: %s", e)
+
+def make_observer(backend: str):
+    """Create the file change observer for the configured backend."""
+    if backend == "polling":
+        min_interval, max_interval = CONFIG["poll_interval"]
+        return AdaptivePollingObserver(min_interval, max_interval)
+    if backend == "watchdog":
+        return Observer()
+    raise ValueError(f"Unknown watcher backend {backend!r}, expected 'watchdog' or 'polling'")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Elite Dangerous LogTail")
+    parser.add_argument(
+        "--backfill", action="store_true",
+        help="recount events from every journal in the folder before tailing",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="number of processes used by --backfill (default: CPU count)",
+    )
+    parser.add_argument(
+        "--refresh", type=float, default=CONFIG["refresh_interval"],
+        help="seconds between dashboard refreshes",
+    )
+    parser.add_argument(
+        "--top", type=int, default=CONFIG["dashboard_top_n"],
+        help="number of event types shown on the dashboard",
+    )
+    parser.add_argument(
+        "--watcher", choices=["watchdog", "polling"], default=CONFIG["watcher_backend"],
+        help="how file changes are detected (use polling on network shares or Wine)",
+    )
+    parser.add_argument(
+        "--metrics", action="store_true", default=CONFIG["metrics_enabled"],
+        help="time each stage of the journal path and write them to the metrics file",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="sample thread stacks and add the hottest ones to the metrics file",
+    )
+    parser.add_argument(
+        "--export", type=Path, default=CONFIG["export_folder"], metavar="FOLDER",
+        help="stream events into compressed per-event-type column files in FOLDER",
+    )
+    parser.add_argument(
+        "--companion", action="append", metavar="FILE",
+        help="log the fields that change in a companion file, e.g. Status.json (repeatable)",
+    )
+    return parser.parse_args()
 
 def main():
     """Main function of LogTail."""
+    if sys.argv[1:2] == ["search"]:
+        journal_index.main(sys.argv[2:], CONFIG["journal_folder"], CONFIG["index_file"])
+        return
+    if sys.argv[1:2] == ["replay"]:
+        replay_journals(sys.argv[2:])
+        return
+    args = parse_args()
     if not CONFIG["journal_folder"].exists():
         print(f"❌ Journal folder not found: {CONFIG['journal_folder']}")
         input("Press Enter to exit...")
         return
 
+    CONFIG["metrics_enabled"] = args.metrics
     log_tail = LogTail()
-    event_handler = JournalMonitor(log_tail)
-    observer = Observer()
+    notifier = None
+    if CONFIG["discord_webhook"]:
+        if DiscordNotifier is None:
+            logger.warning("Discord notifications need requests and Rackham_Wine/discord_notifier.py")
+        else:
+            notifier = DiscordNotifier(CONFIG["discord_webhook"], str(CONFIG["discord_outbox"]))
+            log_tail.watchlist.add_callback(
+                lambda term, line: notifier.notify(watchlist_alert(term, line))
+            )
+            notifier.start()
+    exporter = None
+    if args.export:
+        exporter = ColumnarExporter(args.export, CONFIG["export_batch_size"])
+        # Blocking, so catching up on a long journal never leaves gaps in the export
+        log_tail.subscribe(CONFIG["export_events"], exporter.handle, "columnar_export",
+                           threaded=True, max_queue=CONFIG["export_batch_size"] * 4, block=True)
+        print(f"📦 Exporting events to {args.export}"
+              f" ({'Parquet' if exporter.use_parquet else 'zipped JSON columns'})")
+    checkpoint = backfill_counts(log_tail, args.workers) if args.backfill else None
+    event_handler = JournalMonitor(log_tail, checkpoint)
+    companion_watcher = CompanionWatcher(
+        CONFIG["journal_folder"], CONFIG["companion_files"], CONFIG["companion_debounce"]
+    )
+    companion_log = args.companion or CONFIG["companion_log"]
+    if companion_log:
+        companion_watcher.subscribe(companion_log, log_companion_changes, "companion_log")
+    observer = make_observer(args.watcher)
     observer.schedule(event_handler, str(CONFIG["journal_folder"]), recursive=False)
+    # Without subscribers the companion files are never read
+    if companion_watcher.subscribers:
+        instrument(companion_watcher, "check_file", log_tail.metrics, "companion_check")
+        companion_watcher.start()
+        observer.schedule(companion_watcher, str(CONFIG["journal_folder"]), recursive=False)
     observer.start()
 
+    if args.backfill:
+        event_handler.save_state(compact=True)
+
+    print("\n✅ LogTail is running! Press Ctrl+C to stop.")
+    dashboard = Dashboard(log_tail, args.top)
+    instrument(dashboard, "refresh", log_tail.metrics, "dashboard_refresh")
+    profiler = SamplingProfiler() if args.profile else None
+    if profiler:
+        profiler.start()
+    last_save = last_compact = last_metrics = time.monotonic()
     try:
-        print("\n✅ LogTail is running! Press Ctrl+C to stop.")
-        while not log_tail.raxxla_found.is_set():
-            time.sleep(2)
-            clear_screen_subprocess()
-            print("\r" + " "*80, end="") # Clear the line
-            print("\rLive Event Counts:")
-            for event, count in log_tail.event_counts.items():
-                print(f" {event}: {count}")
-            
+        while not log_tail.raxxla_found.wait(args.refresh):
+            dashboard.refresh()
+            now = time.monotonic()
+            if (log_tail.metrics.enabled or profiler) and now - last_metrics >= CONFIG["metrics_interval"]:
+                dump_metrics(log_tail, profiler)
+                last_metrics = now
+            if now - last_compact >= CONFIG["compact_interval"]:
+                event_handler.save_state(compact=True)
+                if exporter:
+                    exporter.flush()
+                last_save = last_compact = now
+            elif now - last_save >= CONFIG["save_interval"]:
+                event_handler.save_state()
+                last_save = now
+
     except KeyboardInterrupt:
         print("\n\n🛑 Stopping LogTail...")
     finally:
+        dashboard.close()
+        if profiler:
+            profiler.stop()
+        if log_tail.metrics.enabled or profiler:
+            dump_metrics(log_tail, profiler)
         observer.stop()
         observer.join()
-        log_tail.save_counts()
+        companion_watcher.stop()
+        log_tail.stop_handlers()
+        if exporter:
+            exporter.close()
+        if notifier:
+            notifier.stop()
+        event_handler.save_state(compact=True)
+        log_tail.stats.close()
         print("\n\nFinal Event Counts:")
         print("="*25)
         for event, count in sorted(log_tail.event_counts.items()):
@@ -0,0 +1,187 @@
+"""
+Elite Dangerous LogTail - Polling Observer
+A stat-polling replacement for watchdog's Observer.
+
+On network shares, Wine/Proton prefixes and some container mounts native
+file notifications arrive late or not at all. This observer finds changes
+by comparing file size and mtime instead, and sends the usual watchdog
+events to the scheduled handlers. The poll interval drops to the
+minimum as soon as something changes and backs off while the folder is idle,
+so it reacts quickly during play and costs next to nothing while the game
+is closed.
+
+Requirements:
+- pip install watchdog
+"""
+
+import os
+import time
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent
+
+logger = logging.getLogger(__name__)
+
+# (size, mtime_ns) of a file
+Signature = Tuple[int, int]
+
+
+class AdaptivePollingObserver:
+    """
+    Polls scheduled folders and dispatches created/modified events.
+
+    Only "hot" files, ones changed within the last hot_window seconds, are
+    stat'ed on every poll; a file that stays idle longer drops out again.
+    The folder listing is only re-read when the folder's own mtime changes,
+    and every other file is checked by a slower full sweep, so a poll costs
+    the same however many old journals the folder holds. Only non-recursive
+    watches are supported.
+    """
+    def __init__(self, min_interval: float = 0.1, max_interval: float = 5.0,
+                 backoff: float = 1.5, hot_window: float = 3600.0,
+                 sweep_interval: float = 30.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.hot_window = hot_window
+        self.sweep_interval = sweep_interval
+        self.interval = min_interval
+        self.watches: List[Tuple[FileSystemEventHandler, Path]] = []
+        self.signatures: Dict[Path, Dict[str, Signature]] = {}
+        # name -> time.time_ns() of the last change, per folder
+        self.hot: Dict[Path, Dict[str, int]] = {}
+        self.folder_mtimes: Dict[Path, int] = {}
+        self.last_sweep = 0.0
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def schedule(self, event_handler: FileSystemEventHandler, path: str, recursive: bool = False):
+        """Watch a folder for the given handler, like Observer.schedule."""
+        if recursive:
+            raise ValueError("AdaptivePollingObserver only supports non-recursive watches")
+        folder = Path(path)
+        self.watches.append((event_handler, folder))
+        if folder not in self.signatures:
+            # Existing files are the baseline, only later changes are reported
+            self.signatures[folder] = self.list_folder(folder)
+            cutoff = time.time_ns() - int(self.hot_window * 1e9)
+            self.hot[folder] = {
+                name: mtime for name, (_, mtime) in self.signatures[folder].items() if mtime >= cutoff
+            }
+            self.folder_mtimes[folder] = self.folder_mtime(folder)
+
+    def start(self):
+        self.last_sweep = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="AdaptivePollingObserver", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def join(self, timeout: Optional[float] = None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                changed = self.poll()
+            except Exception as e:
+                logger.error("Error polling for file changes: %s", e)
+                changed = False
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def poll(self) -> bool:
+        """Check every watched folder once; returns True if anything changed."""
+        now = time.monotonic()
+        sweep = now - self.last_sweep >= self.sweep_interval
+        if sweep:
+            self.last_sweep = now
+        changed = False
+        for folder in self.signatures:
+            for event in self.poll_folder(folder, sweep):
+                changed = True
+                for handler, watched in self.watches:
+                    if watched == folder:
+                        handler.dispatch(event)
+        return changed
+
+    def poll_folder(self, folder: Path, sweep: bool) -> list:
+        known = self.signatures[folder]
+        hot = self.hot[folder]
+        events = []
+
+        folder_mtime = self.folder_mtime(folder)
+        if sweep or folder_mtime != self.folder_mtimes[folder]:
+            # Files were added or removed, or it is time for a full check
+            self.folder_mtimes[folder] = folder_mtime
+            current = self.list_folder(folder)
+            for name in known.keys() - current.keys():
+                del known[name]
+                hot.pop(name, None)
+            names = current.keys() if sweep else current.keys() - known.keys() | hot.keys()
+        else:
+            current = {}
+            names = set(hot)
+
+        for name in names:
+            signature = current.get(name) or self.stat(folder / name)
+            if signature is None:
+                known.pop(name, None)
+                hot.pop(name, None)
+                continue
+            previous = known.get(name)
+            if previous == signature:
+                continue
+            known[name] = signature
+            hot[name] = time.time_ns()
+            path = str(folder / name)
+            if previous is None:
+                events.append(FileCreatedEvent(path))
+            events.append(FileModifiedEvent(path))
+
+        # Files idle for longer than hot_window are left to the full sweep
+        cutoff = time.time_ns() - int(self.hot_window * 1e9)
+        for name in [name for name, changed in hot.items() if changed < cutoff]:
+            del hot[name]
+        return events
+
+    @staticmethod
+    def stat(path: Path) -> Optional[Signature]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def folder_mtime(folder: Path) -> int:
+        try:
+            return folder.stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    @staticmethod
+    def list_folder(folder: Path) -> Dict[str, Signature]:
+        signatures = {}
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            signatures[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.error("Error listing %s: %s", folder, e)
+        return signatures
@@ -0,0 +1,196 @@
+"""
+Elite Dangerous LogTail - Synthetic Journal Generator
+Builds realistic journal lines for benchmarks and load tests.
+
+The event mix follows a typical exploration session: lots of
+FSSSignalDiscovered, Scan and ReceiveText lines, a jump every minute or so,
+and the occasional very large Loadout or Materials line.
+
+Usage:
+- python synthetic_journal.py Journal.2024-01-01T000000.01.log --lines 100000
+"""
+
+import json
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+# (event type, relative weight) of a typical exploration session
+EVENT_MIX = [
+    ("FSSSignalDiscovered", 25),
+    ("Scan", 20),
+    ("ReceiveText", 10),
+    ("Music", 8),
+    ("ReservoirReplenished", 5),
+    ("FSDJump", 4),
+    ("StartJump", 4),
+    ("FSDTarget", 4),
+    ("FuelScoop", 4),
+    ("FSSDiscoveryScan", 2),
+    ("NavBeaconScan", 1),
+    ("SAAScanComplete", 1),
+    ("Cargo", 1),
+    ("FSSAllBodiesFound", 1),
+    ("Materials", 0.2),
+    ("Loadout", 0.2),
+]
+
+SYSTEM_NAMES = ["Shinrarta Dezhra", "Colonia", "Sagittarius A*", "Beagle Point", "Sol", "Jaques"]
+PLANET_CLASSES = ["Icy body", "Rocky body", "High metal content body", "Water world", "Gas giant with water based life"]
+MATERIALS = ["iron", "nickel", "sulphur", "carbon", "chromium", "manganese", "phosphorus", "zinc",
+             "germanium", "vanadium", "selenium", "arsenic", "niobium", "molybdenum", "tungsten"]
+MODULE_SLOTS = ["Armour", "PowerPlant", "MainEngines", "FrameShiftDrive", "LifeSupport",
+                "PowerDistributor", "Radar", "FuelTank"] + [f"Slot{i:02d}_Size{1 + i % 6}" for i in range(1, 30)]
+
+
+class JournalGenerator:
+    """Generates journal entries with plausible fields and line sizes."""
+    def __init__(self, seed: int = 0, commander: str = "CMDR Synthetic",
+                 start: Optional[datetime] = None):
+        self.rng = random.Random(seed)
+        self.commander = commander
+        self.time = start or datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.system = self.rng.choice(SYSTEM_NAMES)
+        self.address = self.rng.randrange(10**10, 10**13)
+        self.body_id = 0
+        self.events = [name for name, _ in EVENT_MIX]
+        self.weights = [weight for _, weight in EVENT_MIX]
+
+    def header(self) -> List[dict]:
+        """The lines the game writes at the start of every journal."""
+        return [
+            self.stamp({"event": "Fileheader", "part": 1, "language": "English/UK",
+                        "Odyssey": True, "gameversion": "4.0.0.1800", "build": "r300000/r0 "}),
+            self.stamp({"event": "Commander", "FID": "F1234567", "Name": self.commander}),
+            self.stamp({"event": "LoadGame", "FID": "F1234567", "Commander": self.commander,
+                        "Horizons": True, "Odyssey": True, "Ship": "anaconda", "ShipID": 1,
+                        "GameMode": "Solo", "Credits": 123456789, "Loan": 0}),
+        ]
+
+    def entries(self, count: int) -> Iterator[dict]:
+        for event_type in self.rng.choices(self.events, self.weights, k=count):
+            yield self.stamp(getattr(self, "make_" + event_type, self.make_generic)(event_type))
+
+    def lines(self, count: int, header: bool = True) -> Iterator[bytes]:
+        """Journal lines in the game's own layout, without the newline."""
+        if header:
+            for entry in self.header():
+                yield encode_line(entry)
+        for entry in self.entries(count):
+            yield encode_line(entry)
+
+    def stamp(self, entry: dict) -> dict:
+        self.time += timedelta(seconds=self.rng.expovariate(1.0))
+        return {"timestamp": self.time.strftime("%Y-%m-%dT%H:%M:%SZ"), **entry}
+
+    def make_generic(self, event_type: str) -> dict:
+        return {"event": event_type}
+
+    def make_Music(self, event_type: str) -> dict:
+        return {"event": event_type, "MusicTrack": self.rng.choice(["Exploration", "Supercruise", "NoTrack"])}
+
+    def make_ReceiveText(self, event_type: str) -> dict:
+        return {"event": event_type, "From": "", "Message": f"$COMMS_entered:#name={self.system};",
+                "Message_Localised": f"Entered Channel: {self.system}", "Channel": "npc"}
+
+    def make_FSSSignalDiscovered(self, event_type: str) -> dict:
+        return {"event": event_type, "SystemAddress": self.address,
+                "SignalName": f"$MULTIPLAYER_SCENARIO{self.rng.randrange(100)}_TITLE;",
+                "SignalName_Localised": "Nav Beacon", "IsStation": self.rng.random() < 0.1}
+
+    def make_FSDJump(self, event_type: str) -> dict:
+        self.system = f"{self.rng.choice(SYSTEM_NAMES)} {self.rng.randrange(1000)}"
+        self.address = self.rng.randrange(10**10, 10**13)
+        self.body_id = 0
+        return {"event": event_type, "Taxi": False, "Multicrew": False, "StarSystem": self.system,
+                "SystemAddress": self.address,
+                "StarPos": [round(self.rng.uniform(-5000, 5000), 5) for _ in range(3)],
+                "SystemAllegiance": "", "SystemEconomy": "$economy_None;", "Population": 0,
+                "Body": f"{self.system} A", "BodyID": 1, "BodyType": "Star",
+                "JumpDist": round(self.rng.uniform(10, 80), 3), "FuelUsed": round(self.rng.uniform(1, 8), 6),
+                "FuelLevel": round(self.rng.uniform(10, 32), 6)}
+
+    def make_Scan(self, event_type: str) -> dict:
+        self.body_id += 1
+        materials = self.rng.sample(MATERIALS, 8)
+        return {"event": event_type, "ScanType": "Detailed",
+                "BodyName": f"{self.system} {self.body_id} {chr(97 + self.body_id % 6)}",
+                "BodyID": self.body_id, "Parents": [{"Planet": self.body_id - 1}, {"Star": 0}],
+                "StarSystem": self.system, "SystemAddress": self.address,
+                "DistanceFromArrivalLS": round(self.rng.uniform(10, 200000), 6),
+                "TidalLock": self.rng.random() < 0.5,
+                "TerraformState": self.rng.choice(["", "", "", "Terraformable"]),
+                "PlanetClass": self.rng.choice(PLANET_CLASSES),
+                "Atmosphere": "thin ammonia atmosphere", "AtmosphereType": "Ammonia",
+                "AtmosphereComposition": [{"Name": "Ammonia", "Percent": 100.0}],
+                "Volcanism": "", "MassEM": round(self.rng.uniform(0.001, 10), 6),
+                "Radius": round(self.rng.uniform(1e5, 1e7), 3),
+                "SurfaceGravity": round(self.rng.uniform(0.1, 30), 6),
+                "SurfaceTemperature": round(self.rng.uniform(20, 2000), 6),
+                "SurfacePressure": round(self.rng.uniform(0, 1e5), 6), "Landable": True,
+                "Materials": [{"Name": name, "Percent": round(self.rng.uniform(0.1, 25), 6)} for name in materials],
+                "Composition": {"Ice": 0.0, "Rock": 0.9, "Metal": 0.1},
+                "SemiMajorAxis": round(self.rng.uniform(1e8, 1e12), 3),
+                "Eccentricity": round(self.rng.random() / 10, 6), "OrbitalInclination": 0.5,
+                "Periapsis": 123.4, "OrbitalPeriod": 1234567.0, "AscendingNode": 12.3,
+                "MeanAnomaly": 45.6, "RotationPeriod": 98765.4, "AxialTilt": 0.1,
+                "Rings": [{"Name": f"{self.system} {self.body_id} {ring} Ring", "RingClass": "eRingClass_Icy",
+                           "MassMT": 1.2e10, "InnerRad": 1.0e8, "OuterRad": 2.0e8} for ring in "AB"],
+                "WasDiscovered": False, "WasMapped": False}
+
+    def make_Cargo(self, event_type: str) -> dict:
+        return {"event": event_type, "Vessel": "Ship", "Count": 0, "Inventory": []}
+
+    def make_Materials(self, event_type: str) -> dict:
+        return {"event": event_type,
+                "Raw": [{"Name": name, "Count": self.rng.randrange(300)} for name in MATERIALS],
+                "Manufactured": [{"Name": f"manufactured{i}", "Name_Localised": f"Manufactured {i}",
+                                  "Count": self.rng.randrange(300)} for i in range(60)],
+                "Encoded": [{"Name": f"encoded{i}", "Name_Localised": f"Encoded {i}",
+                             "Count": self.rng.randrange(300)} for i in range(60)]}
+
+    def make_Loadout(self, event_type: str) -> dict:
+        modules = []
+        for slot in MODULE_SLOTS:
+            modules.append({
+                "Slot": slot, "Item": f"int_{slot.lower()}_class5", "On": True, "Priority": 0,
+                "Health": 1.0, "Value": self.rng.randrange(10**4, 10**8),
+                "Engineering": {
+                    "Engineer": "Felicity Farseer", "EngineerID": 300100, "BlueprintID": 128673692,
+                    "BlueprintName": "Engine_Dirty", "Level": 5, "Quality": 1.0,
+                    "Modifiers": [{"Label": label, "Value": self.rng.uniform(0, 100),
+                                   "OriginalValue": 50.0, "LessIsGood": 0}
+                                  for label in ("Mass", "Integrity", "PowerDraw", "EngineOptimalMass")],
+                },
+            })
+        return {"event": event_type, "Ship": "anaconda", "ShipID": 1, "ShipName": "Synthetic",
+                "ShipIdent": "SY-01", "HullValue": 141889930, "ModulesValue": 512345678,
+                "HullHealth": 1.0, "UnladenMass": 1234.5, "CargoCapacity": 0, "MaxJumpRange": 75.2,
+                "FuelCapacity": {"Main": 32.0, "Reserve": 1.07}, "Rebuy": 32711780, "Modules": modules}
+
+
+def encode_line(entry: dict) -> bytes:
+    """Encode an entry the way the game lays out journal lines."""
+    return b"{ " + json.dumps(entry, separators=(", ", ":"))[1:-1].encode("utf-8") + b" }"
+
+
+def main():
+    """Write a synthetic journal file."""
+    parser = argparse.ArgumentParser(description="Write a synthetic Elite Dangerous journal")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--commander", default="CMDR Synthetic")
+    args = parser.parse_args()
+
+    generator = JournalGenerator(args.seed, args.commander)
+    with open(args.path, "wb") as f:
+        for line in generator.lines(args.lines):
+            f.write(line + b"\r\n")
+    print(f"Wrote {args.lines} lines ({args.path.stat().st_size / 1e6:.1f} MB) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
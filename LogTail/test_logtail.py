@@ -0,0 +1,242 @@
+"""
+Tests for LogTail's journal tailing.
+
+Usage:
+- python -m pytest LogTail
+"""
+
+import io
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+
+import pytest
+
+# logtail reads APPDATA at import time, which does not exist outside Windows
+os.environ.setdefault("APPDATA", tempfile.gettempdir())
+
+import logtail
+from synthetic_journal import JournalGenerator, encode_line
+
+# Keep the tests' log messages out of elite_log_tail.log in the current folder
+for handler in logging.getLogger().handlers[:]:
+    if isinstance(handler, logging.FileHandler):
+        logging.getLogger().removeHandler(handler)
+        handler.close()
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """Point LogTail's files at a temp folder."""
+    journals = tmp_path / "journals"
+    journals.mkdir()
+    monkeypatch.setitem(logtail.CONFIG, "journal_folder", journals)
+    monkeypatch.setitem(logtail.CONFIG, "save_file", tmp_path / "event_counts.json")
+    monkeypatch.setitem(logtail.CONFIG, "stats_file", tmp_path / "event_stats.sqlite3")
+    return journals
+
+
+def make_log_tail() -> logtail.LogTail:
+    with redirect_stdout(io.StringIO()):
+        return logtail.LogTail()
+
+
+@pytest.mark.parametrize("backend", ["watchdog", "polling"])
+def test_concurrent_journals_are_counted_per_commander(config, backend):
+    commanders = 4
+    lines_per_journal = 3000
+    log_tail = make_log_tail()
+    with redirect_stdout(io.StringIO()):
+        monitor = logtail.JournalMonitor(log_tail)
+    observer = logtail.make_observer(backend)
+    observer.schedule(monitor, str(config), recursive=False)
+    observer.start()
+
+    def write_journal(index: int):
+        generator = JournalGenerator(seed=index, commander=f"CMDR {index}")
+        commander_line = encode_line({"timestamp": "2024-01-01T00:00:00Z", "event": "Commander",
+                                      "FID": "F1", "Name": f"CMDR {index}"})
+        lines = [commander_line] + list(generator.lines(lines_per_journal, header=False))
+        data = b"\n".join(lines) + b"\n"
+        rng = random.Random(index)
+        path = config / f"Journal.2024-01-01T00000{index}.01.log"
+        with open(path, "wb") as f:
+            start = 0
+            while start < len(data):
+                # Uneven chunks, so lines are regularly split across writes
+                size = rng.randint(1, 8192)
+                f.write(data[start:start + size])
+                f.flush()
+                start += size
+                if rng.random() < 0.05:
+                    time.sleep(0.001)
+
+    expected = commanders * (lines_per_journal + 1)
+    try:
+        writers = [threading.Thread(target=write_journal, args=(i,)) for i in range(commanders)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        deadline = time.monotonic() + 30
+        while sum(log_tail.event_counts.values()) < expected and time.monotonic() < deadline:
+            time.sleep(0.02)
+        # Give a duplicated read the chance to show up as an over-count
+        time.sleep(0.3)
+    finally:
+        observer.stop()
+        observer.join()
+    pending = log_tail.stats.take_pending()
+    log_tail.stats.close()
+
+    per_commander = Counter()
+    for (commander, _, _), count in pending.items():
+        per_commander[commander] += count
+    assert sum(log_tail.event_counts.values()) == expected
+    assert per_commander == {f"CMDR {i}": lines_per_journal + 1 for i in range(commanders)}
+
+
+def test_companion_watcher_only_reads_subscribed_files(tmp_path):
+    (tmp_path / "Status.json").write_text('{"timestamp": "t1", "Flags": 1, "Fuel": {"FuelMain": 32}}')
+    watcher = logtail.CompanionWatcher(tmp_path, ["Status.json", "Cargo.json"], debounce=0)
+    checked = []
+    check_file = watcher.check_file
+    watcher.check_file = lambda name: (checked.append(name), check_file(name))
+    received = []
+    watcher.subscribe(["Status.json"], lambda name, changes: received.append(changes))
+    watcher.start()
+    try:
+        watcher.schedule("Cargo.json")
+        watcher.schedule("Status.json")
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+    assert checked == ["Status.json"]
+    assert received == [{"Flags": (None, 1), "Fuel": (None, {"FuelMain": 32})}]
+
+
+def test_companion_watcher_without_subscribers_reads_nothing(tmp_path):
+    (tmp_path / "Status.json").write_text('{"Flags": 1}')
+    watcher = logtail.CompanionWatcher(tmp_path, ["Status.json"], debounce=0)
+    watcher.schedule("Status.json")
+    assert watcher.pending == {}
+    watcher.stop()
+
+
+def test_replay_leaves_the_real_counts_and_stats_alone(config, tmp_path):
+    recorded = tmp_path / "recorded"
+    recorded.mkdir()
+    lines = list(JournalGenerator(seed=1).lines(200))
+    # Without an event field the line has to be decoded, which fails
+    lines.insert(50, b'{ "timestamp":"2024-01-01T00:00:30Z", "BodyName":"Sol A')
+    (recorded / "Journal.2024-01-01T000000.01.log").write_bytes(b"\r\n".join(lines) + b"\r\n")
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        logtail.replay_journals([str(recorded), "--speed", "0"])
+
+    # Every line after the malformed one was still counted
+    counts = [line.rsplit(":", 1) for line in output.getvalue().splitlines() if line.startswith("  ")]
+    assert sum(int(count) for _, count in counts) == len(lines) - 1
+    assert not logtail.CONFIG["stats_file"].exists()
+    assert not logtail.CONFIG["save_file"].exists()
+    assert logtail.CONFIG["stats_file"] == tmp_path / "event_stats.sqlite3"
+
+
+def test_a_bad_line_does_not_lose_the_rest_of_the_batch(config):
+    journal = config / "Journal.2024-01-01T000000.01.log"
+    journal.write_bytes(b"")
+    log_tail = make_log_tail()
+    with redirect_stdout(io.StringIO()):
+        monitor = logtail.JournalMonitor(log_tail)
+    log_tail.watchlist.add_callback(lambda term, line: 1 / 0)
+    lines = [b'{"event":"A"}', b"[1,2]", b'{"event":"B","StarSystem":"Raxxla"}', b"\xff\xfe",
+             b'{"event":"C"}']
+    journal.write_bytes(b"\n".join(lines) + b"\n")
+
+    with redirect_stdout(io.StringIO()):
+        monitor.read_new_lines(journal)
+    log_tail.stats.close()
+
+    assert dict(log_tail.event_counts) == {"A": 1, "C": 1}
+    assert log_tail.metrics.counters["malformed_lines"] == 3
+    with monitor.lock:
+        assert monitor.checkpoint()["journals"][-1]["offset"] == journal.stat().st_size
+
+
+def test_watchlist_folds_terms_and_lines_the_same_way():
+    watchlist = logtail.Watchlist(["Ängel", "raxxla"])
+    assert watchlist.scan('{"StarSystem":"Ängel"}'.encode()) == ["Ängel"]
+    assert watchlist.scan('{"StarSystem":"ÄNGEL"}'.encode()) == ["Ängel"]
+    assert watchlist.scan(b'{"StarSystem":"RAXXLA"}') == ["raxxla"]
+    assert watchlist.scan('{"StarSystem":"ängel"}'.encode()) == []
+
+
+def test_companion_file_rewritten_unchanged_is_not_parsed_again(tmp_path, monkeypatch):
+    status = tmp_path / "Status.json"
+    content = '{"timestamp": "t1", "Flags": 1}'
+    status.write_text(content)
+    watcher = logtail.CompanionWatcher(tmp_path, ["Status.json"], debounce=0)
+    received = []
+    watcher.subscribe(["Status.json"], lambda name, changes: received.append(changes))
+    watcher.check_file("Status.json")
+    assert received == [{"Flags": (None, 1)}]
+
+    decoded = []
+    loads = json.loads
+    monkeypatch.setattr(logtail.json, "loads", lambda data: (decoded.append(data), loads(data))[1])
+    # Same size and mtime: not even read
+    watcher.check_file("Status.json")
+    # Rewritten with the same content: read and hashed, but not parsed
+    status.write_text(content)
+    os.utime(status, ns=(status.stat().st_atime_ns, status.stat().st_mtime_ns + 1_000_000))
+    watcher.check_file("Status.json")
+    assert decoded == []
+    assert received == [{"Flags": (None, 1)}]
+    watcher.stop()
+
+
+def test_companion_changes_are_logged(caplog):
+    with caplog.at_level(logging.INFO):
+        logtail.log_companion_changes("Status.json", {"Fuel.FuelMain": (32, 31.5), "Flags": (1, 5)})
+    assert caplog.messages == ["Status.json changed: Flags: 1 -> 5, Fuel.FuelMain: 32 -> 31.5"]
+
+
+def test_blocking_handler_waits_instead_of_dropping():
+    received = []
+    handler = logtail.EventHandler(lambda i: (time.sleep(0.001), received.append(i)),
+                                   threaded=True, max_queue=2, block=True)
+    for i in range(100):
+        handler.submit(i)
+    handler.stop()
+    assert received == list(range(100))
+    assert handler.dropped == 0
+
+
+def test_replay_feeds_companion_snapshots_to_the_watcher(config, tmp_path, monkeypatch, caplog):
+    monkeypatch.setitem(logtail.CONFIG, "companion_log", ["Status.json"])
+    recorded = tmp_path / "recorded"
+    recorded.mkdir()
+    (recorded / "Journal.2024-01-01T000000.01.log").write_bytes(b"\r\n".join(JournalGenerator(seed=1).lines(20)))
+    (recorded / "Status.jsonl").write_text(
+        '{"timestamp":"2024-01-01T00:00:01Z", "Flags":1}\n'
+        '{"timestamp":"2024-01-01T00:00:02Z", "Flags":1}\n'
+        '{"timestamp":"2024-01-01T00:00:03Z", "Flags":5}\n'
+    )
+
+    output = io.StringIO()
+    with redirect_stdout(output), caplog.at_level(logging.INFO):
+        logtail.replay_journals([str(recorded), "--speed", "0"])
+
+    # Only the timestamp changed in the second snapshot, so it is not reported
+    assert output.getvalue().endswith("Companion snapshots that changed something:\n  Status.json: 2\n")
+    assert [m for m in caplog.messages if m.startswith("Status.json")] == [
+        "Status.json changed: Flags: None -> 1", "Status.json changed: Flags: 1 -> 5"]
@@ -0,0 +1,107 @@
+"""
+Tests for the adaptive polling observer.
+
+Usage:
+- python -m pytest LogTail
+"""
+
+import os
+import time
+
+from watchdog.events import FileSystemEventHandler
+
+from polling_observer import AdaptivePollingObserver
+
+
+class RecordingHandler(FileSystemEventHandler):
+    def __init__(self):
+        self.events = []
+
+    def on_any_event(self, event):
+        self.events.append((event.event_type, os.path.basename(event.src_path)))
+
+
+def touch_later(path, data: bytes):
+    """Write a file with an mtime clearly after the previous one."""
+    previous = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_bytes(data)
+    stat = path.stat()
+    if stat.st_mtime_ns <= previous:
+        os.utime(path, ns=(stat.st_atime_ns, previous + 1000000))
+
+
+def make_observer(folder, **options):
+    observer = AdaptivePollingObserver(**options)
+    handler = RecordingHandler()
+    observer.schedule(handler, str(folder))
+    return observer, handler
+
+
+def test_created_and_modified_events_are_dispatched(tmp_path):
+    (tmp_path / "Journal.old.log").write_bytes(b"old\n")
+    observer, handler = make_observer(tmp_path)
+
+    assert not observer.poll()
+    (tmp_path / "Journal.new.log").write_bytes(b"line\n")
+    assert observer.poll()
+    assert handler.events == [("created", "Journal.new.log"), ("modified", "Journal.new.log")]
+
+    handler.events.clear()
+    touch_later(tmp_path / "Journal.new.log", b"line\nline\n")
+    assert observer.poll()
+    assert handler.events == [("modified", "Journal.new.log")]
+
+    handler.events.clear()
+    assert not observer.poll()
+    assert handler.events == []
+
+
+def test_interval_resets_on_change_and_backs_off_when_idle(tmp_path):
+    observer, handler = make_observer(tmp_path, min_interval=0.01, max_interval=0.08, backoff=2.0)
+    observer.start()
+    try:
+        deadline = time.monotonic() + 5
+        while observer.interval < 0.08 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert observer.interval == 0.08
+
+        (tmp_path / "Journal.new.log").write_bytes(b"line\n")
+        deadline = time.monotonic() + 5
+        while not handler.events and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert handler.events
+        # The change was found, so the next poll comes at the minimum interval
+        assert observer.interval < 0.08
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def test_idle_files_are_only_found_by_a_full_sweep(tmp_path):
+    journal = tmp_path / "Journal.old.log"
+    journal.write_bytes(b"old\n")
+    os.utime(journal, ns=(0, 0))
+    observer, handler = make_observer(tmp_path, hot_window=60, sweep_interval=3600)
+    observer.last_sweep = time.monotonic()
+    assert observer.hot[tmp_path] == {}
+
+    # Rewriting a file does not change the folder's mtime, and the file is not hot
+    touch_later(journal, b"old\nnew\n")
+    os.utime(tmp_path, ns=(tmp_path.stat().st_atime_ns, observer.folder_mtimes[tmp_path]))
+    assert not observer.poll()
+
+    observer.last_sweep -= 3600
+    assert observer.poll()
+    assert handler.events == [("modified", "Journal.old.log")]
+    assert "Journal.old.log" in observer.hot[tmp_path]
+
+
+def test_hot_files_expire_after_the_hot_window(tmp_path):
+    observer, handler = make_observer(tmp_path, hot_window=60)
+    (tmp_path / "Journal.new.log").write_bytes(b"line\n")
+    observer.poll()
+    assert "Journal.new.log" in observer.hot[tmp_path]
+
+    observer.hot[tmp_path]["Journal.new.log"] -= int(120 * 1e9)
+    observer.poll()
+    assert observer.hot[tmp_path] == {}
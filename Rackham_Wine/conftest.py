@@ -0,0 +1,92 @@
+"""
+Shared test fixtures for the Grapevine System: a local HTTP server standing
+in for the market site and the Discord webhook.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class FakeServer:
+    """
+    Serves queued responses per path and records every request.
+
+    A response is (status, headers, body), where body is bytes, a dict sent
+    as JSON, or a callable writing to the socket itself. Once a path's queue
+    is empty, the last response served keeps being served.
+    """
+    def __init__(self):
+        self.responses = {}
+        self.served = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def add(self, path: str, status: int = 200, headers=None, body=b""):
+        with self.lock:
+            self.responses.setdefault(path, []).append((status, headers or {}, body))
+
+    def next_response(self, path: str):
+        with self.lock:
+            queued = self.responses.get(path)
+            if queued:
+                self.served[path] = queued.pop(0)
+            return self.served.get(path, (404, {}, b"not found"))
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request_body = self.rfile.read(length) if length else b""
+                with server.lock:
+                    server.requests.append((self.command, self.path, dict(self.headers), request_body))
+                status, headers, body = server.next_response(self.path)
+                self.send_response(status)
+                if isinstance(body, dict):
+                    body = json.dumps(body).encode()
+                    headers = {"Content-Type": "application/json", **headers}
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if callable(body):
+                    self.end_headers()
+                    body(self.wfile)
+                    return
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = respond
+            do_POST = respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def fake_server():
+    server = FakeServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def market_page() -> bytes:
+    return (FIXTURES / "station_market.html").read_bytes()
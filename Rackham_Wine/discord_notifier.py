@@ -0,0 +1,229 @@
+"""
+Discord webhook notifier for the Grapevine System and LogTail.
+Delivers alerts through a persistent outbox, so none are lost.
+
+Alerts are written to an outbox file before anything is sent. A flush packs
+every pending alert into as few Discord messages as fit the 2000 character
+limit and posts them over a pooled session with timeouts. An alert only
+leaves the outbox once Discord has accepted it. Rate limits are honoured:
+a 429's retry_after and the X-RateLimit-* headers delay the next post, and
+whatever cannot be delivered now stays in the outbox for the next flush,
+which may be on the next cron run.
+
+For long-running programs, start() runs a background thread that flushes
+shortly after an alert arrives, so a burst of alerts becomes one message.
+
+Usage:
+- python discord_notifier.py OUTBOX_FILE            retry undelivered alerts
+- python discord_notifier.py OUTBOX_FILE "message"  queue and send a message
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Discord's limit on the content of one message
+MAX_CONTENT = 2000
+SEPARATOR = "\n\n"
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 15)
+# Longest rate-limit wait a flush sits out before leaving alerts for later
+MAX_WAIT = 30.0
+
+
+class DiscordNotifier:
+    """Queues alerts in a persistent outbox and delivers them to a webhook."""
+    def __init__(self, webhook_url: Optional[str], outbox_path: str,
+                 coalesce_delay: float = 2.0, session: Optional[requests.Session] = None):
+        self.webhook_url = webhook_url
+        self.outbox_path = outbox_path
+        self.coalesce_delay = coalesce_delay
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.outbox: List[str] = self.load_outbox()
+        self.not_before = 0.0
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session = session
+
+    def load_outbox(self) -> List[str]:
+        if not os.path.exists(self.outbox_path):
+            return []
+        try:
+            with open(self.outbox_path, 'r') as f:
+                return [message for message in json.load(f) if isinstance(message, str)]
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Error reading the Discord outbox {self.outbox_path}: {e}")
+            return []
+
+    def save_outbox(self):
+        """Atomically write the outbox; called with the lock held."""
+        folder = os.path.dirname(self.outbox_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp_path = self.outbox_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.outbox, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.outbox_path)
+
+    def notify(self, message: str):
+        """Queue an alert; it is on disk when this returns."""
+        with self.lock:
+            self.outbox.append(message)
+            try:
+                self.save_outbox()
+            except OSError as e:
+                print(f"Error writing the Discord outbox {self.outbox_path}: {e}")
+        self.wakeup.set()
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.outbox)
+
+    def flush(self) -> bool:
+        """Deliver the outbox; returns True once it is empty."""
+        if not self.webhook_url:
+            if self.pending():
+                print("WEBHOOK_URL not found. Alerts stay in the outbox until one is configured.")
+            return not self.pending()
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = pack_messages(self.outbox)
+                if batch is None:
+                    return True
+                content, count = batch
+                if not self.post(content):
+                    return False
+                with self.lock:
+                    del self.outbox[:count]
+                    try:
+                        self.save_outbox()
+                    except OSError as e:
+                        print(f"Error writing the Discord outbox {self.outbox_path}: {e}")
+
+    def post(self, content: str) -> bool:
+        """Post one message, waiting out short rate limits. False leaves it for later."""
+        while True:
+            wait = self.not_before - time.monotonic()
+            if wait > MAX_WAIT:
+                print(f"Discord rate limit: {wait:.0f}s left, keeping alerts for later.")
+                return False
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = self.session.post(self.webhook_url, json={"content": content}, timeout=TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to send message to Discord: {e}")
+                return False
+            self.update_rate_limit(response)
+            if response.status_code == 429:
+                continue
+            if response.ok:
+                print("Successfully sent message to Discord.")
+                return True
+            if 400 <= response.status_code < 500:
+                # The webhook rejects this message, retrying would only repeat that
+                print(f"Discord rejected a message ({response.status_code}), dropping it: {response.text[:200]}")
+                return True
+            print(f"Failed to send message to Discord: HTTP {response.status_code}")
+            return False
+
+    def update_rate_limit(self, response: requests.Response):
+        delay = 0.0
+        if response.status_code == 429:
+            try:
+                delay = float(response.json().get("retry_after", 0))
+            except (ValueError, AttributeError):
+                delay = float(response.headers.get("Retry-After", 1) or 1)
+            delay = max(delay, 0.5)
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                delay = float(response.headers.get("X-RateLimit-Reset-After", 0))
+            except ValueError:
+                delay = 1.0
+        if delay:
+            self.not_before = max(self.not_before, time.monotonic() + delay)
+
+    def send(self, message: str) -> bool:
+        """Queue an alert and deliver the outbox right away."""
+        self.notify(message)
+        return self.flush()
+
+    def start(self):
+        """Deliver alerts from a background thread as they are queued."""
+        self.thread = threading.Thread(target=self._run, name="DiscordNotifier", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        retry_delay = 5.0
+        while not self.stopped.is_set():
+            self.wakeup.wait(retry_delay if self.pending() else None)
+            self.wakeup.clear()
+            if self.stopped.is_set():
+                break
+            # Let a burst of alerts arrive so they go out as one message
+            self.stopped.wait(self.coalesce_delay)
+            if self.flush():
+                retry_delay = 5.0
+            else:
+                retry_delay = min(retry_delay * 2, 300.0)
+
+    def stop(self, flush: bool = True):
+        """Stop the background thread and make a last delivery attempt."""
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+        if flush and self.pending():
+            self.flush()
+        self.session.close()
+
+
+def pack_messages(outbox: List[str]):
+    """
+    Join as many leading alerts as fit one Discord message. Returns the
+    content and how many alerts it covers, or None if the outbox is empty.
+    An alert that is too long on its own is cut to the limit.
+    """
+    if not outbox:
+        return None
+    content = outbox[0][:MAX_CONTENT]
+    count = 1
+    for message in outbox[1:]:
+        if len(content) + len(SEPARATOR) + len(message) > MAX_CONTENT:
+            break
+        content += SEPARATOR + message
+        count += 1
+    return content, count
+
+
+def main():
+    """Retry the alerts in an outbox, optionally queueing a new one first."""
+    if len(sys.argv) < 2:
+        print("Usage: python discord_notifier.py OUTBOX_FILE [MESSAGE]")
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    notifier = DiscordNotifier(os.getenv("RACKHAM_WEBHOOK"), sys.argv[1])
+    if len(sys.argv) > 2:
+        notifier.notify(" ".join(sys.argv[2:]))
+    delivered = notifier.flush()
+    print("Outbox delivered." if delivered else f"{notifier.pending()} alert(s) left in the outbox.")
+    notifier.stop(flush=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Market fetch backends for the Grapevine System.
+Reads commodity sell prices from an inara.cz station-market page.
+
+The "http" backend downloads the page over a pooled requests session and
+feeds it in chunks to a streaming HTML parser, stopping as soon as every
+wanted commodity row has been seen. It needs no browser, display or
+chromedriver. The "selenium" backend drives headless Chrome as before and
+is kept as a fallback for when the plain page stops carrying the prices.
+
+Usage:
+- python market_fetch.py https://inara.cz/elite/station-market/230278/ Wine
+- python market_fetch.py saved_page.html Wine Gold
+"""
+
+import sys
+import time
+import codecs
+import hashlib
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CHROMEDRIVER_PATH = '/usr/bin/chromedriver'
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) Grapevine/1.0 (Rackham wine monitor)"
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 20)
+CHUNK_SIZE = 16384
+
+
+class MarketParser(HTMLParser):
+    """
+    Streaming parser for station-market tables.
+
+    A row belongs to a commodity when one of its links has exactly the
+    commodity's name as text, and the sell price is the data-order
+    attribute of the row's second cell, the same cell the Selenium backend
+    reads with "//a[text()='Wine']/ancestor::tr" and ".//td[2]".
+    """
+    def __init__(self, commodities: Iterable[str]):
+        super().__init__(convert_charrefs=True)
+        self.wanted = set(commodities)
+        self.prices: Dict[str, int] = {}
+        self.in_row = False
+        self.in_link = False
+        self.cells = []
+        self.link_text = []
+        self.names = []
+
+    @property
+    def done(self) -> bool:
+        return self.wanted <= self.prices.keys()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self.in_row = True
+            self.cells = []
+            self.names = []
+        elif not self.in_row:
+            return
+        elif tag == "td":
+            self.cells.append(dict(attrs))
+        elif tag == "a":
+            self.in_link = True
+            self.link_text = []
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self.in_link:
+            self.in_link = False
+            self.names.append("".join(self.link_text))
+        elif tag == "tr" and self.in_row:
+            self.in_row = False
+            self.finish_row()
+
+    def handle_data(self, data):
+        if self.in_link:
+            self.link_text.append(data)
+
+    def finish_row(self):
+        for name in self.names:
+            if name in self.wanted and name not in self.prices and len(self.cells) >= 2:
+                try:
+                    self.prices[name] = int(self.cells[1].get("data-order"))
+                except (TypeError, ValueError):
+                    print(f"The price cell of the '{name}' row has no usable data-order attribute.")
+
+
+def parse_market(html: str, commodities: Iterable[str]) -> Dict[str, int]:
+    """Parse a whole station-market page, e.g. a saved copy."""
+    parser = MarketParser(commodities)
+    parser.feed(html)
+    parser.close()
+    return parser.prices
+
+
+def make_session(pool_size: int = 4) -> requests.Session:
+    """A requests session that keeps connections to the market site open."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+class HttpFetcher:
+    """
+    Fetches market prices over plain HTTP with a streaming parser.
+
+    With conditional=True, each page's ETag, Last-Modified and content hash
+    are remembered. A 304 Not Modified or an identical body returns the
+    previous prices without parsing and reports the page as unchanged.
+    A 429 or 503 with Retry-After is remembered per host, so a polling
+    loop can back off for as long as the site asked.
+    """
+    def __init__(self, session: Optional[requests.Session] = None, conditional: bool = False):
+        self.session = session or make_session()
+        self.conditional = conditional
+        # url -> (ETag, Last-Modified, body hash, commodities, prices)
+        self.pages: Dict[str, tuple] = {}
+        self.retry_after: Dict[str, float] = {}
+        self.parses = 0
+
+    def get_prices(self, url: str, commodities: Iterable[str]) -> Dict[str, int]:
+        return self.fetch(url, commodities)[0]
+
+    def fetch(self, url: str, commodities: Iterable[str]) -> Tuple[Dict[str, int], bool]:
+        """Return the prices on the page and whether the page changed since the last fetch."""
+        commodities = sorted(commodities)
+        if not self.conditional:
+            with self.session.get(url, timeout=TIMEOUT, stream=True) as response:
+                self.check_status(url, response)
+                return self.parse_stream(response, commodities), True
+
+        etag, modified, digest, cached_for, cached = self.pages.get(url, (None, None, None, None, None))
+        reusable = cached_for == commodities
+        headers = {}
+        if reusable and etag:
+            headers["If-None-Match"] = etag
+        if reusable and modified:
+            headers["If-Modified-Since"] = modified
+        with self.session.get(url, timeout=TIMEOUT, headers=headers) as response:
+            if response.status_code == 304 and reusable:
+                return dict(cached), False
+            self.check_status(url, response)
+            body = response.content
+            new_digest = hashlib.sha256(body).hexdigest()
+            if reusable and new_digest == digest:
+                prices, changed = dict(cached), False
+            else:
+                self.parses += 1
+                prices, changed = parse_market(body.decode(response.encoding or "utf-8", "replace"), commodities), True
+            self.pages[url] = (response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                               new_digest, commodities, dict(prices))
+        return prices, changed
+
+    def parse_stream(self, response: requests.Response, commodities: Iterable[str]) -> Dict[str, int]:
+        self.parses += 1
+        parser = MarketParser(commodities)
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        for chunk in response.iter_content(CHUNK_SIZE):
+            parser.feed(decoder.decode(chunk))
+            if parser.done:
+                # The rest of the page is not needed
+                break
+        else:
+            parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+        return parser.prices
+
+    def check_status(self, url: str, response: requests.Response):
+        """Raise for HTTP errors, remembering how long the host asked us to wait."""
+        if response.status_code in (429, 503):
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                self.retry_after[urlsplit(url).netloc] = time.time() + retry_after
+        response.raise_for_status()
+
+    def backoff_remaining(self) -> float:
+        """Seconds until every host that asked for a pause is willing again."""
+        return max((until - time.time() for until in self.retry_after.values()), default=0.0)
+
+    def close(self):
+        self.session.close()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def xpath_literal(value: str) -> str:
+    """Quote a string for XPath 1.0, which has no escapes inside string literals."""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    # Both quote kinds, e.g. Baltah'sine "Krill": glue the pieces back together
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in value.split("'")) + ")"
+
+
+class SeleniumFetcher:
+    """Fetches market prices with headless Chrome, for when plain HTTP is not enough."""
+    def __init__(self, chromedriver_path: str = CHROMEDRIVER_PATH):
+        self.chromedriver_path = chromedriver_path
+
+    def fetch(self, url: str, commodities: Iterable[str]) -> Tuple[Dict[str, int], bool]:
+        return self.get_prices(url, commodities), True
+
+    def get_prices(self, url: str, commodities: Iterable[str]) -> Dict[str, int]:
+        # Imported here so the HTTP backend never pays for loading Selenium
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.chrome.options import Options
+        from selenium.common.exceptions import NoSuchElementException
+
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        service = Service(executable_path=self.chromedriver_path)
+
+        prices = {}
+        # The 'with' statement calls driver.quit() even if an error occurs
+        with webdriver.Chrome(service=service, options=chrome_options) as driver:
+            driver.get(url)
+            for commodity in commodities:
+                try:
+                    row = driver.find_element(By.XPATH, f"//a[text()={xpath_literal(commodity)}]/ancestor::tr")
+                    prices[commodity] = int(row.find_element(By.XPATH, ".//td[2]").get_attribute("data-order"))
+                except NoSuchElementException:
+                    print(f"The expected '{commodity}' row or price element was not found on the page.")
+        return prices
+
+    def close(self):
+        pass
+
+
+class FallbackFetcher:
+    """Tries each backend in turn until one finds every commodity."""
+    def __init__(self, *fetchers):
+        self.fetchers = fetchers
+
+    def get_prices(self, url: str, commodities: Iterable[str]) -> Dict[str, int]:
+        return self.fetch(url, commodities)[0]
+
+    def fetch(self, url: str, commodities: Iterable[str]) -> Tuple[Dict[str, int], bool]:
+        commodities = list(commodities)
+        prices: Dict[str, int] = {}
+        changed = False
+        for fetcher in self.fetchers:
+            missing = [name for name in commodities if name not in prices]
+            try:
+                found, fetcher_changed = fetcher.fetch(url, missing)
+                prices.update(found)
+                changed = changed or fetcher_changed
+            except Exception as e:
+                print(f"{type(fetcher).__name__} failed to fetch {url}: {e}")
+            if len(prices) == len(commodities):
+                break
+        return prices, changed
+
+    def backoff_remaining(self) -> float:
+        return max((fetcher.backoff_remaining() for fetcher in self.fetchers
+                    if hasattr(fetcher, "backoff_remaining")), default=0.0)
+
+    def close(self):
+        for fetcher in self.fetchers:
+            fetcher.close()
+
+
+def make_fetcher(backend: str = "http", fallback: bool = True, conditional: bool = False):
+    """
+    Create the "http" or "selenium" backend, optionally falling back to
+    Selenium. conditional enables the HTTP backend's page cache.
+    """
+    if backend == "selenium":
+        return SeleniumFetcher()
+    if backend != "http":
+        raise ValueError(f"Unknown market fetch backend: {backend}")
+    if fallback:
+        return FallbackFetcher(HttpFetcher(conditional=conditional), SeleniumFetcher())
+    return HttpFetcher(conditional=conditional)
+
+
+def main():
+    """Print commodity prices from a market page URL or a saved HTML file."""
+    if len(sys.argv) < 3:
+        print("Usage: python market_fetch.py URL_OR_FILE COMMODITY [COMMODITY ...]")
+        return
+    source, commodities = sys.argv[1], sys.argv[2:]
+    if source.startswith(("http://", "https://")):
+        fetcher = HttpFetcher()
+        try:
+            prices = fetcher.get_prices(source, commodities)
+        finally:
+            fetcher.close()
+    else:
+        prices = parse_market(Path(source).read_text(encoding="utf-8"), commodities)
+    for commodity in commodities:
+        print(f"{commodity}: {prices.get(commodity, 'not found')}")
+
+
+if __name__ == "__main__":
+    main()
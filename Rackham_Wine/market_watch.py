@@ -0,0 +1,134 @@
+"""
+Market watchlist for the Grapevine System.
+Checks any number of (station, commodity, threshold, direction) rules.
+
+Rules are read from a JSON file:
+
+    [
+        {"name": "Rackham Wine", "url": "https://inara.cz/elite/station-market/230278/",
+         "commodity": "Wine", "threshold": 250000, "direction": "above", "quantity": 60000},
+        {"name": "Cheap Gold", "url": "https://inara.cz/elite/station-market/123/",
+         "commodity": "Gold", "threshold": 40000, "direction": "below"}
+    ]
+
+Rules can also test rolling statistics of the price history instead of the
+price itself, see price_analytics.py.
+
+Every station page is fetched once per round however many rules watch it.
+Pages are fetched concurrently by a bounded thread pool, and a per-host
+limiter caps parallel requests and spaces them out so one site is not
+hammered.
+"""
+
+import json
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from price_analytics import AnalyticsRule
+
+DIRECTIONS = ("above", "below")
+
+
+class MarketRule:
+    """Alert when a commodity's price at a station crosses a threshold."""
+    def __init__(self, name: str, url: str, commodity: str, threshold: int,
+                 direction: str = "above", quantity: Optional[int] = None):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Rule '{name}': direction must be one of {DIRECTIONS}, not '{direction}'")
+        self.name = name
+        self.url = url
+        self.commodity = commodity
+        self.threshold = threshold
+        self.direction = direction
+        self.quantity = quantity
+
+    def triggered(self, price: int, analytics=None) -> bool:
+        if self.direction == "above":
+            return price > self.threshold
+        return price < self.threshold
+
+    def reset_text(self) -> str:
+        """What has happened when the rule stops being triggered."""
+        return f"price is back across {self.threshold} Cr."
+
+    def message(self, price: int, analytics=None) -> str:
+        word = "high" if self.direction == "above" else "low"
+        crossed = "exceeding" if self.direction == "above" else "falling below"
+        message = (f"# **{self.commodity} Price Alert!**\n\nThe price of {self.commodity} at {self.name}"
+                   f" has been detected at a new {word} of **{price} Cr.**, {crossed} the"
+                   f" {self.threshold} Cr. threshold.")
+        if self.quantity:
+            message += f" The profit is estimated to be approximately **{price * self.quantity:,} Cr.**"
+        return message
+
+
+def load_rules(path: Path, default: List[MarketRule]) -> list:
+    """
+    Read the rules file, or use the default rules if there is none. Rules
+    with a "metric" are analytics rules, see price_analytics.py.
+    """
+    if not path.exists():
+        return default
+    with open(path, 'r') as f:
+        return [AnalyticsRule(**rule) if "metric" in rule else MarketRule(**rule) for rule in json.load(f)]
+
+
+class HostRateLimiter:
+    """Limits parallel requests per host and spaces out their start times."""
+    def __init__(self, min_interval: float = 1.0, max_per_host: int = 2):
+        self.min_interval = min_interval
+        self.max_per_host = max_per_host
+        self.lock = threading.Lock()
+        self.slots: Dict[str, threading.Semaphore] = {}
+        self.next_start: Dict[str, float] = defaultdict(float)
+
+    def acquire(self, url: str) -> str:
+        host = urlsplit(url).netloc
+        with self.lock:
+            slot = self.slots.setdefault(host, threading.Semaphore(self.max_per_host))
+        slot.acquire()
+        with self.lock:
+            # Reserve the next start time for this host
+            now = time.monotonic()
+            start = max(now, self.next_start[host])
+            self.next_start[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return host
+
+    def release(self, host: str):
+        self.slots[host].release()
+
+
+def fetch_all(rules: List[MarketRule], fetcher, limiter: HostRateLimiter,
+              workers: int = 8) -> Dict[str, Tuple[Dict[str, int], bool]]:
+    """
+    Fetch every page the rules watch, once each, and return the prices
+    found per page URL along with whether the page changed since the
+    fetcher last saw it. Failed pages are reported and left out.
+    """
+    wanted: Dict[str, set] = defaultdict(set)
+    for rule in rules:
+        wanted[rule.url].add(rule.commodity)
+
+    def fetch(url: str) -> Tuple[Dict[str, int], bool]:
+        host = limiter.acquire(url)
+        try:
+            return fetcher.fetch(url, sorted(wanted[url]))
+        finally:
+            limiter.release(host)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(wanted)))) as pool:
+        futures = {url: pool.submit(fetch, url) for url in wanted}
+        for url, future in futures.items():
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                print(f"An error occurred while fetching {url}: {e}")
+    return results
@@ -0,0 +1,423 @@
+"""
+Price analytics for the Grapevine System.
+Rolling statistics over the stored price history and alert rules on them.
+
+Every window keeps running aggregates that are updated as samples arrive
+and expire: sum and sum of squares for the mean and deviation, monotonic
+queues for the minimum and maximum, a price histogram for percentiles, and
+the times the price crossed the window mean, a rough cycle detector. Adding
+a sample costs the same however long the window is. The aggregates are
+saved in the history store along with each run's samples, so a run only
+reads back the samples that left its windows, even in one-shot cron mode;
+a window is only built from the full history the first time it is used.
+
+Analytics rules go in the same rules file as threshold rules:
+
+    {"name": "Wine surge", "url": "https://inara.cz/elite/station-market/230278/",
+     "commodity": "Wine", "metric": "change", "window": "2h", "threshold": 0.2}
+    {"name": "Wine at a yearly high", "url": "...", "commodity": "Wine",
+     "metric": "percentile", "window": "365d", "threshold": 95}
+
+Usage:
+- python price_analytics.py wine_price_history.sqlite3
+"""
+
+import sys
+import math
+import time
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from price_store import PriceHistoryStore
+
+SPAN_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+# Metrics an analytics rule can test, see RollingWindow.metric
+METRICS = ("mean", "min", "max", "change", "percentile", "zscore", "crossings")
+
+# Price histogram resolution in Cr.
+PERCENTILE_BUCKET = 500
+
+# (timestamp, price) of one sample
+Sample = Tuple[float, int]
+
+
+def parse_span(span: str) -> int:
+    """Convert a window length such as "30m", "2h" or "365d" to seconds."""
+    try:
+        return int(float(span[:-1]) * SPAN_UNITS[span[-1]])
+    except (KeyError, ValueError, IndexError):
+        raise ValueError(f"Window must look like 30m, 2h or 365d, not '{span}'")
+
+
+class SampleQueue:
+    """The samples of a window, kept in memory, oldest first."""
+    def __init__(self):
+        self.samples: deque = deque()
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @property
+    def first(self) -> Optional[Sample]:
+        return self.samples[0] if self.samples else None
+
+    @property
+    def last(self) -> Optional[Sample]:
+        return self.samples[-1] if self.samples else None
+
+    def append(self, sample: Sample):
+        self.samples.append(sample)
+
+    def expire(self, cutoff: float) -> List[Sample]:
+        """Remove and return the samples older than cutoff."""
+        leaving = []
+        while self.samples and self.samples[0][0] < cutoff:
+            leaving.append(self.samples.popleft())
+        return leaving
+
+
+class StoredSamples:
+    """
+    The samples of one market's window, left in the history store. Only
+    their number and the oldest and newest are kept in memory; samples that
+    leave the window are read back from the store's time index. Samples
+    added since the store last saved them are held in pending.
+    """
+    def __init__(self, store: PriceHistoryStore, market_id: int, cutoff: float, count: int = 0,
+                 first: Optional[Sample] = None, last: Optional[Sample] = None):
+        self.store = store
+        self.market_id = market_id
+        self.cutoff = cutoff
+        self.count = count
+        self.first = first
+        self.last = last
+        self.pending: List[Sample] = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, sample: Sample):
+        self.pending.append(sample)
+        self.count += 1
+        self.last = sample
+        if self.first is None:
+            self.first = sample
+
+    def expire(self, cutoff: float) -> List[Sample]:
+        """Return the samples older than cutoff, read from the store."""
+        if self.first is None or self.first[0] >= cutoff:
+            self.cutoff = max(self.cutoff, cutoff)
+            return []
+        # Pending samples are newer than everything stored for the window
+        end = min(cutoff, self.pending[0][0]) if self.pending else cutoff
+        leaving = self.store.samples_between(self.market_id, self.cutoff, end)
+        while self.pending and self.pending[0][0] < cutoff:
+            leaving.append(self.pending.pop(0))
+        self.cutoff = cutoff
+        self.count -= len(leaving)
+        self.first = None
+        if self.count:
+            self.first = self.store.first_sample(self.market_id, cutoff) or self.pending[0]
+        return leaving
+
+    def saved(self):
+        """The store now holds every pending sample."""
+        self.pending.clear()
+
+    def state(self) -> dict:
+        return {"cutoff": self.cutoff, "count": self.count, "first": self.first, "last": self.last}
+
+    @classmethod
+    def from_state(cls, store: PriceHistoryStore, market_id: int, state: dict) -> "StoredSamples":
+        return cls(store, market_id, state["cutoff"], state["count"],
+                   tuple(state["first"]) if state["first"] else None,
+                   tuple(state["last"]) if state["last"] else None)
+
+
+class RollingWindow:
+    """Running aggregates of the samples in the last span seconds."""
+    def __init__(self, span: int, samples=None):
+        self.span = span
+        # A SampleQueue, or StoredSamples to leave the samples in the history store
+        self.samples = samples if samples is not None else SampleQueue()
+        self.total = 0
+        self.squares = 0
+        self.mins: deque = deque()
+        self.maxs: deque = deque()
+        self.bins: Counter = Counter()
+        self.crossing_times: deque = deque()
+        self.side = 0
+
+    def add(self, timestamp: float, price: int):
+        self.samples.append((timestamp, price))
+        self.total += price
+        self.squares += price * price
+        while self.mins and self.mins[-1][1] >= price:
+            self.mins.pop()
+        self.mins.append((timestamp, price))
+        while self.maxs and self.maxs[-1][1] <= price:
+            self.maxs.pop()
+        self.maxs.append((timestamp, price))
+        self.bins[price // PERCENTILE_BUCKET] += 1
+        self.expire(timestamp)
+
+        side = (price > self.mean) - (price < self.mean)
+        if side and self.side and side != self.side:
+            self.crossing_times.append(timestamp)
+        if side:
+            self.side = side
+
+    def expire(self, now: float):
+        cutoff = now - self.span
+        for _, price in self.samples.expire(cutoff):
+            self.total -= price
+            self.squares -= price * price
+            key = price // PERCENTILE_BUCKET
+            self.bins[key] -= 1
+            if not self.bins[key]:
+                del self.bins[key]
+        while self.mins and self.mins[0][0] < cutoff:
+            self.mins.popleft()
+        while self.maxs and self.maxs[0][0] < cutoff:
+            self.maxs.popleft()
+        while self.crossing_times and self.crossing_times[0] < cutoff:
+            self.crossing_times.popleft()
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(max(0.0, self.squares / self.count - self.mean ** 2))
+
+    def change(self) -> float:
+        """Relative change from the oldest to the newest sample in the window."""
+        oldest, newest = self.samples.first[1], self.samples.last[1]
+        return (newest - oldest) / oldest if oldest else 0.0
+
+    def percentile(self, price: int) -> float:
+        """
+        Percentile rank of the price in the window, 0 to 100. Samples in the
+        price's own bucket count half, so a flat price ranks 50, not 100.
+        """
+        key = price // PERCENTILE_BUCKET
+        below = sum(count for bucket, count in self.bins.items() if bucket < key)
+        return 100.0 * (below + self.bins.get(key, 0) / 2) / self.count
+
+    def quantile(self, q: float) -> float:
+        """Approximate price below which a fraction q of the samples fall."""
+        target = q * self.count
+        seen = 0
+        for bucket in sorted(self.bins):
+            seen += self.bins[bucket]
+            if seen >= target:
+                return (bucket + 1) * PERCENTILE_BUCKET
+        return float(self.maxs[0][1]) if self.maxs else 0.0
+
+    def metric(self, name: str) -> Optional[float]:
+        """The named metric for the newest sample, or None without enough data."""
+        if self.count < 2:
+            return None
+        price = self.samples.last[1]
+        if name == "mean":
+            return self.mean
+        if name == "min":
+            return self.mins[0][1]
+        if name == "max":
+            return self.maxs[0][1]
+        if name == "change":
+            return self.change()
+        if name == "percentile":
+            return self.percentile(price)
+        if name == "zscore":
+            return (price - self.mean) / self.std if self.std else 0.0
+        if name == "crossings":
+            return len(self.crossing_times)
+        raise ValueError(f"Unknown metric '{name}'")
+
+    def summary(self) -> str:
+        if not self.count:
+            return "no samples"
+        return (f"{self.count} samples, mean {self.mean:,.0f}, min {self.mins[0][1]:,}, max {self.maxs[0][1]:,},"
+                f" change {self.change():+.1%}, 5-95% band {self.quantile(0.05):,.0f}-{self.quantile(0.95):,.0f},"
+                f" mean crossings {len(self.crossing_times)}")
+
+    def state(self) -> dict:
+        """The aggregates as JSON-friendly values, see from_state."""
+        return {
+            "total": self.total, "squares": self.squares, "mins": list(self.mins), "maxs": list(self.maxs),
+            "bins": dict(self.bins), "crossing_times": list(self.crossing_times), "side": self.side,
+            "samples": self.samples.state(),
+        }
+
+    @classmethod
+    def from_state(cls, span: int, state: dict, samples) -> "RollingWindow":
+        window = cls(span, samples)
+        window.total = state["total"]
+        window.squares = state["squares"]
+        window.mins = deque(tuple(sample) for sample in state["mins"])
+        window.maxs = deque(tuple(sample) for sample in state["maxs"])
+        # JSON object keys are strings
+        window.bins = Counter({int(bucket): count for bucket, count in state["bins"].items()})
+        window.crossing_times = deque(state["crossing_times"])
+        window.side = state["side"]
+        return window
+
+
+class MarketAnalytics:
+    """Rolling windows of one (station page, commodity) market."""
+    def __init__(self, spans: Iterable[int]):
+        self.windows = {span: RollingWindow(span) for span in spans}
+
+    def add(self, timestamp: float, price: int):
+        for window in self.windows.values():
+            window.add(timestamp, price)
+
+
+class AnalyticsBook:
+    """
+    The analytics of every market the rules need. Their windows leave the
+    samples in the history store and save their aggregates there, see
+    window_states; a window without saved aggregates is built from the
+    history once.
+    """
+    def __init__(self, store: PriceHistoryStore, rules: Iterable):
+        self.store = store
+        self.spans: Dict[Tuple[str, str], set] = {}
+        for rule in rules:
+            if isinstance(rule, AnalyticsRule):
+                self.spans.setdefault((rule.url, rule.commodity), set()).add(rule.span)
+        self.markets: Dict[Tuple[str, str], MarketAnalytics] = {}
+        longest = max((max(spans) for spans in self.spans.values()), default=0)
+        if store.retention_days is not None:
+            # Windows read their expiring samples back, so those must not be pruned first
+            store.retention_days = max(store.retention_days, math.ceil(longest / 86400))
+
+    def get(self, url: str, commodity: str) -> Optional[MarketAnalytics]:
+        key = (url, commodity)
+        if key not in self.spans:
+            return None
+        if key not in self.markets:
+            self.markets[key] = self.load(url, commodity)
+        return self.markets[key]
+
+    def load(self, url: str, commodity: str) -> MarketAnalytics:
+        market_id = self.store.market_id(url, commodity)
+        saved = self.store.window_states(market_id)
+        analytics = MarketAnalytics([])
+        now = time.time()
+        for span in self.spans[url, commodity]:
+            state = saved.get(span)
+            if state is None:
+                window = RollingWindow(span, StoredSamples(self.store, market_id, now - span))
+                rows = self.store.history(url, commodity, now - span)
+            else:
+                samples = StoredSamples.from_state(self.store, market_id, state["samples"])
+                window = RollingWindow.from_state(span, state, samples)
+                # Samples stored by a run that could not save the window
+                last = window.samples.last
+                rows = self.store.history(url, commodity, last[0] if last else window.samples.cutoff)
+                if last:
+                    rows = [row for row in rows if row[0] > last[0]]
+            for timestamp, price in rows:
+                window.add(timestamp, price)
+            window.samples.saved()
+            analytics.windows[span] = window
+        return analytics
+
+    def window_states(self) -> Dict[Tuple[int, int], dict]:
+        """{(market id, span): aggregates} of every window in use, for PriceHistoryStore.append."""
+        return {(window.samples.market_id, span): window.state()
+                for analytics in self.markets.values() for span, window in analytics.windows.items()}
+
+    def saved(self):
+        """The store now holds every sample added to the windows."""
+        for analytics in self.markets.values():
+            for window in analytics.windows.values():
+                window.samples.saved()
+
+    def add(self, url: str, commodity: str, timestamp: float, price: int):
+        analytics = self.get(url, commodity)
+        if analytics is not None:
+            analytics.add(timestamp, price)
+
+
+class AnalyticsRule:
+    """Alert when a rolling metric of a market crosses a threshold."""
+    def __init__(self, name: str, url: str, commodity: str, metric: str, window: str,
+                 threshold: float, direction: str = "above", quantity: Optional[int] = None):
+        if metric not in METRICS:
+            raise ValueError(f"Rule '{name}': metric must be one of {METRICS}, not '{metric}'")
+        if direction not in ("above", "below"):
+            raise ValueError(f"Rule '{name}': direction must be 'above' or 'below', not '{direction}'")
+        self.name = name
+        self.url = url
+        self.commodity = commodity
+        self.metric = metric
+        self.window = window
+        self.span = parse_span(window)
+        self.threshold = threshold
+        self.direction = direction
+        self.quantity = quantity
+
+    def value(self, analytics: Optional[MarketAnalytics]) -> Optional[float]:
+        if analytics is None:
+            return None
+        return analytics.windows[self.span].metric(self.metric)
+
+    def triggered(self, price: int, analytics: Optional[MarketAnalytics] = None) -> bool:
+        value = self.value(analytics)
+        if value is None:
+            return False
+        if self.direction == "above":
+            return value >= self.threshold
+        return value <= self.threshold
+
+    def format(self, value: float) -> str:
+        return f"{value:+.1%}" if self.metric == "change" else f"{value:,.2f}"
+
+    def reset_text(self) -> str:
+        """What has happened when the rule stops being triggered."""
+        return f"the {self.window} {self.metric} is back across {self.format(self.threshold)}"
+
+    def message(self, price: int, analytics: Optional[MarketAnalytics] = None) -> str:
+        value = self.value(analytics)
+        message = (f"# **{self.commodity} Trend Alert!**\n\n{self.name}: the {self.window} {self.metric}"
+                   f" of {self.commodity} is **{self.format(value)}** ({self.direction} {self.threshold})"
+                   f" with the price at **{price} Cr.**")
+        if self.quantity:
+            message += f" The profit is estimated to be approximately **{price * self.quantity:,} Cr.**"
+        return message
+
+
+def main():
+    """Print rolling statistics of every market in a history database."""
+    if len(sys.argv) != 2:
+        print("Usage: python price_analytics.py HISTORY_DB")
+        return
+    store = PriceHistoryStore(sys.argv[1], retention_days=None)
+    spans = [parse_span(span) for span in ("2h", "1d", "30d", "365d")]
+    try:
+        for url, commodity in store.db.execute("SELECT url, commodity FROM markets ORDER BY url, commodity"):
+            analytics = MarketAnalytics(spans)
+            for timestamp, price in store.history(url, commodity, time.time() - max(spans)):
+                analytics.add(timestamp, price)
+            for span in spans:
+                analytics.windows[span].expire(time.time())
+            print(f"{commodity} at {url}")
+            for span, name in zip(spans, ("2h", "1d", "30d", "365d")):
+                print(f"  {name:>4}: {analytics.windows[span].summary()}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
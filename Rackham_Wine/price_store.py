@@ -0,0 +1,146 @@
+"""
+Price history store for the Grapevine System.
+An append-only SQLite database of market price samples and alert state.
+
+Each run only inserts its new samples and deletes the expired ones through
+the time index, inside one transaction, so the cost of a run no longer grows
+with the length of the history and a crash can never leave a half-written
+file. The aggregates of the analytics windows are saved in the same
+transaction, see price_analytics.py. The JSON history written by earlier
+versions is imported once and then renamed out of the way.
+"""
+
+import os
+import json
+import sqlite3
+import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (url, commodity, price) of one sample
+Sample = Tuple[str, str, int]
+
+
+class PriceHistoryStore:
+    """Price samples per (station page, commodity) and per-rule notification flags."""
+    def __init__(self, path: str, retention_days: Optional[int] = 365):
+        self.path = path
+        self.retention_days = retention_days
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS markets ("
+            " market_id INTEGER PRIMARY KEY, url TEXT NOT NULL, commodity TEXT NOT NULL,"
+            " UNIQUE (url, commodity));"
+            "CREATE TABLE IF NOT EXISTS prices ("
+            " market_id INTEGER NOT NULL, ts REAL NOT NULL, price INTEGER NOT NULL,"
+            " PRIMARY KEY (market_id, ts)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS prices_ts ON prices (ts);"
+            "CREATE TABLE IF NOT EXISTS notified ("
+            " rule TEXT PRIMARY KEY, notified INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS windows ("
+            " market_id INTEGER NOT NULL, span INTEGER NOT NULL, state TEXT NOT NULL,"
+            " PRIMARY KEY (market_id, span)) WITHOUT ROWID;"
+        )
+        self.db.commit()
+        self.market_ids: Dict[Tuple[str, str], int] = {}
+
+    def close(self):
+        self.db.close()
+
+    def market_id(self, url: str, commodity: str) -> int:
+        key = (url, commodity)
+        if key not in self.market_ids:
+            self.db.execute("INSERT OR IGNORE INTO markets (url, commodity) VALUES (?, ?)", key)
+            self.market_ids[key] = self.db.execute(
+                "SELECT market_id FROM markets WHERE url = ? AND commodity = ?", key
+            ).fetchone()[0]
+        return self.market_ids[key]
+
+    def append(self, samples: Iterable[Sample], notified: Optional[Dict[str, bool]] = None,
+               timestamp: Optional[float] = None, windows: Optional[Dict[Tuple[int, int], dict]] = None):
+        """
+        Add samples taken at one moment, save the notification flags and the
+        {(market id, span): aggregates} of analytics windows, and drop expired samples.
+        """
+        timestamp = datetime.datetime.now().timestamp() if timestamp is None else timestamp
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO prices (market_id, ts, price) VALUES (?, ?, ?)",
+                [(self.market_id(url, commodity), timestamp, price) for url, commodity, price in samples],
+            )
+            if notified is not None:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO notified (rule, notified) VALUES (?, ?)",
+                    [(rule, int(state)) for rule, state in notified.items()],
+                )
+            if windows:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO windows (market_id, span, state) VALUES (?, ?, ?)",
+                    [(market_id, span, json.dumps(state)) for (market_id, span), state in windows.items()],
+                )
+            if self.retention_days is not None:
+                cutoff = timestamp - self.retention_days * 86400
+                self.db.execute("DELETE FROM prices WHERE ts < ?", (cutoff,))
+
+    def get_notified(self) -> Dict[str, bool]:
+        return {rule: bool(state) for rule, state in self.db.execute("SELECT rule, notified FROM notified")}
+
+    def history(self, url: str, commodity: str, since: Optional[float] = None) -> List[Tuple[float, int]]:
+        """(timestamp, price) samples of one market, oldest first."""
+        return self.db.execute(
+            "SELECT ts, price FROM prices JOIN markets USING (market_id)"
+            " WHERE url = ? AND commodity = ? AND ts >= ? ORDER BY ts",
+            (url, commodity, since if since is not None else float("-inf")),
+        ).fetchall()
+
+    def samples_between(self, market_id: int, start: float, end: float) -> List[Tuple[float, int]]:
+        """(timestamp, price) samples of one market from start up to, not including, end."""
+        return self.db.execute(
+            "SELECT ts, price FROM prices WHERE market_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (market_id, start, end),
+        ).fetchall()
+
+    def first_sample(self, market_id: int, since: float) -> Optional[Tuple[float, int]]:
+        """The oldest (timestamp, price) sample of one market from since on."""
+        return self.db.execute(
+            "SELECT ts, price FROM prices WHERE market_id = ? AND ts >= ? ORDER BY ts LIMIT 1",
+            (market_id, since),
+        ).fetchone()
+
+    def window_states(self, market_id: int) -> Dict[int, dict]:
+        """The saved {span: aggregates} of one market's analytics windows."""
+        return {span: json.loads(state) for span, state in
+                self.db.execute("SELECT span, state FROM windows WHERE market_id = ?", (market_id,))}
+
+    def import_json(self, data: dict, default_url: str, default_commodity: str) -> int:
+        """
+        Import a JSON history as read by rackham_wine.read_json_history.
+        Entries without a url and commodity are the default market.
+        """
+        rows = []
+        for entry in data.get("history", []):
+            try:
+                timestamp = datetime.datetime.fromisoformat(entry["timestamp"]).timestamp()
+                price = int(entry["price"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            rows.append((self.market_id(entry.get("url", default_url), entry.get("commodity", default_commodity)),
+                         timestamp, price))
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO prices (market_id, ts, price) VALUES (?, ?, ?)", rows)
+            self.db.executemany(
+                "INSERT OR REPLACE INTO notified (rule, notified) VALUES (?, ?)",
+                [(rule, int(state)) for rule, state in data.get("notified", {}).items()],
+            )
+        return len(rows)
+
+
+def migrate_json_file(store: PriceHistoryStore, json_path: str, data: dict,
+                      default_url: str, default_commodity: str):
+    """Import the old JSON history once, then move the file aside so it is not imported again."""
+    count = store.import_json(data, default_url, default_commodity)
+    os.replace(json_path, json_path + ".migrated")
+    print(f"Migrated {count} price records from {json_path} to {store.path}.")
@@ -1,12 +1,18 @@
 import os
 import json
-import requests
-import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import NoSuchElementException
+import random
+import signal
+import argparse
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from market_fetch import make_fetcher
+from market_watch import MarketRule, HostRateLimiter, fetch_all, load_rules
+from price_store import PriceHistoryStore, migrate_json_file
+from price_analytics import AnalyticsBook
+from discord_notifier import DiscordNotifier
 
 # Import the library to load environment variables
 from dotenv import load_dotenv
@@ -16,67 +22,58 @@ load_dotenv()
 
 # Configuration
 WEBHOOK_URL = os.getenv("RACKHAM_WEBHOOK")
+# JSON history of earlier versions, imported into HISTORY_DB on the first run
 PRICE_FILE = "/home/quadstronaut/cron_files/rackham_wine/wine_price_history.json"
+HISTORY_DB = os.path.splitext(PRICE_FILE)[0] + ".sqlite3"
+HISTORY_RETENTION_DAYS = 365
+# Alerts waiting for Discord, kept across runs until they are delivered
+OUTBOX_FILE = os.path.join(os.path.dirname(PRICE_FILE), "discord_outbox.json")
 INARA_URL = "https://inara.cz/elite/station-market/230278/"
-CHROMEDRIVER_PATH = '/usr/bin/chromedriver'
 PRICE_THRESHOLD = 250000
-
-def send_discord_message(message):
-    """Sends a message to the Discord webhook."""
-    if not WEBHOOK_URL:
-        print("WEBHOOK_URL not found. Cannot send message to Discord.")
-        return
-
-    payload = {
-        "content": message
-    }
-    try:
-        response = requests.post(WEBHOOK_URL, json=payload)
-        response.raise_for_status()
-        print("Successfully sent message to Discord.")
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to send message to Discord: {e}")
-
-def get_current_price():
-    """Fetches the current price of Wine from Inara.cz using Selenium."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-
-    service = Service(executable_path=CHROMEDRIVER_PATH)
-
-    # Use a 'with' statement for a cleaner and more reliable way to manage the driver.
-    # This automatically calls driver.quit() even if an error occurs.
-    try:
-        with webdriver.Chrome(service=service, options=chrome_options) as driver:
-            driver.get(INARA_URL)
-            
-            # Find the row for 'Wine'
-            wine_row = driver.find_element(By.XPATH, "//a[text()='Wine']/ancestor::tr")
-
-            # Get the sell price from the data-order attribute
-            sell_price_element = wine_row.find_element(By.XPATH, ".//td[2]")
-            wine_price_str = sell_price_element.get_attribute("data-order")
-            
-            return int(wine_price_str)
-
-    # Handle a specific exception if the element is not found, which is a common error.
-    except NoSuchElementException:
-        print("The expected 'Wine' row or price element was not found on the page.")
-        return None
-    except Exception as e:
-        # This catches all other, more general errors.
-        print(f"An error occurred while fetching the price: {e}")
-        return None
-
-def get_price_history():
-    """Reads the price history from a local file, including notification state.
-       Handles conversion from the old single-record format to the new list format."""
+# "http" reads the page directly, "selenium" drives headless Chrome
+FETCH_BACKEND = os.getenv("RACKHAM_BACKEND", "http")
+# Retry with Selenium when the HTTP backend cannot find the price
+SELENIUM_FALLBACK = os.getenv("RACKHAM_SELENIUM_FALLBACK", "1") == "1"
+# JSON list of market rules, see market_watch.py; without it only Rackham's Wine is watched
+RULES_FILE = os.getenv("RACKHAM_RULES", os.path.join(os.path.dirname(PRICE_FILE), "market_rules.json"))
+DEFAULT_RULES = [
+    MarketRule("Rackham Wine", INARA_URL, "Wine", PRICE_THRESHOLD, "above", quantity=60000),
+]
+# Daemon mode: seconds between checks, +/- jitter fraction, and the longest backoff after failures
+POLL_INTERVAL = float(os.getenv("RACKHAM_INTERVAL", "900"))
+POLL_JITTER = 0.2
+MAX_BACKOFF = 4 * 3600
+# Pages fetched at once, and per-host politeness limits
+FETCH_WORKERS = 8
+MAX_REQUESTS_PER_HOST = 2
+HOST_REQUEST_INTERVAL = 1.0
+
+def get_price_history(store):
+    """Reads the notification state from the history store.
+       Imports the JSON history file of earlier versions the first time.
+       A file that cannot be read is left in place and tried again next run."""
+    if os.path.exists(PRICE_FILE):
+        data = read_json_history()
+        if data is None:
+            print(f"Not migrating {PRICE_FILE} until it can be read.")
+        else:
+            try:
+                migrate_json_file(store, PRICE_FILE, data, INARA_URL, "Wine")
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error migrating {PRICE_FILE}: {e}")
+    return {"notified": store.get_notified()}
+
+def read_json_history():
+    """Reads the price history from the old JSON file, including notification state.
+       Handles conversion from the old single-record format to the list format.
+       Returns None if the file exists but cannot be read."""
     if os.path.exists(PRICE_FILE):
         try:
             with open(PRICE_FILE, 'r') as f:
                 data = json.load(f)
+                if not isinstance(data, dict):
+                    print(f"Error reading from file: expected a JSON object, found {type(data).__name__}")
+                    return None
                 
                 # Check for the old, single-record format
                 if "wine_price" in data and not isinstance(data.get("history"), list):
@@ -86,82 +83,169 @@ def get_price_history():
                     notified_state = data.get("notified_over_250k", False)
                     return {
                         "history": [{"price": old_price, "timestamp": old_timestamp}],
-                        "notified_over_250k": notified_state
+                        "notified": {DEFAULT_RULES[0].name: notified_state}
                     }
                 
-                # Ensure the new key exists, for backward compatibility
-                if "notified_over_250k" not in data:
-                    data["notified_over_250k"] = False
+                # Ensure the new keys exist, for backward compatibility
+                if "notified" not in data:
+                    # The single Wine flag becomes the default rule's flag
+                    data["notified"] = {DEFAULT_RULES[0].name: data.pop("notified_over_250k", False)}
                 if "history" not in data:
                     data["history"] = []
                     
                 return data
-        except (IOError, json.JSONDecodeError) as e:
+        except (IOError, json.JSONDecodeError, UnicodeDecodeError) as e:
             print(f"Error reading from file: {e}")
-            # Fallback to an empty structure if file is corrupted
-    return {"history": [], "notified_over_250k": False}
-
-def update_price_history(current_price, data):
-    """Updates the price history, prunes old data, and saves to file."""
-    
-    # Prune data older than 365 days
-    pruning_threshold = datetime.datetime.now() - datetime.timedelta(days=365)
-    
-    # Filter out entries older than the threshold
-    data['history'] = [
-        entry for entry in data['history']
-        if datetime.datetime.fromisoformat(entry['timestamp']) > pruning_threshold
-    ]
-    
-    # Append the new price entry
-    new_entry = {
-        "price": current_price,
-        "timestamp": datetime.datetime.now().isoformat()
-    }
-    data['history'].append(new_entry)
-    
-    # Save the updated data
+            # Corrupt or unreadable, so keep the file rather than migrating nothing
+            return None
+    return {"history": [], "notified": {}}
+
+def update_price_history(store, prices, data, timestamp=None, book=None):
+    """Appends (url, commodity, price) samples, the notification state and the analytics
+       windows of the book to the history store.
+       Samples older than HISTORY_RETENTION_DAYS are dropped in the same transaction."""
     try:
-        with open(PRICE_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
-        print("Price history and notification state successfully saved to file.")
-    except IOError as e:
-        print(f"Error writing to file: {e}")
-
-def main():
-    """Main function to check and notify about price changes based on threshold."""
-    current_price = get_current_price()
-
-    if current_price is None:
-        print("Could not retrieve the current price. Exiting.")
-        return
-
-    price_data = get_price_history()
-    notified = price_data.get('notified_over_250k', False)
-
-    # Calculate the profit
-    profit = current_price * 60000
-    
-    # Check if the price has exceeded the threshold for the first time
-    if current_price > PRICE_THRESHOLD and not notified:
-        message = f"# **Wine Price Alert!**\n\nThe price of Wine has been detected at a new high of **{current_price} Cr.**, exceeding the {PRICE_THRESHOLD} Cr. threshold. The profit is estimated to be approximately **{profit:,} Cr.**"
-        send_discord_message(message)
+        store.append(prices, data['notified'], timestamp, book.window_states() if book else None)
+        if book:
+            book.saved()
+        print("Price history and notification state successfully saved.")
+    except sqlite3.Error as e:
+        print(f"Error writing to the price history: {e}")
+
+def check_rule(rule, price, price_data, notifier, analytics=None):
+    """Alerts when a rule triggers for the first time, and re-arms it once the price is back."""
+    notified = price_data['notified'].get(rule.name, False)
+    triggered = rule.triggered(price, analytics)
+
+    # Check if the rule has triggered for the first time
+    if triggered and not notified:
+        message = rule.message(price, analytics)
+        notifier.notify(message)
         print(message)
-        
+
         # Update the notification state to True
-        price_data['notified_over_250k'] = True
-    
-    # Check if the price has dropped back below the threshold to reset the state
-    elif current_price <= PRICE_THRESHOLD:
+        price_data['notified'][rule.name] = True
+
+    # Check if the price has moved back across the threshold to reset the state
+    elif not triggered:
         if notified:
-            print(f"Price has dropped back below {PRICE_THRESHOLD} Cr. Resetting notification state.")
-        price_data['notified_over_250k'] = False
-    
+            print(f"{rule.name}: {rule.reset_text()}. Resetting notification state.")
+        price_data['notified'][rule.name] = False
+
     else:
-        print(f"Wine price is {current_price} Cr., but has already been notified. No new alert will be sent.")
+        print(f"{rule.name}: {rule.commodity} price is {price} Cr., but has already been notified. No new alert will be sent.")
+
+def run_once(rules, fetcher, limiter, store, book, notifier):
+    """Checks every rule once; returns False if no market page could be fetched.
+       Alerts of one check, and any left undelivered earlier, go out together."""
+    pages = fetch_all(rules, fetcher, limiter, FETCH_WORKERS)
+    if not pages:
+        print("Could not retrieve any prices.")
+        notifier.flush()
+        return False
+
+    samples = {}
+    changed_rules = []
+    for rule in rules:
+        if rule.url not in pages:
+            print(f"{rule.name}: could not retrieve the current {rule.commodity} price.")
+            continue
+        prices, changed = pages[rule.url]
+        if not changed:
+            # Same page as last time: nothing new to alert on or record
+            continue
+        price = prices.get(rule.commodity)
+        if price is None:
+            print(f"{rule.name}: the expected '{rule.commodity}' row or price element was not found on the page.")
+            continue
+        changed_rules.append((rule, price))
+        samples[rule.url, rule.commodity] = price
+
+    if not samples:
+        print("No market page has changed since the last check.")
+        notifier.flush()
+        return True
+
+    price_data = get_price_history(store)
+    timestamp = time.time()
+    for (url, commodity), price in samples.items():
+        book.add(url, commodity, timestamp, price)
+    for rule, price in changed_rules:
+        check_rule(rule, price, price_data, notifier, book.get(rule.url, rule.commodity))
 
     # Always update the price history and prune old entries
-    update_price_history(current_price, price_data)
+    update_price_history(store, [(url, commodity, price) for (url, commodity), price in samples.items()],
+                         price_data, timestamp, book)
+    notifier.flush()
+    return True
+
+def run_daemon(rules, interval, store, book, notifier):
+    """Checks the rules every interval seconds until SIGTERM or Ctrl+C.
+       Connections and page validators are kept between rounds, the delay is jittered,
+       and it backs off after failed rounds or when a site sends Retry-After."""
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"Received signal {signum}, stopping after the current check.")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    fetcher = make_fetcher(FETCH_BACKEND, SELENIUM_FALLBACK, conditional=True)
+    limiter = HostRateLimiter(HOST_REQUEST_INTERVAL, MAX_REQUESTS_PER_HOST)
+    failures = 0
+    print(f"Watching {len(rules)} market rule(s) every ~{interval:.0f}s.")
+    try:
+        while not stop.is_set():
+            try:
+                ok = run_once(rules, fetcher, limiter, store, book, notifier)
+            except Exception as e:
+                print(f"An error occurred during the market check: {e}")
+                ok = False
+            failures = 0 if ok else failures + 1
+            delay = min(interval * 2 ** failures, MAX_BACKOFF)
+            delay *= random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+            if hasattr(fetcher, "backoff_remaining"):
+                delay = max(delay, fetcher.backoff_remaining())
+            stop.wait(delay)
+    finally:
+        fetcher.close()
+    print("Market monitor stopped.")
+
+def main():
+    """Main function to check and notify about price changes based on the market rules."""
+    parser = argparse.ArgumentParser(description="Grapevine market monitor")
+    parser.add_argument("--daemon", action="store_true", help="keep running and check periodically")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help="seconds between checks in daemon mode")
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(Path(RULES_FILE), DEFAULT_RULES)
+    except (IOError, json.JSONDecodeError, TypeError, ValueError) as e:
+        print(f"Error reading market rules from {RULES_FILE}: {e}")
+        return
+
+    store = PriceHistoryStore(HISTORY_DB, HISTORY_RETENTION_DAYS)
+    # Analytics windows are saved with the history, so a run only reads the samples that expired
+    book = AnalyticsBook(store, rules)
+    notifier = DiscordNotifier(WEBHOOK_URL, OUTBOX_FILE)
+    try:
+        if args.daemon:
+            run_daemon(rules, args.interval, store, book, notifier)
+            return
+
+        fetcher = make_fetcher(FETCH_BACKEND, SELENIUM_FALLBACK)
+        limiter = HostRateLimiter(HOST_REQUEST_INTERVAL, MAX_REQUESTS_PER_HOST)
+        try:
+            if not run_once(rules, fetcher, limiter, store, book, notifier):
+                print("Exiting.")
+        finally:
+            fetcher.close()
+    finally:
+        notifier.stop(flush=False)
+        store.close()
 
 if __name__ == "__main__":
     main()
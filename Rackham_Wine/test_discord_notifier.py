@@ -0,0 +1,93 @@
+"""
+Tests for the Discord notifier, against a local fake webhook.
+
+Usage:
+- python -m pytest Rackham_Wine
+"""
+
+import json
+import time
+
+import pytest
+
+from discord_notifier import MAX_CONTENT, SEPARATOR, DiscordNotifier, pack_messages
+
+HOOK = "/api/webhooks/1/token"
+
+
+@pytest.fixture
+def notifier(tmp_path, fake_server):
+    notifier = DiscordNotifier(fake_server.url + HOOK, str(tmp_path / "outbox.json"))
+    yield notifier
+    notifier.stop(flush=False)
+
+
+def posted(fake_server):
+    return [json.loads(body)["content"] for method, path, _, body in fake_server.requests if method == "POST"]
+
+
+def test_pack_messages_fills_one_message_up_to_the_limit():
+    first = "a" * 1000
+    second = "b" * (MAX_CONTENT - len(first) - len(SEPARATOR))
+    content, count = pack_messages([first, second, "c"])
+    assert len(content) == MAX_CONTENT
+    assert count == 2
+    assert pack_messages(["c"]) == ("c", 1)
+    assert pack_messages([]) is None
+
+
+def test_pack_messages_cuts_an_oversized_alert():
+    content, count = pack_messages(["x" * (MAX_CONTENT + 10), "y"])
+    assert (len(content), count) == (MAX_CONTENT, 1)
+
+
+def test_alerts_queued_together_are_sent_as_one_message(notifier, fake_server):
+    fake_server.add(HOOK, 204)
+    notifier.notify("first")
+    notifier.notify("second")
+    assert notifier.flush()
+    assert posted(fake_server) == ["first" + SEPARATOR + "second"]
+    assert json.load(open(notifier.outbox_path)) == []
+
+
+def test_rate_limited_post_is_retried_after_retry_after(notifier, fake_server):
+    fake_server.add(HOOK, 429, {}, {"retry_after": 0.2, "global": False})
+    fake_server.add(HOOK, 204)
+    started = time.monotonic()
+    assert notifier.send("alert")
+    assert time.monotonic() - started >= 0.2
+    assert posted(fake_server) == ["alert", "alert"]
+    assert notifier.pending() == 0
+
+
+def test_outbox_survives_a_failed_post(notifier, fake_server, tmp_path):
+    fake_server.add(HOOK, 500, {}, b"upstream error")
+    assert not notifier.send("alert")
+    assert json.load(open(notifier.outbox_path)) == ["alert"]
+
+    # A later run picks the alert up from the outbox and delivers it
+    fake_server.add(HOOK, 204)
+    retry = DiscordNotifier(fake_server.url + HOOK, notifier.outbox_path)
+    try:
+        assert retry.pending() == 1
+        assert retry.flush()
+    finally:
+        retry.stop(flush=False)
+    assert posted(fake_server)[-1] == "alert"
+    assert json.load(open(notifier.outbox_path)) == []
+
+
+def test_rejected_message_is_dropped(notifier, fake_server):
+    fake_server.add(HOOK, 400, {}, {"message": "Cannot send an empty message"})
+    assert notifier.send("alert")
+    assert notifier.pending() == 0
+    assert len(posted(fake_server)) == 1
+
+
+def test_alerts_stay_queued_without_a_webhook(tmp_path):
+    notifier = DiscordNotifier(None, str(tmp_path / "outbox.json"))
+    try:
+        assert not notifier.send("alert")
+        assert json.load(open(notifier.outbox_path)) == ["alert"]
+    finally:
+        notifier.stop(flush=False)
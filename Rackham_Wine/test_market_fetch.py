@@ -0,0 +1,95 @@
+"""
+Tests for the market fetch backends, against a saved station-market page
+and a local HTTP server.
+
+Usage:
+- python -m pytest Rackham_Wine
+"""
+
+import threading
+import time
+
+from market_fetch import HttpFetcher, MarketParser, parse_market, parse_retry_after, xpath_literal
+
+
+def test_parse_market_reads_the_sell_price_cell(market_page):
+    prices = parse_market(market_page.decode("utf-8"), ["Wine", "Silver", "Beer"])
+    assert prices == {"Wine": 262345, "Silver": 4891, "Beer": 187}
+
+
+def test_parse_market_skips_missing_commodities(market_page):
+    assert parse_market(market_page.decode("utf-8"), ["Wine", "Tea"]) == {"Wine": 262345}
+
+
+def test_parse_market_skips_non_integer_data_order(market_page, capsys):
+    assert parse_market(market_page.decode("utf-8"), ["Gold", "Silver"]) == {"Silver": 4891}
+    assert "'Gold' row has no usable data-order" in capsys.readouterr().out
+
+
+def test_parser_is_done_once_every_row_is_seen(market_page):
+    html = market_page.decode("utf-8")
+    parser = MarketParser(["Wine"])
+    parser.feed(html[:html.index("Gold")])
+    assert parser.done
+    assert parser.prices == {"Wine": 262345}
+
+
+def test_http_fetcher_reads_a_market_page(fake_server, market_page):
+    fake_server.add("/station-market/230278/", body=market_page)
+    fetcher = HttpFetcher()
+    try:
+        prices = fetcher.get_prices(fake_server.url + "/station-market/230278/", ["Wine", "Silver"])
+    finally:
+        fetcher.close()
+    assert prices == {"Wine": 262345, "Silver": 4891}
+    assert fake_server.requests[0][2]["User-Agent"].startswith("Mozilla/5.0")
+
+
+def test_http_fetcher_stops_reading_once_the_row_is_found(fake_server, market_page):
+    head = market_page[:market_page.index(b"Gold")]
+    release = threading.Event()
+
+    def stalled_page(wfile):
+        # The rest of the page only follows once the test lets it, or never
+        try:
+            wfile.write(head + b" " * 100000)
+            wfile.flush()
+            release.wait(10)
+            wfile.write(market_page[len(head):])
+        except OSError:
+            pass
+
+    fake_server.add("/station-market/230278/", body=stalled_page)
+    fetcher = HttpFetcher()
+    started = time.monotonic()
+    try:
+        prices = fetcher.get_prices(fake_server.url + "/station-market/230278/", ["Wine"])
+    finally:
+        release.set()
+        fetcher.close()
+    assert prices == {"Wine": 262345}
+    assert time.monotonic() - started < 5
+
+
+def test_http_fetcher_reads_the_whole_page_for_a_missing_commodity(fake_server, market_page):
+    fake_server.add("/station-market/230278/", body=market_page)
+    fetcher = HttpFetcher()
+    try:
+        # Tea is never found, so the parser has to reach the last row for Beer
+        prices = fetcher.get_prices(fake_server.url + "/station-market/230278/", ["Tea", "Beer"])
+    finally:
+        fetcher.close()
+    assert prices == {"Beer": 187}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_xpath_literal_quotes_apostrophes():
+    assert xpath_literal("Wine") == "'Wine'"
+    assert xpath_literal("Baltah'sine Vacuum Krill") == '"Baltah\'sine Vacuum Krill"'
+    assert xpath_literal("""a'b"c""") == """concat('a', "'", 'b"c')"""
@@ -0,0 +1,112 @@
+"""
+Tests for the rolling price analytics and analytics rules.
+
+Usage:
+- python -m pytest Rackham_Wine
+"""
+
+import time
+
+from price_analytics import AnalyticsBook, AnalyticsRule, MarketAnalytics, RollingWindow, parse_span
+from price_store import PriceHistoryStore
+
+HOUR = 3600
+DAY = 86400
+
+
+def yearly(prices):
+    """MarketAnalytics with a 365 day window fed one price per day."""
+    analytics = MarketAnalytics([parse_span("365d")])
+    for day, price in enumerate(prices):
+        analytics.add(day * DAY, price)
+    return analytics
+
+
+def test_flat_price_is_not_a_yearly_high():
+    rule = AnalyticsRule("Wine at a yearly high", "url", "Wine", "percentile", "365d", 95)
+    analytics = yearly([250000] * 100)
+    assert rule.value(analytics) == 50.0
+    assert not rule.triggered(250000, analytics)
+
+
+def test_new_high_is_above_the_95th_percentile():
+    rule = AnalyticsRule("Wine at a yearly high", "url", "Wine", "percentile", "365d", 95)
+    analytics = yearly([250000] * 99 + [300000])
+    assert rule.value(analytics) == 99.5
+    assert rule.triggered(300000, analytics)
+
+
+def test_price_rose_twenty_percent_in_two_hours():
+    rule = AnalyticsRule("Wine surge", "url", "Wine", "change", "2h", 0.2)
+    analytics = MarketAnalytics([rule.span])
+    # A much lower price three hours ago has left the window
+    analytics.add(0, 100000)
+    for step, price in enumerate(range(200000, 240001, 5000)):
+        analytics.add(HOUR + step * 900, price)
+    assert analytics.windows[rule.span].samples.first == (HOUR, 200000)
+    assert rule.value(analytics) == 0.2
+    assert rule.triggered(240000, analytics)
+    assert "+20.0%" in rule.message(240000, analytics)
+
+
+def test_price_rose_less_than_twenty_percent():
+    rule = AnalyticsRule("Wine surge", "url", "Wine", "change", "2h", 0.2)
+    analytics = MarketAnalytics([rule.span])
+    analytics.add(0, 200000)
+    analytics.add(HOUR, 230000)
+    assert not rule.triggered(230000, analytics)
+
+
+def test_window_expires_old_samples():
+    window = RollingWindow(HOUR)
+    for second, price in ((0, 100), (1800, 300), (5400, 200)):
+        window.add(second, price)
+    assert window.count == 2
+    assert (window.mean, window.metric("min"), window.metric("max")) == (250.0, 200, 300)
+
+
+def counted(query, rows_read):
+    """Wrap a store query to add up the rows it returns."""
+    def wrapper(*args):
+        rows = query(*args)
+        rows_read[0] += len(rows) if isinstance(rows, list) else rows is not None
+        return rows
+    return wrapper
+
+
+def test_saved_windows_match_windows_kept_in_memory(tmp_path, monkeypatch):
+    rules = [AnalyticsRule("Wine surge", "url", "Wine", "change", "2h", 0.2),
+             AnalyticsRule("Wine at a daily high", "url", "Wine", "percentile", "1d", 95)]
+    path = str(tmp_path / "history.sqlite3")
+    memory = MarketAnalytics([rule.span for rule in rules])
+    start = time.time() - 2 * DAY
+    reads = []
+    for run in range(2 * 96):
+        # Every run is a new process, like a cron job every 15 minutes
+        now = start + run * 900
+        monkeypatch.setattr(time, "time", lambda: now)
+        store = PriceHistoryStore(path)
+        rows_read = [0]
+        for query in ("history", "samples_between", "first_sample"):
+            monkeypatch.setattr(store, query, counted(getattr(store, query), rows_read))
+        book = AnalyticsBook(store, rules)
+        price = 200000 + (run * 7919) % 50000
+        book.add("url", "Wine", now, price)
+        store.append([("url", "Wine", price)], None, now, book.window_states())
+        book.saved()
+        memory.add(now, price)
+        for rule in rules:
+            window, expected = book.get("url", "Wine").windows[rule.span], memory.windows[rule.span]
+            assert (window.count, window.total, window.squares) == (expected.count, expected.total, expected.squares)
+            assert (window.samples.first, window.samples.last) == (expected.samples.first, expected.samples.last)
+            assert list(window.crossing_times) == list(expected.crossing_times)
+            assert rule.value(book.get("url", "Wine")) == rule.value(memory)
+        store.close()
+        reads.append(rows_read[0])
+    # Per window a run reads back its newest sample, the one leaving it and the new oldest one
+    assert max(reads) == 3 * len(rules)
+
+
+def test_window_reset_text_shows_the_threshold_like_the_message():
+    rule = AnalyticsRule("Wine surge", "url", "Wine", "change", "2h", 0.2)
+    assert rule.reset_text() == "the 2h change is back across +20.0%"
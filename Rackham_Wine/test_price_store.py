@@ -0,0 +1,103 @@
+"""
+Tests for the SQLite price history and the one-time import of the JSON
+history written by earlier versions.
+
+Usage:
+- python -m pytest Rackham_Wine
+"""
+
+import datetime
+import json
+import os
+
+import pytest
+
+import rackham_wine
+from price_store import PriceHistoryStore
+
+OTHER_URL = "https://inara.cz/elite/station-market/1/"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceHistoryStore(str(tmp_path / "history.sqlite3"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def price_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "wine_price_history.json")
+    monkeypatch.setattr(rackham_wine, "PRICE_FILE", path)
+    return path
+
+
+def epoch(timestamp: str) -> float:
+    return datetime.datetime.fromisoformat(timestamp).timestamp()
+
+
+def write_json(path: str, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def test_single_record_format_is_migrated(store, price_file):
+    write_json(price_file, {"wine_price": 262345, "last_updated": "2024-05-01T12:00:00",
+                            "notified_over_250k": True})
+
+    assert rackham_wine.get_price_history(store) == {"notified": {"Rackham Wine": True}}
+    assert store.history(rackham_wine.INARA_URL, "Wine") == [(epoch("2024-05-01T12:00:00"), 262345)]
+    assert not os.path.exists(price_file)
+    assert os.path.exists(price_file + ".migrated")
+
+
+def test_history_list_format_is_migrated_with_its_wine_flag(store, price_file):
+    write_json(price_file, {
+        "history": [
+            {"price": 240000, "timestamp": "2024-05-01T12:00:00"},
+            {"price": 251000, "timestamp": "2024-05-01T12:15:00"},
+            {"price": 4891, "timestamp": "2024-05-01T12:15:00", "url": OTHER_URL, "commodity": "Silver"},
+            {"price": "unknown", "timestamp": "2024-05-01T12:30:00"},
+        ],
+        "notified_over_250k": True,
+    })
+
+    assert rackham_wine.get_price_history(store) == {"notified": {"Rackham Wine": True}}
+    assert store.history(rackham_wine.INARA_URL, "Wine") == [
+        (epoch("2024-05-01T12:00:00"), 240000), (epoch("2024-05-01T12:15:00"), 251000)]
+    assert store.history(OTHER_URL, "Silver") == [(epoch("2024-05-01T12:15:00"), 4891)]
+
+
+def test_history_is_migrated_only_once(store, price_file):
+    write_json(price_file, {"history": [{"price": 240000, "timestamp": "2024-05-01T12:00:00"}],
+                            "notified": {"Rackham Wine": False}})
+    rackham_wine.get_price_history(store)
+    migrated = os.path.getmtime(price_file + ".migrated")
+
+    assert rackham_wine.get_price_history(store) == {"notified": {"Rackham Wine": False}}
+    assert len(store.history(rackham_wine.INARA_URL, "Wine")) == 1
+    assert os.path.getmtime(price_file + ".migrated") == migrated
+
+
+@pytest.mark.parametrize("content", ["{\"history\": [", "[1, 2]", "\udcff"])
+def test_unreadable_history_is_left_in_place(store, price_file, content):
+    with open(price_file, "w", encoding="utf-8", errors="surrogateescape") as f:
+        f.write(content)
+
+    assert rackham_wine.get_price_history(store) == {"notified": {}}
+    assert os.path.exists(price_file)
+    assert not os.path.exists(price_file + ".migrated")
+    assert store.db.execute("SELECT COUNT(*) FROM prices").fetchone()[0] == 0
+
+
+def test_append_prunes_samples_past_the_retention(tmp_path):
+    store = PriceHistoryStore(str(tmp_path / "history.sqlite3"), retention_days=1)
+    try:
+        now = epoch("2024-05-03T12:00:00")
+        store.append([(rackham_wine.INARA_URL, "Wine", 240000)], {"Rackham Wine": False}, now - 2 * 86400)
+        store.append([(rackham_wine.INARA_URL, "Wine", 245000)], None, now - 3600)
+        store.append([(rackham_wine.INARA_URL, "Wine", 251000)], {"Rackham Wine": True}, now)
+        assert store.history(rackham_wine.INARA_URL, "Wine") == [(now - 3600, 245000), (now, 251000)]
+        assert store.get_notified() == {"Rackham Wine": True}
+    finally:
+        store.close()
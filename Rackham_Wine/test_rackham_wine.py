@@ -0,0 +1,76 @@
+"""
+Tests for a monitoring round against a local market server: unchanged
+pages are neither parsed nor recorded again, and Retry-After is honoured.
+
+Usage:
+- python -m pytest Rackham_Wine
+"""
+
+import pytest
+
+import rackham_wine
+from discord_notifier import DiscordNotifier
+from market_fetch import HttpFetcher
+from market_watch import HostRateLimiter, MarketRule
+from price_analytics import AnalyticsBook
+from price_store import PriceHistoryStore
+
+PAGE = "/elite/station-market/230278/"
+
+
+@pytest.fixture
+def monitor(tmp_path, fake_server):
+    """Everything run_once needs, watching the fake server's market page."""
+    rules = [MarketRule("Rackham Wine", fake_server.url + PAGE, "Wine", 250000, "above")]
+    fetcher = HttpFetcher(conditional=True)
+    limiter = HostRateLimiter(0, 2)
+    store = PriceHistoryStore(str(tmp_path / "history.sqlite3"))
+    book = AnalyticsBook(store, rules)
+    notifier = DiscordNotifier(None, str(tmp_path / "outbox.json"))
+
+    def run():
+        return rackham_wine.run_once(rules, fetcher, limiter, store, book, notifier)
+
+    run.fetcher = fetcher
+    run.rows = lambda: store.db.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+    yield run
+    fetcher.close()
+    notifier.stop(flush=False)
+    store.close()
+
+
+def test_not_modified_page_is_not_parsed_or_recorded(monitor, fake_server, market_page):
+    fake_server.add(PAGE, 200, {"ETag": '"v1"'}, market_page)
+    fake_server.add(PAGE, 304, {"ETag": '"v1"'})
+
+    assert monitor()
+    assert (monitor.fetcher.parses, monitor.rows()) == (1, 1)
+
+    assert monitor()
+    assert (monitor.fetcher.parses, monitor.rows()) == (1, 1)
+    assert fake_server.requests[1][2]["If-None-Match"] == '"v1"'
+
+
+def test_identical_body_is_not_parsed_or_recorded(monitor, fake_server, market_page):
+    fake_server.add(PAGE, 200, {}, market_page)
+
+    assert monitor()
+    assert monitor()
+    assert (monitor.fetcher.parses, monitor.rows()) == (1, 1)
+
+
+def test_changed_body_is_parsed_and_recorded(monitor, fake_server, market_page):
+    fake_server.add(PAGE, 200, {}, market_page)
+    fake_server.add(PAGE, 200, {}, market_page.replace(b"262345", b"263000"))
+
+    assert monitor()
+    assert monitor()
+    assert (monitor.fetcher.parses, monitor.rows()) == (2, 2)
+
+
+def test_retry_after_sets_the_backoff(monitor, fake_server):
+    fake_server.add(PAGE, 429, {"Retry-After": "120"}, b"slow down")
+
+    assert not monitor()
+    assert monitor.rows() == 0
+    assert 110 < monitor.fetcher.backoff_remaining() <= 120
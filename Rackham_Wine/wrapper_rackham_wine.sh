@@ -12,5 +12,9 @@ export HOME="/foo/bar/cron_files/rackham_wine"
 # Navigate to the script's directory
 cd "$SCRIPT_DIR" || { echo "Failed to change directory to $SCRIPT_DIR" >&2; exit 1; }
 
-# Run the Python script with xvfb-run
-xvfb-run -a "$PYTHON_INTERPRETER" "$SCRIPT_DIR/$PYTHON_SCRIPT" >> "$SCRIPT_DIR/$LOG_FILE" 2>&1
+# The default HTTP backend needs no display; only the Selenium backend runs under xvfb-run
+if [ "${RACKHAM_BACKEND:-http}" = "selenium" ]; then
+    xvfb-run -a "$PYTHON_INTERPRETER" "$SCRIPT_DIR/$PYTHON_SCRIPT" >> "$SCRIPT_DIR/$LOG_FILE" 2>&1
+else
+    "$PYTHON_INTERPRETER" "$SCRIPT_DIR/$PYTHON_SCRIPT" >> "$SCRIPT_DIR/$LOG_FILE" 2>&1
+fi
@@ -0,0 +1,81 @@
+"""
+Window discovery benchmark.
+Compares a full process scan, the way the scripts polled before, with an
+incremental WindowDiscovery refresh on the real process list, with and
+without processes starting and exiting between refreshes.
+
+Usage:
+- python bench_window_discovery.py
+- python bench_window_discovery.py --spawn 20 --rounds 50
+"""
+
+import sys
+import time
+import argparse
+import subprocess
+
+import psutil
+
+from window_discovery import PsutilDiscoveryBackend, WindowDiscovery
+
+
+def legacy_scan() -> int:
+    """The old loop: name and exe of every process, every time."""
+    count = 0
+    for proc in psutil.process_iter(['pid', 'name', 'exe']):
+        count += 1
+    return count
+
+
+def timed(func, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - started) / rounds * 1e3
+
+
+def churn_round(discovery: WindowDiscovery, spawn: int) -> float:
+    """Start spawn short-lived processes, refresh, let them exit and refresh again."""
+    children = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"]) for _ in range(spawn)]
+    try:
+        started = time.perf_counter()
+        discovery.refresh()
+        elapsed = time.perf_counter() - started
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+    started = time.perf_counter()
+    discovery.refresh()
+    return (elapsed + time.perf_counter() - started) / 2 * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the window discovery refresh")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--spawn", type=int, default=10, help="processes started per churn round")
+    parser.add_argument("--churn-rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    processes = legacy_scan()
+    legacy_ms = timed(legacy_scan, args.rounds)
+
+    discovery = WindowDiscovery(PsutilDiscoveryBackend())
+    discovery.refresh()
+    calls = discovery.describe_calls
+    steady_ms = timed(discovery.refresh, args.rounds)
+    steady_calls = discovery.describe_calls - calls
+
+    calls = discovery.describe_calls
+    churn_ms = sum(churn_round(discovery, args.spawn) for _ in range(args.churn_rounds)) / args.churn_rounds
+    churn_calls = (discovery.describe_calls - calls) / args.churn_rounds
+
+    print(f"{processes} processes")
+    print(f"  full scan            {legacy_ms:8.3f} ms/poll ({processes} processes read)")
+    print(f"  incremental, steady  {steady_ms:8.3f} ms/refresh ({steady_calls / args.rounds:.0f} processes read)")
+    print(f"  incremental, churn   {churn_ms:8.3f} ms/refresh ({churn_calls:.0f} processes read per"
+          f" {args.spawn} started and exited)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,56 @@
-import psutil
-import pygetwindow as gw
+"""
+Elite Dangerous window title watcher.
+Prints the game's main window title whenever it changes.
+
+Despite the name this no longer uses pygetwindow: titles come from the
+shared window discovery service, like constrained_windowtitles.py, which
+does the same with logging and fewer checks. This one is the minimal
+version, checking twice a second and printing to the console.
+
+Requirements:
+- pip install psutil
+- pip install pywin32 (Windows, for window titles)
+"""
+
 import time
 
-def get_ed_window_title():
+from window_discovery import REMOVED, WindowDiscovery
+
+def get_ed_window_title(discovery: WindowDiscovery):
     """
     Finds the Elite Dangerous process and prints its main window title.
     """
-    process_found = False
-    for proc in psutil.process_iter(['name']):
-        if proc.info['name'] == 'EliteDangerous64.exe':
-            process_found = True
-            try:
-                # Find the window associated with the process
-                windows = gw.getWindowsWithTitle(None)
-                ed_window = None
-                for window in windows:
-                    if 'Elite Dangerous' in window.title:
-                        ed_window = window
-                        break
-
-                if ed_window:
-                    print(f"Current Window Title: {ed_window.title}")
-                else:
-                    print("Elite Dangerous window found, but no title available.")
-            except Exception as e:
-                print(f"An error occurred: {e}")
-            break
+    for entry in discovery.snapshot():
+        if entry.name == 'EliteDangerous64.exe':
+            if 'Elite Dangerous' in entry.title:
+                print(f"Current Window Title: {entry.title}")
+            else:
+                print("Elite Dangerous window found, but no title available.")
+            return
+    print("EliteDangerous64.exe process is not currently running.")
 
-    if not process_found:
-        print("EliteDangerous64.exe process is not currently running.")
+def on_change(event, entry, previous_title):
+    # Only changes to the game process are worth printing again
+    if entry.name == 'EliteDangerous64.exe':
+        if event == REMOVED:
+            print("EliteDangerous64.exe process is not currently running.")
+        elif 'Elite Dangerous' in entry.title:
+            print(f"Current Window Title: {entry.title}")
+        else:
+            print("Elite Dangerous window found, but no title available.")
 
 if __name__ == "__main__":
-    print("Polling for Elite Dangerous window title. Press Ctrl+C to stop.")
-    while True:
-        get_ed_window_title()
-        time.sleep(0.5)
\ No newline at end of file
+    print("Watching for Elite Dangerous window title changes. Press Ctrl+C to stop.")
+    # Titles come from the shared discovery service, so pygetwindow no longer lists every window each poll
+    discovery = WindowDiscovery()
+    # The first check runs on the discovery thread before start() returns
+    discovery.start(interval=0.5)
+    get_ed_window_title(discovery)
+    discovery.subscribe(on_change)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        discovery.stop()
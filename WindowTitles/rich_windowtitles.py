@@ -1,73 +1,175 @@
+"""
+Live process monitor.
+Shows the processes matching a search string in the process name or main
+window title, with their CPU use, memory and window title history.
+
+The table is drawn with rich.live, so rows are updated in place instead of
+clearing the screen. Processes come from the window discovery service, and
+CPU and memory are only read for the matching processes, all in one
+psutil oneshot() per process. The screen is only redrawn when a row
+changed.
+
+Requirements:
+- pip install psutil rich
+
+Usage:
+- python rich_windowtitles.py
+- python rich_windowtitles.py EliteDangerous --interval 2
+"""
+
+import time
+import argparse
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
 import psutil
-from rich.console import Console
+from rich.live import Live
 from rich.table import Table
-import time
-import os
-
-def find_processes_with_string(search_string: str):
-    """
-    Finds and displays processes matching a user-configurable string in the 
-    process name or main window title.
-    """
-    console = Console()
-    table = Table(
-        title=f"Processes Matching '{search_string}'",
-        show_header=True,
-        header_style="bold magenta",
-        caption="[bold green]Note: Press Ctrl+C to stop.[/bold green]"
-    )
-    
-    # Define columns for the table
-    table.add_column("PID", style="dim", width=12)
-    table.add_column("Process Name", style="bold")
-    table.add_column("Main Window Title", style="cyan")
-    table.add_column("Executable Path", style="italic")
-
-    found_matches = False
-    
-    # Iterate over all running processes
-    for proc in psutil.process_iter(['pid', 'name', 'exe']):
+
+from window_discovery import REMOVED, TITLE, ProcessEntry, WindowDiscovery
+
+# Window titles kept per process
+TITLE_HISTORY = 5
+
+
+class ProcessRow:
+    """The monitored state of one matching process."""
+    def __init__(self, entry: ProcessEntry):
+        self.entry = entry
+        self.proc = psutil.Process(entry.pid)
+        self.cpu = 0.0
+        self.rss = 0
+        self.titles: deque = deque([entry.title] if entry.title else [], maxlen=TITLE_HISTORY)
+        # Prime the CPU counter, the first cpu_percent() call always returns 0
+        self.sample()
+
+    def sample(self) -> bool:
+        """Read CPU and memory; False once the process is gone."""
         try:
-            pinfo = proc.info
-            p_name = pinfo.get('name', '').lower()
-            p_pid = pinfo.get('pid')
-            p_exe = pinfo.get('exe', 'N/A')
-            
-            # This part is tricky and may require a separate library for cross-platform support.
-            main_window_title = "N/A"
-            if hasattr(proc, 'nice'):
-                main_window_title = "Available" # A placeholder for now
-            
-            # Check for a match in the process name
-            if search_string.lower() in p_name:
-                found_matches = True
-                table.add_row(
-                    str(p_pid),
-                    p_name,
-                    main_window_title,
-                    p_exe
-                )
-        
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-    
-    # Clear the screen before printing the new table
-    os.system('cls' if os.name == 'nt' else 'clear')
-    
-    if found_matches:
-        console.print(table)
-    else:
-        console.print(f"[bold red]No processes found matching '{search_string}'[/bold red]")
-    
+            with self.proc.oneshot():
+                self.cpu = self.proc.cpu_percent(None)
+                self.rss = self.proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return False
+        except psutil.AccessDenied:
+            pass
+        return True
+
+    def cells(self) -> Tuple[str, ...]:
+        previous = list(self.titles)
+        if previous and previous[-1] == self.entry.title:
+            previous.pop()
+        history = " ← ".join(reversed(previous))
+        return (
+            str(self.entry.pid),
+            self.entry.name,
+            f"{self.cpu:5.1f}",
+            f"{self.rss / 1048576:8.1f}",
+            self.entry.title or "N/A",
+            history,
+            self.entry.exe or "N/A",
+        )
+
+
+class ProcessMonitor:
+    """Keeps one row per matching process, fed by the discovery service."""
+    def __init__(self, search_string: str, discovery: WindowDiscovery):
+        self.search_string = search_string
+        self.discovery = discovery
+        self.lock = threading.Lock()
+        self.rows: Dict[int, ProcessRow] = {}
+        self.shown: Optional[tuple] = None
+        self.own_process = psutil.Process()
+        self.own_process.cpu_percent(None)
+        discovery.subscribe(self.on_change)
+
+    def on_change(self, event: str, entry: ProcessEntry, previous_title: Optional[str]):
+        with self.lock:
+            row = self.rows.get(entry.pid)
+            if event == REMOVED:
+                self.rows.pop(entry.pid, None)
+            elif row is None:
+                # New process, or an existing one whose title now matches
+                if entry.matches(self.search_string):
+                    try:
+                        self.rows[entry.pid] = ProcessRow(entry)
+                    except psutil.Error:
+                        pass
+            elif event == TITLE:
+                if entry.title:
+                    row.titles.append(entry.title)
+                if not entry.matches(self.search_string):
+                    del self.rows[entry.pid]
+
+    def sample(self):
+        with self.lock:
+            for pid, row in list(self.rows.items()):
+                if not row.sample():
+                    del self.rows[pid]
+
+    def snapshot(self) -> tuple:
+        with self.lock:
+            return tuple(self.rows[pid].cells() for pid in sorted(self.rows))
+
+    def render(self, rows: tuple) -> Table:
+        # The monitor's own CPU use is only refreshed along with the rows
+        own_cpu = f"{self.own_process.cpu_percent(None):.1f}"
+        table = Table(
+            title=f"Processes Matching '{self.search_string}'",
+            show_header=True,
+            header_style="bold magenta",
+            caption=f"[bold green]Note: Press Ctrl+C to stop.[/bold green] Monitor CPU {own_cpu}%",
+        )
+        # Define columns for the table
+        table.add_column("PID", style="dim", width=8)
+        table.add_column("Process Name", style="bold")
+        table.add_column("CPU %", justify="right")
+        table.add_column("RSS MiB", justify="right")
+        table.add_column("Main Window Title", style="cyan")
+        table.add_column("Previous Titles", style="dim cyan")
+        table.add_column("Executable Path", style="italic")
+        for cells in rows:
+            table.add_row(*cells)
+        if not rows:
+            table.add_row("", f"[bold red]No processes found matching '{self.search_string}'[/bold red]")
+        return table
+
+    def update(self, live: Live):
+        """Sample the matching processes and redraw if any row changed."""
+        self.sample()
+        rows = self.snapshot()
+        if rows != self.shown:
+            self.shown = rows
+            live.update(self.render(rows), refresh=True)
+
+    def run(self, interval: float = 1.0):
+        self.shown = self.snapshot()
+        # Leave startup and the first process scan out of the monitor's own CPU use
+        self.own_process.cpu_percent(None)
+        with Live(self.render(self.shown), auto_refresh=False) as live:
+            while True:
+                time.sleep(interval)
+                self.update(live)
+
+
 # --- User-configurable part ---
 if __name__ == "__main__":
-    user_search_string = input("Enter the string to search for: ")
+    parser = argparse.ArgumentParser(description="Live monitor of processes matching a string")
+    parser.add_argument("search", nargs="?", help="string to search for in process names and window titles")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between updates")
+    args = parser.parse_args()
+    user_search_string = args.search or input("Enter the string to search for: ")
     print("Starting real-time process monitor...")
-    
+
+    discovery = WindowDiscovery()
+    monitor = ProcessMonitor(user_search_string, discovery)
+    # The first refresh runs on the discovery thread, which keeps its window hooks
+    discovery.start(interval=args.interval)
+
     try:
-        while True:
-            find_processes_with_string(user_search_string)
-            time.sleep(0.5) # Refresh every 1 second
-            
+        monitor.run(args.interval)
     except KeyboardInterrupt:
-        print("\nProcess monitor stopped by user.")
\ No newline at end of file
+        print("\nProcess monitor stopped by user.")
+    finally:
+        discovery.stop()
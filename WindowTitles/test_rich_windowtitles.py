@@ -0,0 +1,62 @@
+"""
+Tests for the live process monitor, fed by a fake discovery backend.
+
+Usage:
+- python -m pytest WindowTitles
+"""
+
+import os
+
+from rich_windowtitles import ProcessMonitor
+from test_window_discovery import FakeDiscoveryBackend
+from window_discovery import WindowDiscovery
+
+PID = os.getpid()
+
+
+class CountingLive:
+    def __init__(self):
+        self.updates = 0
+
+    def update(self, renderable, refresh=False):
+        self.updates += 1
+
+
+def make_monitor():
+    backend = FakeDiscoveryBackend()
+    backend.processes = {PID: ("EliteDangerous64.exe", "C:/Games/EliteDangerous64.exe", 1.0)}
+    backend.titles = {PID: "Elite - Dangerous (CLIENT)"}
+    discovery = WindowDiscovery(backend)
+    monitor = ProcessMonitor("elite", discovery)
+    discovery.refresh()
+    return backend, discovery, monitor
+
+
+def set_title(backend, discovery, title):
+    backend.titles = {PID: title}
+    backend.titles_changed = True
+    discovery.refresh()
+
+
+def test_title_changes_are_kept_as_history():
+    backend, discovery, monitor = make_monitor()
+    set_title(backend, discovery, "Elite - Dangerous (CLIENT) Bistronaut")
+    set_title(backend, discovery, "Elite - Dangerous (CLIENT) Tristronaut")
+
+    cells = monitor.snapshot()[0]
+    assert cells[4] == "Elite - Dangerous (CLIENT) Tristronaut"
+    assert cells[5] == "Elite - Dangerous (CLIENT) Bistronaut ← Elite - Dangerous (CLIENT)"
+
+
+def test_only_changed_rows_are_redrawn(monkeypatch):
+    backend, discovery, monitor = make_monitor()
+    monkeypatch.setattr(monitor, "sample", lambda: None)
+    live = CountingLive()
+
+    monitor.update(live)
+    monitor.update(live)
+    assert live.updates == 1
+
+    set_title(backend, discovery, "Elite - Dangerous (CLIENT) Bistronaut")
+    monitor.update(live)
+    assert live.updates == 2
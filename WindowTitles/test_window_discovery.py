@@ -0,0 +1,131 @@
+"""
+Tests for the window discovery service, run against a fake backend.
+
+Usage:
+- python -m pytest WindowTitles
+"""
+
+import threading
+
+import pytest
+
+from window_discovery import ADDED, REMOVED, TITLE, DiscoveryBackend, WindowDiscovery
+
+
+class FakeDiscoveryBackend(DiscoveryBackend):
+    """Processes and titles from dicts, recording the threads it is used on."""
+    def __init__(self):
+        self.processes = {1: ("explorer.exe", "C:/Windows/explorer.exe", 1.0)}
+        self.titles = {}
+        self.titles_changed = True
+        self.threads = set()
+        self.closed_on = None
+
+    def pids(self):
+        self.threads.add(threading.get_ident())
+        return set(self.processes)
+
+    def describe(self, pid):
+        return self.processes.get(pid)
+
+    def create_time(self, pid):
+        return self.processes[pid][2] if pid in self.processes else None
+
+    def window_titles(self):
+        self.threads.add(threading.get_ident())
+        if not self.titles_changed:
+            return None
+        self.titles_changed = False
+        return dict(self.titles)
+
+    def close(self):
+        self.closed_on = threading.get_ident()
+
+
+def test_changes_are_published():
+    backend = FakeDiscoveryBackend()
+    discovery = WindowDiscovery(backend)
+    events = []
+    discovery.subscribe(lambda event, entry, previous: events.append((event, entry.pid, entry.title, previous)))
+
+    discovery.refresh()
+    backend.processes[2] = ("EliteDangerous64.exe", "C:/Games/EliteDangerous64.exe", 2.0)
+    backend.titles = {2: "Elite - Dangerous (CLIENT)"}
+    backend.titles_changed = True
+    discovery.refresh()
+    del backend.processes[1]
+    discovery.refresh()
+
+    assert events == [
+        (ADDED, 1, "", None),
+        (ADDED, 2, "Elite - Dangerous (CLIENT)", None),
+        (REMOVED, 1, "", None),
+    ]
+    backend.titles = {2: "Elite - Dangerous (CLIENT) Bistronaut"}
+    backend.titles_changed = True
+    discovery.refresh()
+    assert events[-1] == (TITLE, 2, "Elite - Dangerous (CLIENT) Bistronaut", "Elite - Dangerous (CLIENT)")
+    assert [entry.pid for entry in discovery.find("bistronaut")] == [2]
+
+
+def test_reused_pid_with_a_new_window_is_a_new_process():
+    backend = FakeDiscoveryBackend()
+    backend.processes[2] = ("notepad.exe", "C:/Windows/notepad.exe", 2.0)
+    backend.titles = {2: "notes.txt - Notepad"}
+    discovery = WindowDiscovery(backend)
+    discovery.refresh()
+    events = []
+    discovery.subscribe(lambda event, entry, previous: events.append((event, entry.pid, entry.name, entry.title)))
+
+    # Notepad exited between two refreshes and the game got its ID
+    backend.processes[2] = ("EliteDangerous64.exe", "C:/Games/EliteDangerous64.exe", 9.0)
+    backend.titles = {2: "Elite - Dangerous (CLIENT)"}
+    backend.titles_changed = True
+    discovery.refresh()
+
+    assert events == [
+        (REMOVED, 2, "notepad.exe", "notes.txt - Notepad"),
+        (ADDED, 2, "EliteDangerous64.exe", "Elite - Dangerous (CLIENT)"),
+    ]
+    assert discovery.describe_calls == 3
+
+
+def test_reused_pid_without_a_window_is_found_by_the_periodic_check():
+    backend = FakeDiscoveryBackend()
+    discovery = WindowDiscovery(backend, verify_every=3)
+    discovery.refresh()
+    backend.processes[1] = ("svchost.exe", "C:/Windows/System32/svchost.exe", 5.0)
+    discovery.refresh()
+    assert discovery.snapshot()[0].name == "explorer.exe"
+    discovery.refresh()
+    assert discovery.snapshot()[0].name == "svchost.exe"
+
+
+def test_known_processes_are_described_once():
+    discovery = WindowDiscovery(FakeDiscoveryBackend())
+    for _ in range(5):
+        discovery.refresh()
+    assert discovery.describe_calls == 1
+
+
+def test_backend_is_only_used_on_the_refresh_thread():
+    backend = FakeDiscoveryBackend()
+    discovery = WindowDiscovery(backend)
+    discovery.start(interval=0.01)
+    try:
+        # start() returns once the first refresh has filled the table
+        assert [entry.pid for entry in discovery.snapshot()] == [1]
+        with pytest.raises(RuntimeError):
+            discovery.refresh()
+    finally:
+        discovery.stop()
+    assert backend.threads == {backend.closed_on}
+    assert backend.closed_on != threading.get_ident()
+
+
+def test_backend_missing_window_titles_fails_on_creation():
+    class Incomplete(DiscoveryBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,413 @@
+"""
+Window and process discovery service.
+Keeps a table of running processes and their main window titles up to date
+and tells subscribers what changed.
+
+A refresh lists the process IDs, which is cheap, and only looks at the ones
+that are new or gone: a new process is described once (name, executable,
+start time), since those never change, and an exited one is dropped. Window
+titles are only listed again when a window changed. So the cost of a refresh
+follows how many processes start and stop, not how many are running.
+
+Windows reuses process IDs quickly, so the start time of a known ID is
+checked again when its window title changes, and for every process once
+every verify_every refreshes; a different start time means the process
+exited and a new one got its ID.
+
+The platform calls sit behind a backend:
+- WindowsDiscoveryBackend: psutil for processes, pywin32 for window titles,
+  with WinEvent hooks so titles are only read after a window changed
+- PsutilDiscoveryBackend: psutil only, for Linux and anywhere else; it has
+  no window titles
+
+Requirements:
+- pip install psutil
+- pip install pywin32 (Windows, for window titles)
+
+Usage:
+- python window_discovery.py            print process and title changes
+- python window_discovery.py Elite      only for processes matching "Elite"
+"""
+
+import sys
+import time
+import logging
+import threading
+import ctypes
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# (name, executable path, start time) of a process; none of them change while it runs
+ProcessDescription = Tuple[str, Optional[str], float]
+
+# Change events passed to subscribers
+ADDED = "added"
+REMOVED = "removed"
+TITLE = "title"
+
+# WinEvent constants, see SetWinEventHook
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+PM_REMOVE = 0x0001
+
+
+class ProcessEntry:
+    """One running process in the discovery table."""
+    __slots__ = ("pid", "name", "exe", "create_time", "title")
+
+    def __init__(self, pid: int, name: str, exe: Optional[str], create_time: float, title: str = ""):
+        self.pid = pid
+        self.name = name
+        self.exe = exe
+        self.create_time = create_time
+        self.title = title
+
+    def matches(self, search: str) -> bool:
+        """Case-insensitive match on the process name or window title."""
+        search = search.lower()
+        return search in self.name.lower() or search in self.title.lower()
+
+    def __repr__(self):
+        return f"ProcessEntry({self.pid}, {self.name!r}, title={self.title!r})"
+
+
+class DiscoveryBackend(ABC):
+    """
+    Platform access used by WindowDiscovery.
+
+    describe() is called once per new process. window_titles() returns the
+    main window title of every process that has one, or None when no window
+    changed since the last call. All calls come from the same thread.
+    """
+    def pids(self) -> Set[int]:
+        return set(psutil.pids())
+
+    def create_time(self, pid: int) -> Optional[float]:
+        """When the process with this ID started, or None if it already exited."""
+        try:
+            return psutil.Process(pid).create_time()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    def describe(self, pid: int) -> Optional[ProcessDescription]:
+        """The fixed attributes of a process, or None if it already exited."""
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                name = proc.name()
+                create_time = proc.create_time()
+                try:
+                    exe = proc.exe() or None
+                except (psutil.AccessDenied, psutil.ZombieProcess):
+                    # System processes hide their executable, the name is enough
+                    exe = None
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+        return name, exe, create_time
+
+    @abstractmethod
+    def window_titles(self) -> Optional[Dict[int, str]]:
+        pass
+
+    def close(self):
+        pass
+
+
+class PsutilDiscoveryBackend(DiscoveryBackend):
+    """Processes from psutil alone; there are no window titles."""
+    def __init__(self):
+        self.listed = False
+
+    def window_titles(self) -> Optional[Dict[int, str]]:
+        if self.listed:
+            return None
+        self.listed = True
+        return {}
+
+
+class WindowsDiscoveryBackend(DiscoveryBackend):
+    """
+    Window titles from pywin32. WinEvent hooks mark windows that were
+    created, destroyed, shown, hidden or renamed; a rename only re-reads that
+    window, anything else lists the windows again.
+
+    The hooks are installed on the first window_titles() call, because their
+    events are delivered to the thread that installed them, and close() has
+    to run on that thread too.
+    """
+    def __init__(self):
+        import win32gui
+        import win32process
+        self.win32gui = win32gui
+        self.win32process = win32process
+        self.user32 = ctypes.windll.user32
+        self.hooks: Optional[list] = None
+        # hwnd -> (pid, title) of the visible, titled top-level windows
+        self.windows: Dict[int, Tuple[int, str]] = {}
+        self.relist = True
+        self.renamed: Set[int] = set()
+
+    def install_hooks(self):
+        from ctypes import wintypes
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD,
+        )
+        self.user32.SetWinEventHook.restype = wintypes.HANDLE
+        # Keep a reference, the hook calls into it until it is removed
+        self.callback = WinEventProc(self.on_win_event)
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        self.hooks = []
+        for first, last in ((EVENT_OBJECT_CREATE, EVENT_OBJECT_HIDE),
+                            (EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE)):
+            hook = self.user32.SetWinEventHook(first, last, 0, self.callback, 0, 0, flags)
+            if hook:
+                self.hooks.append(hook)
+        if len(self.hooks) < 2:
+            logger.warning("Could not watch for window changes, windows are listed on every refresh")
+
+    def on_win_event(self, hook, event, hwnd, id_object, id_child, thread, time_ms):
+        if id_object != OBJID_WINDOW or id_child != CHILDID_SELF or not hwnd:
+            return
+        if event == EVENT_OBJECT_NAMECHANGE:
+            self.renamed.add(hwnd)
+        else:
+            self.relist = True
+
+    def pump_messages(self):
+        """Deliver pending WinEvents; out-of-context hooks arrive as messages."""
+        from ctypes import wintypes
+        msg = wintypes.MSG()
+        while self.user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
+            self.user32.TranslateMessage(ctypes.byref(msg))
+            self.user32.DispatchMessageW(ctypes.byref(msg))
+
+    def read_window(self, hwnd: int) -> Optional[Tuple[int, str]]:
+        if not self.win32gui.IsWindowVisible(hwnd):
+            return None
+        title = self.win32gui.GetWindowText(hwnd)
+        if not title:
+            return None
+        _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+        return pid, title
+
+    def list_windows(self):
+        windows = {}
+
+        def enum_handler(hwnd, ctx):
+            window = self.read_window(hwnd)
+            if window is not None:
+                windows[hwnd] = window
+            return True
+
+        self.win32gui.EnumWindows(enum_handler, None)
+        self.windows = windows
+
+    def window_titles(self) -> Optional[Dict[int, str]]:
+        if self.hooks is None:
+            self.install_hooks()
+        self.pump_messages()
+        if self.relist or len(self.hooks) < 2:
+            self.relist = False
+            self.renamed.clear()
+            self.list_windows()
+        elif self.renamed:
+            renamed, self.renamed = self.renamed, set()
+            changed = False
+            for hwnd in renamed:
+                # Renamed windows that are not listed are hidden or untitled
+                if hwnd not in self.windows:
+                    continue
+                try:
+                    window = self.read_window(hwnd)
+                except Exception:
+                    window = None
+                if window is None:
+                    del self.windows[hwnd]
+                    changed = True
+                elif window != self.windows[hwnd]:
+                    self.windows[hwnd] = window
+                    changed = True
+            if not changed:
+                return None
+        else:
+            return None
+        titles: Dict[int, str] = {}
+        # EnumWindows lists front to back, the first window of a process is its main window
+        for pid, title in self.windows.values():
+            titles.setdefault(pid, title)
+        return titles
+
+    def close(self):
+        for hook in self.hooks or ():
+            self.user32.UnhookWinEvent(hook)
+        self.hooks = None
+
+
+def make_backend() -> DiscoveryBackend:
+    """The best backend for this platform."""
+    if sys.platform == "win32":
+        try:
+            return WindowsDiscoveryBackend()
+        except ImportError:
+            logger.warning("pywin32 is not installed, window titles are not available")
+    return PsutilDiscoveryBackend()
+
+
+class WindowDiscovery:
+    """
+    The incremental process table and its subscribers.
+
+    Subscribers are called as callback(event, entry, previous_title) with
+    event ADDED, REMOVED or TITLE; previous_title is only set for TITLE.
+    They run on the thread calling refresh(), the background thread after
+    start(). Backends may be tied to the thread that first used them, so
+    refresh() must always be called from the same thread: either call it
+    yourself, or use start() and let it do the first refresh too.
+    """
+    def __init__(self, backend: Optional[DiscoveryBackend] = None, verify_every: int = 30):
+        self.backend = backend or make_backend()
+        # Refreshes between checks of every known process for a reused ID
+        self.verify_every = verify_every
+        self.refreshes = 0
+        self.lock = threading.Lock()
+        self.table: Dict[int, ProcessEntry] = {}
+        self.titles: Dict[int, str] = {}
+        self.subscribers: List[Callable[[str, ProcessEntry, Optional[str]], None]] = []
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.refresh_thread: Optional[int] = None
+        self.describe_calls = 0
+
+    def subscribe(self, callback: Callable[[str, ProcessEntry, Optional[str]], None]):
+        self.subscribers.append(callback)
+
+    def publish(self, event: str, entry: ProcessEntry, previous_title: Optional[str] = None):
+        for callback in self.subscribers:
+            try:
+                callback(event, entry, previous_title)
+            except Exception as e:
+                logger.error("Discovery subscriber %s failed: %s", getattr(callback, "__name__", callback), e)
+
+    def refresh(self) -> List[Tuple[str, ProcessEntry, Optional[str]]]:
+        """Bring the table up to date and publish what changed."""
+        if self.refresh_thread is None:
+            self.refresh_thread = threading.get_ident()
+        elif self.refresh_thread != threading.get_ident():
+            raise RuntimeError("WindowDiscovery.refresh() must always run on the same thread")
+        pids = self.backend.pids()
+        titles = self.backend.window_titles()
+        self.refreshes += 1
+        changes = []
+        with self.lock:
+            if titles is not None:
+                self.titles = titles
+            for pid in self.table.keys() - pids:
+                changes.append((REMOVED, self.table.pop(pid), None))
+            if self.refreshes % self.verify_every == 0:
+                suspects = list(self.table)
+            elif titles is not None:
+                suspects = [pid for pid, entry in self.table.items() if titles.get(pid, "") != entry.title]
+            else:
+                suspects = []
+            for pid in suspects:
+                create_time = self.backend.create_time(pid)
+                if create_time is not None and create_time != self.table[pid].create_time:
+                    # The ID was reused; a process that has exited is dropped on the next refresh
+                    changes.append((REMOVED, self.table.pop(pid), None))
+            for pid in pids - self.table.keys():
+                self.describe_calls += 1
+                description = self.backend.describe(pid)
+                if description is None:
+                    continue
+                entry = self.table[pid] = ProcessEntry(pid, *description, self.titles.get(pid, ""))
+                changes.append((ADDED, entry, None))
+            if titles is not None:
+                for pid, entry in self.table.items():
+                    title = titles.get(pid, "")
+                    if title != entry.title:
+                        previous, entry.title = entry.title, title
+                        changes.append((TITLE, entry, previous))
+        for change in changes:
+            self.publish(*change)
+        return changes
+
+    def snapshot(self) -> List[ProcessEntry]:
+        with self.lock:
+            return list(self.table.values())
+
+    def find(self, search: str) -> List[ProcessEntry]:
+        """The processes whose name or window title contains the search string."""
+        return [entry for entry in self.snapshot() if entry.matches(search)]
+
+    def start(self, interval: float = 1.0):
+        """
+        Refresh from a background thread every interval seconds. Returns
+        once the first refresh has filled the table.
+        """
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(interval, ready),
+                                       name="WindowDiscovery", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def _run(self, interval: float, ready: threading.Event):
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error("Process discovery failed: %s", e)
+                ready.set()
+                self.stopped.wait(interval)
+        finally:
+            ready.set()
+            self.backend.close()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        else:
+            self.backend.close()
+
+
+def main():
+    """Print process and window title changes until Ctrl+C."""
+    logging.basicConfig(level=logging.INFO)
+    search = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    def on_change(event, entry, previous_title):
+        if search and not entry.matches(search) and not (previous_title and search.lower() in previous_title.lower()):
+            return
+        if event == TITLE:
+            print(f"📝 {entry.pid} {entry.name}: '{previous_title}' -> '{entry.title}'")
+        elif event == ADDED:
+            print(f"🟢 {entry.pid} {entry.name} {entry.title!r} {entry.exe or ''}")
+        else:
+            print(f"🔴 {entry.pid} {entry.name} exited")
+
+    discovery = WindowDiscovery()
+    discovery.subscribe(on_change)
+    discovery.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n🛑 Discovery stopped.")
+    finally:
+        discovery.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,86 +2,239 @@
 Elite Dangerous Audio Listener
 Listens for sound from all specified game client windows.
 
+Each tick takes one snapshot of the playing audio sessions, indexed by
+process ID, and checks every target window against it. The list of target
+windows is cached and only rebuilt when a window is created or destroyed,
+or a game window's title changes. The platform calls sit behind a backend,
+so the detection logic can run against FakeAudioBackend anywhere.
+
 Requirements:
 - pip install pywin32 pycaw
 """
 
 import time
 import logging
-from typing import Set, List, Tuple
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Set, Tuple
 import ctypes
 from ctypes import wintypes
-import win32gui
-import win32process
-from pycaw.pycaw import AudioUtilities
 
 # Configuration
 CONFIG = {
     "window_title_contains": "Elite - Dangerous (CLIENT)",
     "commanders": ["Bistronaut", "Tristronaut", "Quadstronaut"], # Replace with your commander names
+    # Seconds between checks
+    "tick_interval": 1.0,
 }
 
-def find_target_windows() -> List[Tuple[int, str, str]]:
-    """Finds all windows matching the commander names."""
-    
-    found_windows = []
-    
-    def enum_handler(hwnd, ctx):
-        title = win32gui.GetWindowText(hwnd)
-        
-        # Get the process ID for the window
-        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-        process_name = win32process.GetModuleFileNameEx(win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ, False, pid), 0).split('\\')[-1].split('.')[0]
-        
-        # Match against commander names
-        for commander in CONFIG["commanders"]:
-            if commander.lower() in title.lower() or ("primary" in commander.lower() and CONFIG["window_title_contains"] in title and not any(alt.lower() in title.lower() for alt in CONFIG["commanders"])):
-                found_windows.append((hwnd, title, commander))
-                return True
-        return True
-
-    win32gui.EnumWindows(enum_handler, None)
-    return found_windows
-
-def has_audio_activity(process_id: int) -> bool:
-    """Checks if a given process ID has an active audio session."""
-    sessions = AudioUtilities.GetAllSessions()
-    for session in sessions:
-        if session.Process and session.Process.pid == process_id:
-            return session.State == 1  # 1 is the state for audio playing
-    return False
+logger = logging.getLogger(__name__)
+
+# (window handle, process ID, title) of one top-level window
+Window = Tuple[int, int, str]
+
+# WinEvent constants, see SetWinEventHook
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+PM_REMOVE = 0x0001
+AUDIO_SESSION_STATE_ACTIVE = 1
+
+
+def match_commander(title: str) -> Optional[str]:
+    """The commander a window title belongs to, or None."""
+    lowered = title.lower()
+    for commander in CONFIG["commanders"]:
+        if commander.lower() in lowered or ("primary" in commander.lower() and CONFIG["window_title_contains"] in title and not any(alt.lower() in lowered for alt in CONFIG["commanders"])):
+            return commander
+    return None
+
+
+def is_relevant_title(title: str) -> bool:
+    """Whether a title change could add or remove a target window."""
+    return CONFIG["window_title_contains"] in title or match_commander(title) is not None
+
+
+class AudioBackend(ABC):
+    """
+    Platform access used by AudioMonitor.
+
+    window_generation() must change whenever the result of windows() may
+    have changed; playing_pids() takes one snapshot of the audio sessions.
+    """
+    @abstractmethod
+    def window_generation(self) -> int:
+        pass
+
+    @abstractmethod
+    def windows(self) -> List[Window]:
+        pass
+
+    @abstractmethod
+    def playing_pids(self) -> Set[int]:
+        pass
+
+    def close(self):
+        pass
+
+
+class WindowsAudioBackend(AudioBackend):
+    """pywin32 window enumeration, pycaw sessions and WinEvent hooks for window changes."""
+    def __init__(self, title_filter: Callable[[str], bool] = is_relevant_title):
+        import win32gui
+        import win32process
+        from pycaw.pycaw import AudioUtilities
+        self.win32gui = win32gui
+        self.win32process = win32process
+        self.audio = AudioUtilities
+        self.title_filter = title_filter
+        self.user32 = ctypes.windll.user32
+        self.generation = 0
+        self.titles: Dict[int, str] = {}
+        self.hooks = []
+        self.install_hooks()
+
+    def install_hooks(self):
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD,
+        )
+        self.user32.SetWinEventHook.restype = wintypes.HANDLE
+        # Keep a reference, the hook calls into it until it is removed
+        self.callback = WinEventProc(self.on_win_event)
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        for first, last in ((EVENT_OBJECT_CREATE, EVENT_OBJECT_DESTROY),
+                            (EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE)):
+            hook = self.user32.SetWinEventHook(first, last, 0, self.callback, 0, 0, flags)
+            if hook:
+                self.hooks.append(hook)
+        if len(self.hooks) < 2:
+            logger.warning("Could not watch for window changes, windows are listed on every tick")
+
+    def on_win_event(self, hook, event, hwnd, id_object, id_child, thread, time_ms):
+        if id_object != OBJID_WINDOW or id_child != CHILDID_SELF or not hwnd:
+            return
+        if event == EVENT_OBJECT_NAMECHANGE:
+            # Titles change all the time (browsers, clocks); only game windows matter
+            title = self.win32gui.GetWindowText(hwnd)
+            if not (self.title_filter(title) or self.title_filter(self.titles.get(hwnd, ""))):
+                return
+        self.generation += 1
+
+    def pump_messages(self):
+        """Deliver pending WinEvents; out-of-context hooks arrive as messages."""
+        msg = wintypes.MSG()
+        while self.user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
+            self.user32.TranslateMessage(ctypes.byref(msg))
+            self.user32.DispatchMessageW(ctypes.byref(msg))
+
+    def window_generation(self) -> int:
+        self.pump_messages()
+        if len(self.hooks) < 2:
+            self.generation += 1
+        return self.generation
+
+    def windows(self) -> List[Window]:
+        found = []
+
+        def enum_handler(hwnd, ctx):
+            title = self.win32gui.GetWindowText(hwnd)
+            if title:
+                _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+                found.append((hwnd, pid, title))
+            return True
+
+        self.win32gui.EnumWindows(enum_handler, None)
+        self.titles = {hwnd: title for hwnd, _, title in found}
+        return found
+
+    def playing_pids(self) -> Set[int]:
+        return {
+            session.Process.pid for session in self.audio.GetAllSessions()
+            if session.Process and session.State == AUDIO_SESSION_STATE_ACTIVE
+        }
+
+    def close(self):
+        for hook in self.hooks:
+            self.user32.UnhookWinEvent(hook)
+        self.hooks.clear()
+
+
+class FakeAudioBackend(AudioBackend):
+    """In-memory backend for testing and benchmarking the detection logic."""
+    def __init__(self, windows: Optional[List[Window]] = None, playing: Optional[Set[int]] = None):
+        self.window_list = list(windows or [])
+        self.playing = set(playing or ())
+        self.generation = 0
+        self.window_enumerations = 0
+        self.session_enumerations = 0
+
+    def set_windows(self, windows: List[Window]):
+        self.window_list = list(windows)
+        self.generation += 1
+
+    def window_generation(self) -> int:
+        return self.generation
+
+    def windows(self) -> List[Window]:
+        self.window_enumerations += 1
+        return list(self.window_list)
+
+    def playing_pids(self) -> Set[int]:
+        self.session_enumerations += 1
+        return set(self.playing)
+
+
+class AudioMonitor:
+    """Checks whether every target game window is playing audio."""
+    def __init__(self, backend: AudioBackend):
+        self.backend = backend
+        self.generation: Optional[int] = None
+        # (window handle, process ID, title, commander) of the target windows
+        self.targets: List[Tuple[int, int, str, str]] = []
+
+    def target_windows(self) -> List[Tuple[int, int, str, str]]:
+        """The target windows, listed again only after the windows changed."""
+        generation = self.backend.window_generation()
+        if generation != self.generation:
+            self.generation = generation
+            self.targets = []
+            for hwnd, pid, title in self.backend.windows():
+                commander = match_commander(title)
+                if commander is not None:
+                    self.targets.append((hwnd, pid, title, commander))
+        return self.targets
+
+    def tick(self) -> bool:
+        """True when there are target windows and all of them have audio."""
+        targets = self.target_windows()
+        if not targets:
+            return False
+        playing = self.backend.playing_pids()
+        return all(pid in playing for _, pid, _, _ in targets)
+
 
 def main():
     """Main function to start the audio listening process."""
-    
-    while True:
-        try:
-            target_windows = find_target_windows()
-            
-            if not target_windows:
-                # If no windows are found, wait and try again
-                time.sleep(1)
-                continue
-            
-            all_have_audio = True
-            
-            for hwnd, title, commander in target_windows:
-                _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                
-                if not has_audio_activity(pid):
-                    all_have_audio = False
-                    break # Break the inner loop if any window has no audio
-            
-            if all_have_audio:
-                # If all windows have audio, exit successfully
-                print("TRUE")
-                return 0 # Exit with code 0
-            
-            time.sleep(1) # Wait and check again
-            
-        except Exception as e:
-            # Handle potential errors, such as a window closing unexpectedly
-            continue
+    backend = WindowsAudioBackend()
+    monitor = AudioMonitor(backend)
+    try:
+        while True:
+            try:
+                if monitor.tick():
+                    # If all windows have audio, exit successfully
+                    print("TRUE")
+                    return 0 # Exit with code 0
+            except Exception as e:
+                # Handle potential errors, such as a window closing unexpectedly
+                logger.debug("Audio check failed: %s", e)
+                monitor.generation = None
+            time.sleep(CONFIG["tick_interval"]) # Wait and check again
+    finally:
+        backend.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
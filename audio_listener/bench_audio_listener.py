@@ -0,0 +1,105 @@
+"""
+Audio listener benchmark.
+Compares the old per-window session lookup with the per-tick snapshot on a
+fake desktop, so the scaling can be checked on any platform.
+
+The fake session enumeration builds one object per audio session, standing
+in for the COM objects GetAllSessions() creates on Windows.
+
+Usage:
+- python bench_audio_listener.py
+- python bench_audio_listener.py --clients 8 --sessions 200 --windows 400
+"""
+
+import time
+import argparse
+from typing import List, Set
+
+import audio_listener
+from audio_listener import AudioMonitor, FakeAudioBackend, match_commander
+
+
+class FakeSession:
+    __slots__ = ("pid", "State")
+
+    def __init__(self, pid: int, state: int):
+        self.pid = pid
+        self.State = state
+
+
+class SessionCostBackend(FakeAudioBackend):
+    """A fake backend whose session enumeration costs one object per session."""
+    def __init__(self, windows, playing: Set[int], sessions: int):
+        super().__init__(windows, playing)
+        self.session_pids = list(playing) + list(range(100000, 100000 + sessions - len(playing)))
+
+    def all_sessions(self) -> List[FakeSession]:
+        self.session_enumerations += 1
+        return [FakeSession(pid, 1 if pid in self.playing else 0) for pid in self.session_pids]
+
+    def playing_pids(self) -> Set[int]:
+        return {session.pid for session in self.all_sessions() if session.State == 1}
+
+
+def legacy_tick(backend: SessionCostBackend) -> bool:
+    """The old loop: list and match every window, then enumerate sessions per target window."""
+    backend.window_enumerations += 1
+    targets = [pid for _, pid, title in backend.window_list if match_commander(title)]
+    if not targets:
+        return False
+    for pid in targets:
+        for session in backend.all_sessions():
+            if session.pid == pid:
+                if session.State != 1:
+                    return False
+                break
+        else:
+            return False
+    return True
+
+
+def make_desktop(clients: int, windows: int):
+    commanders = [f"Commander{i}" for i in range(clients)]
+    audio_listener.CONFIG["commanders"] = commanders
+    desktop = [(i, 1000 + i, f"Elite - Dangerous (CLIENT) {name}") for i, name in enumerate(commanders)]
+    desktop += [(clients + i, 5000 + i, f"Some other window {i}") for i in range(windows)]
+    return desktop, {1000 + i for i in range(clients)}
+
+
+def bench(clients: int, sessions: int, windows: int, ticks: int):
+    desktop, playing = make_desktop(clients, windows)
+
+    legacy = SessionCostBackend(desktop, playing, sessions)
+    started = time.perf_counter()
+    for _ in range(ticks):
+        legacy_tick(legacy)
+    legacy_us = (time.perf_counter() - started) / ticks * 1e6
+
+    snapshot = SessionCostBackend(desktop, playing, sessions)
+    monitor = AudioMonitor(snapshot)
+    started = time.perf_counter()
+    for _ in range(ticks):
+        monitor.tick()
+    snapshot_us = (time.perf_counter() - started) / ticks * 1e6
+
+    print(f"{clients:>3} clients, {sessions:>4} sessions, {windows:>4} windows:"
+          f"  per-window lookup {legacy_us:9.1f} us/tick ({legacy.session_enumerations / ticks:.0f} enumerations,"
+          f" {legacy.window_enumerations / ticks:.0f} window lists)"
+          f"  snapshot {snapshot_us:8.1f} us/tick ({snapshot.session_enumerations / ticks:.0f} enumeration,"
+          f" {snapshot.window_enumerations} window lists in total)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audio listener tick")
+    parser.add_argument("--clients", type=int, default=None, help="game clients (default: a sweep)")
+    parser.add_argument("--sessions", type=int, default=50, help="audio sessions on the machine")
+    parser.add_argument("--windows", type=int, default=200, help="other windows on the desktop")
+    parser.add_argument("--ticks", type=int, default=2000)
+    args = parser.parse_args()
+
+    for clients in ([args.clients] if args.clients else [1, 3, 8, 16]):
+        bench(clients, args.sessions, args.windows, args.ticks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Tests for the audio detection logic, run against FakeAudioBackend.
+
+Usage:
+- python -m pytest audio_listener
+"""
+
+import pytest
+
+import audio_listener
+from audio_listener import AudioBackend, AudioMonitor, FakeAudioBackend
+
+
+@pytest.fixture(autouse=True)
+def commanders(monkeypatch):
+    monkeypatch.setitem(audio_listener.CONFIG, "commanders", ["Bistronaut", "Tristronaut"])
+
+
+def desktop(extra_windows: int = 0):
+    windows = [
+        (1, 1001, "Elite - Dangerous (CLIENT) Bistronaut"),
+        (2, 1002, "Elite - Dangerous (CLIENT) Tristronaut"),
+    ]
+    windows += [(100 + i, 5000 + i, f"Some other window {i}") for i in range(extra_windows)]
+    return windows
+
+
+def test_all_targets_playing():
+    monitor = AudioMonitor(FakeAudioBackend(desktop(), {1001, 1002}))
+    assert monitor.tick()
+    assert [commander for _, _, _, commander in monitor.targets] == ["Bistronaut", "Tristronaut"]
+
+
+def test_one_silent_target_is_false():
+    assert not AudioMonitor(FakeAudioBackend(desktop(), {1001})).tick()
+
+
+def test_no_targets_is_false():
+    backend = FakeAudioBackend([(1, 1001, "Notepad")], {1001})
+    assert not AudioMonitor(backend).tick()
+    # Without targets there is nothing to look up
+    assert backend.session_enumerations == 0
+
+
+def test_targets_are_only_rebuilt_when_the_generation_changes():
+    backend = FakeAudioBackend(desktop(), {1001, 1002})
+    monitor = AudioMonitor(backend)
+    for _ in range(5):
+        monitor.tick()
+    assert backend.window_enumerations == 1
+
+    backend.set_windows(desktop()[:1])
+    assert monitor.tick()
+    assert backend.window_enumerations == 2
+    assert len(monitor.targets) == 1
+
+
+@pytest.mark.parametrize("extra_windows", [0, 10, 500])
+def test_sessions_are_enumerated_once_per_tick(extra_windows):
+    backend = FakeAudioBackend(desktop(extra_windows), {1001, 1002})
+    monitor = AudioMonitor(backend)
+    for _ in range(3):
+        monitor.tick()
+    assert backend.session_enumerations == 3
+
+
+def test_backend_missing_a_method_fails_on_creation():
+    class Incomplete(AudioBackend):
+        def windows(self):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete()